@@ -0,0 +1,36 @@
+"""Items full-text search
+
+Revision ID: 76281c3fde5a
+Revises: 1502cc252df6
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.core.search import FTS_TABLE, rebuild_search_index
+
+
+# revision identifiers, used by Alembic.
+revision: str = '76281c3fde5a'
+down_revision: Union[str, Sequence[str], None] = '1502cc252df6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # FTS5 с триггерами на SQLite / GIN-индекс на Postgres и заполнение по уже существующим товарам
+    rebuild_search_index(op.get_bind())
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name == "sqlite":
+        for trigger in ("items_fts_ai", "items_fts_ad", "items_fts_au"):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+    elif op.get_bind().dialect.name == "postgresql":
+        op.execute("DROP INDEX IF EXISTS ix_items_fts")
@@ -0,0 +1,94 @@
+"""Catalog, cart and order schema
+
+Revision ID: 8d6cc3bca170
+Revises: 76281c3fde5a
+Create Date: 2026-10-18 12:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d6cc3bca170'
+down_revision: Union[str, Sequence[str], None] = '76281c3fde5a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    sqlite = op.get_bind().dialect.name == "sqlite"
+
+    # Артикул поставщика для импорта. На SQLite уникальность — индексом: ALTER TABLE
+    # не добавляет ограничений, а пересоздание items потеряло бы триггеры поиска
+    op.add_column("items", sa.Column("sku", sa.String(length=64), nullable=True))
+    if sqlite:
+        op.create_index("uq_items_sku", "items", ["sku"], unique=True)
+    else:
+        op.create_unique_constraint("uq_items_sku", "items", ["sku"])
+
+    # Keyset-пагинация каталога и истории заказов
+    op.create_index("ix_items_price_id", "items", ["price", "id"])
+    op.create_index("ix_items_category_id_id", "items", ["category_id", "id"])
+    op.create_index("ix_items_category_id_price_id", "items", ["category_id", "price", "id"])
+    op.create_index("ix_orders_user_id_id", "orders", ["user_id", "id"])
+    op.create_index("ix_order_items_order_id", "order_items", ["order_id"])
+
+    # Одна строка корзины на товар (нужна upsert'у ON CONFLICT): дубли, набранные до
+    # ограничения, сливаются в первую строку с суммой количества
+    op.execute(
+        "UPDATE cart_items SET quantity = (SELECT sum(c.quantity) FROM cart_items c "
+        "WHERE c.user_id = cart_items.user_id AND c.item_id = cart_items.item_id) "
+        "WHERE id IN (SELECT min(id) FROM cart_items GROUP BY user_id, item_id HAVING count(*) > 1)"
+    )
+    op.execute(
+        "DELETE FROM cart_items WHERE id NOT IN (SELECT min(id) FROM cart_items GROUP BY user_id, item_id)"
+    )
+    if sqlite:
+        op.create_index("uq_cart_items_user_id_item_id", "cart_items", ["user_id", "item_id"], unique=True)
+    else:
+        op.create_unique_constraint("uq_cart_items_user_id_item_id", "cart_items", ["user_id", "item_id"])
+
+    # Резервы остатка под корзины
+    op.create_table(
+        "stock_reservations",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("item_id", sa.Integer(), nullable=False),
+        sa.Column("quantity", sa.Integer(), nullable=False),
+        sa.Column("expires_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["item_id"], ["items.id"]),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_stock_reservations_expires_at", "stock_reservations", ["expires_at"])
+    op.create_index("ix_stock_reservations_user_id_item_id", "stock_reservations", ["user_id", "item_id"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    sqlite = op.get_bind().dialect.name == "sqlite"
+
+    op.drop_index("ix_stock_reservations_user_id_item_id", table_name="stock_reservations")
+    op.drop_index("ix_stock_reservations_expires_at", table_name="stock_reservations")
+    op.drop_table("stock_reservations")
+
+    if sqlite:
+        op.drop_index("uq_cart_items_user_id_item_id", table_name="cart_items")
+    else:
+        op.drop_constraint("uq_cart_items_user_id_item_id", "cart_items", type_="unique")
+
+    op.drop_index("ix_order_items_order_id", table_name="order_items")
+    op.drop_index("ix_orders_user_id_id", table_name="orders")
+    op.drop_index("ix_items_category_id_price_id", table_name="items")
+    op.drop_index("ix_items_category_id_id", table_name="items")
+    op.drop_index("ix_items_price_id", table_name="items")
+
+    if sqlite:
+        op.drop_index("uq_items_sku", table_name="items")
+    else:
+        op.drop_constraint("uq_items_sku", "items", type_="unique")
+    op.drop_column("items", "sku")
@@ -1,33 +1,164 @@
-from fastapi import Depends, HTTPException, status
+import asyncio
+import json
+import secrets
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import event, inspect, select
 from sqlalchemy.ext.asyncio import AsyncSession
-from jose import jwt, JWTError
-from app.core.db import AsyncSessionLocal
+from sqlalchemy.orm import Session
+from jose import JWTError
+from app.core.broker import Broker, broker
+from app.core.cache import TTLCache, catalog_cache
+from app.core.consistency import PIN_COOKIE, pinned, track_writes
+from app.core.db import AsyncSessionLocal, replicas
 from app.core.config import settings
+from app.core.security import decode_access_token
+from app.core.serialization import dumps
 from app.models.user import User
 
 # Объявляем схему
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
+
+@dataclass(frozen=True, slots=True)
+class CurrentUser:
+    """Данные пользователя, нужные эндпоинтам, без привязки к сессии БД"""
+    id: int
+    email: str
+    role: str
+    is_active: bool
+
+
+# Кэш пользователей по subject токена ("user", email). Изменённые и удалённые
+# пользователи сбрасываются после commit (до него другие запросы ещё читают старую
+# строку) — в этом процессе сразу, на остальных воркерах — через брокер
+user_cache = TTLCache(settings.USER_CACHE_MAXSIZE, settings.USER_CACHE_TTL)
+
+USER_INVALIDATION_ROOM = "users:invalidate"
+_ORIGIN = secrets.token_hex(4)
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _track_changed_user(mapper, connection, target):
+    state = inspect(target)
+    if state.session is not None:
+        emails = state.session.info.setdefault("user_emails", set())
+        emails.update({target.email, *state.attrs.email.history.deleted})
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_users(session):
+    emails = session.info.pop("user_emails", None)
+    if not emails:
+        return
+    _invalidate_users(emails)
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return  # Синхронная сессия вне event loop (скрипты): рассылать некуда
+    message = {"origin": _ORIGIN, "emails": sorted(emails)}
+    broker.publish(USER_INVALIDATION_ROOM, dumps(message).decode())
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_rolled_back_users(session):
+    session.info.pop("user_emails", None)
+
+
+def _invalidate_users(emails) -> None:
+    for email in emails:
+        user_cache.pop(("user", email))
+
+
+def _on_user_invalidation(room: str, messages: list[str]) -> None:
+    for message in messages:
+        data = json.loads(message)
+        if data["origin"] != _ORIGIN:
+            _invalidate_users(data["emails"])
+
+
+def start_user_invalidation(broker: Broker) -> None:
+    broker.subscribe(USER_INVALIDATION_ROOM, _on_user_invalidation)
+
+
+def stop_user_invalidation(broker: Broker) -> None:
+    broker.unsubscribe(USER_INVALIDATION_ROOM, _on_user_invalidation)
+
 async def get_db():
+    """Сессия основной БД (чтение и запись)"""
+    async with AsyncSessionLocal() as session:
+        if replicas:
+            track_writes(session)
+        yield session
+
+
+async def get_read_db(request: Request):
+    """Сессия только для чтения: реплика, если настроены и клиент не писал только что"""
+    if replicas and not pinned(request.cookies.get(PIN_COOKIE)):
+        async with replicas.session() as session:
+            yield session
+        return
     async with AsyncSessionLocal() as session:
         yield session
 
+
+@asynccontextmanager
+async def catalog_fill_session(db: AsyncSession, namespace: str):
+    """Сессия для заполнения кэша каталога после промаха.
+
+    Промах сразу после инвалидации значит, что запись была только что и реплика
+    может её ещё не видеть: такой кэш читается из основной БД, иначе новая версия
+    кэша заполнилась бы старой строкой.
+    """
+    if replicas and catalog_cache.recently_bumped(namespace, settings.READ_YOUR_WRITES_SECONDS):
+        async with AsyncSessionLocal() as session:
+            yield session
+        return
+    yield db
+
 async def get_current_user(
     db: AsyncSession = Depends(get_db), 
     token: str = Depends(oauth2_scheme)
 ):
+    return await resolve_user(db, token)
+
+
+async def resolve_user(db: AsyncSession, token: str) -> CurrentUser:
+    """Пользователь по токену (через кэш); 401 — токен невалиден, 403 — пользователь неактивен"""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        payload = decode_access_token(token)
         email: str = payload.get("sub")
         if email is None:
             raise credentials_exception
     except JWTError:
         raise credentials_exception
-        
-    return email # Или логика поиска пользователя в базе: await db.get(User, email)
\ No newline at end of file
+
+    cache_key = ("user", email)
+    user = user_cache.get(cache_key)
+    if user is None:
+        version = user_cache.version("user")
+        result = await db.execute(
+            select(User.id, User.email, User.role, User.is_active).where(User.email == email)
+        )
+        row = result.one_or_none()
+        if row is None:
+            raise credentials_exception
+        user = CurrentUser(*row)
+        user_cache.set(cache_key, user, version=version)
+
+    if not user.is_active:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Inactive user")
+    return user
+
+async def get_current_admin(user: CurrentUser = Depends(get_current_user)):
+    if user.role != "admin":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin privileges required")
+    return user
@@ -4,7 +4,8 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from app.api.deps import get_db
 from app.models.user import User
-from app.core.security import hash_password, verify_password, create_access_token
+from app.core.hash_pool import PoolSaturated
+from app.core.security import hash_password_async, verify_password_async, create_access_token
 from pydantic import BaseModel, EmailStr
 
 # ВОТ ЭТА СТРОКА ОТСУТСТВУЕТ (добавьте её):
@@ -18,6 +19,13 @@ class UserCreate(BaseModel):
     email: EmailStr
     password: str
 
+def pool_busy() -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail="Authentication service is busy, retry later",
+        headers={"Retry-After": "1"},
+    )
+
 @router.post("/register")
 async def register(user_in: UserCreate, db: AsyncSession = Depends(get_db)):
     query = select(User).where(User.email == user_in.email)
@@ -25,9 +33,14 @@ async def register(user_in: UserCreate, db: AsyncSession = Depends(get_db)):
     if result.scalar_one_or_none():
         raise HTTPException(status_code=400, detail="User already exists")
     
+    try:
+        hashed_password = await hash_password_async(user_in.password)
+    except PoolSaturated:
+        raise pool_busy()
+
     new_user = User(
         email=user_in.email,
-        hashed_password=hash_password(user_in.password)
+        hashed_password=hashed_password
     )
     db.add(new_user)
     await db.commit()
@@ -41,7 +54,11 @@ async def login(
     result = await db.execute(select(User).where(User.email == form_data.username))
     user = result.scalar_one_or_none()
     
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    try:
+        valid = bool(user) and await verify_password_async(form_data.password, user.hashed_password)
+    except PoolSaturated:
+        raise pool_busy()
+    if not valid:
         raise HTTPException(status_code=401, detail="Incorrect email or password")
     
     access_token = create_access_token(data={"sub": user.email})
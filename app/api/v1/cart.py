@@ -1,7 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, delete
-from app.api.deps import get_db, get_current_user
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from app.api.deps import get_db, get_read_db, get_current_user
+from app.core.inventory import OutOfStock, release, reserve
+from app.core.serialization import FastJSONResponse
 from app.models.order import CartItem
 from app.models.item import Item
 
@@ -10,40 +14,67 @@ router = APIRouter()
 @router.post("/") # Добавить в корзину 
 async def add_to_cart(
     item_id: int = Query(...),
+    quantity: int = Query(1, ge=1),
     db: AsyncSession = Depends(get_db), 
     user=Depends(get_current_user)
 ):
     """Добавить товар в корзину"""
-    # Проверка: существует ли товар
-    item = await db.get(Item, item_id)
-    if not item:
-        raise HTTPException(status_code=404, detail="Товар не найден")
-    
-    cart_item = CartItem(user_id=user.id, item_id=item_id)
-    db.add(cart_item)
+    # Резервируем товар на время жизни корзины (заодно проверяет, что товар есть)
+    try:
+        await reserve(db, user.id, item_id, quantity)
+    except OutOfStock:
+        await db.rollback()
+        if not await db.get(Item, item_id):
+            raise HTTPException(status_code=404, detail="Товар не найден")
+        raise HTTPException(status_code=409, detail="Товара нет в наличии")
+
+    # Атомарный upsert: новая строка или quantity += quantity
+    insert = sqlite_insert if db.bind.dialect.name == "sqlite" else pg_insert
+    stmt = insert(CartItem).values(user_id=user.id, item_id=item_id, quantity=quantity)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[CartItem.user_id, CartItem.item_id],
+        set_={"quantity": CartItem.quantity + stmt.excluded.quantity},
+    ).returning(CartItem.quantity)
+    result = await db.execute(stmt)
+    total_quantity = result.scalar_one()
     await db.commit()
-    return {"message": "Товар добавлен в корзину", "item_id": item_id}
+    return {"message": "Товар добавлен в корзину", "item_id": item_id, "quantity": total_quantity}
 
 @router.get("/") # Просмотр корзины
 async def view_cart(
-    db: AsyncSession = Depends(get_db), 
+    db: AsyncSession = Depends(get_read_db), 
     user=Depends(get_current_user)
 ):
-    """Получить содержимое корзины"""
-    result = await db.execute(select(CartItem).where(CartItem.user_id == user.id))
-    cart_items = result.scalars().all()
-    
-    return {
-        "total": len(cart_items),
-        "items": [
-            {
-                "id": item.id,
-                "item_id": item.item_id,
-                "user_id": item.user_id
-            }
-            for item in cart_items
-        ]
-    }
+    """Получить содержимое корзины вместе с данными товаров одним запросом"""
+    result = await db.execute(
+        select(
+            CartItem.id, CartItem.item_id, CartItem.quantity,
+            Item.title, Item.price, Item.stock_quantity,
+        )
+        .join(Item, Item.id == CartItem.item_id)
+        .where(CartItem.user_id == user.id)
+        .order_by(CartItem.id)
+    )
+    lines = [
+        {
+            "id": row.id,
+            "item_id": row.item_id,
+            "user_id": user.id,
+            "title": row.title,
+            "price": row.price,
+            "quantity": row.quantity,
+            "stock_quantity": row.stock_quantity,
+            "subtotal": round(row.price * row.quantity, 2),
+        }
+        for row in result.all()
+    ]
+
+    return FastJSONResponse({
+        "total": len(lines),
+        "total_quantity": sum(line["quantity"] for line in lines),
+        "total_price": round(sum(line["subtotal"] for line in lines), 2),
+        "items": lines,
+    })
 
 @router.delete("/{item_id}") # Удалить товар из корзины
 async def remove_from_cart(
@@ -64,6 +95,7 @@ async def remove_from_cart(
         raise HTTPException(status_code=404, detail="Товар не найден в корзине")
     
     await db.delete(cart_item)
+    await release(db, user.id, [item_id])
     await db.commit()
     
     return {"message": "Товар удален из корзины"}
@@ -75,5 +107,6 @@ async def clear_cart(
 ):
     """Очистить всю корзину"""
     await db.execute(delete(CartItem).where(CartItem.user_id == user.id))
+    await release(db, user.id)
     await db.commit()
     return {"message": "Корзина очищена"}
\ No newline at end of file
@@ -1,7 +1,10 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from app.api.deps import get_db
+from app.api.deps import catalog_fill_session, get_db, get_read_db
+from app.core.cache import catalog_cache, invalidate_categories
+from app.core.etag import catalog_etag, not_modified, set_etag
+from app.core.serialization import RawJSONResponse, dumps
 from app.models.item import Category
 from pydantic import BaseModel
 
@@ -15,9 +18,23 @@ async def create_category(cat_in: CategoryCreate, db: AsyncSession = Depends(get
     new_cat = Category(name=cat_in.name)
     db.add(new_cat)
     await db.commit()
+    invalidate_categories()
     return new_cat
 
 @router.get("/")
-async def list_categories(db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(Category))
-    return result.scalars().all()
\ No newline at end of file
+async def list_categories(request: Request, db: AsyncSession = Depends(get_read_db)):
+    cache_key = ("categories",)
+    etag = catalog_etag(*cache_key)
+    if (cached_response := not_modified(request, etag)) is not None:
+        return cached_response
+
+    cached = catalog_cache.get(cache_key)
+    if cached is None:
+        version = catalog_cache.version("categories")
+        async with catalog_fill_session(db, "categories") as session:
+            result = await session.execute(select(Category.id, Category.name, Category.description))
+        cached = dumps([row._asdict() for row in result.all()])
+        catalog_cache.set(cache_key, cached, version=version)
+    response = RawJSONResponse(cached)
+    set_etag(response, etag)
+    return response
\ No newline at end of file
@@ -1,27 +1,84 @@
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect [cite: 154]
+import json
+from datetime import datetime, timezone
+
+from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect, status
+
+from app.api.deps import resolve_user
+from app.core.broker import broker
+from app.core.config import settings
+from app.core.db import AsyncSessionLocal
+from app.core.hub import ConnectionManager
+from app.core.serialization import dumps
 
 router = APIRouter()
 
-class ConnectionManager: [cite: 157]
-    def __init__(self):
-        self.active_connections: list[WebSocket] = []
+# Покупатель сидит в своей комнате buyer:{id}, продавцы (role=admin) — в комнате sellers.
+# Сообщение покупателя уходит в его комнату и всем продавцам, ответ продавца
+# ("to": id покупателя) — в комнату покупателя и остальным продавцам.
+SELLERS_ROOM = "sellers"
+
+manager = ConnectionManager(broker=broker)
+
+
+def buyer_room(buyer_id: int) -> str:
+    return f"buyer:{buyer_id}"
 
-    async def connect(self, websocket: WebSocket):
-        await websocket.accept()
-        self.active_connections.append(websocket)
 
-    def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket) [cite: 159]
+def _event(**payload) -> str:
+    return dumps(payload).decode()
 
-manager = ConnectionManager()
 
-@router.websocket("/ws/{client_id}") [cite: 155]
-async def websocket_endpoint(websocket: WebSocket, client_id: int):
-    await manager.connect(websocket)
+@router.websocket("/ws")
+async def websocket_endpoint(websocket: WebSocket, token: str = ""):
+    try:
+        async with AsyncSessionLocal() as db:
+            user = await resolve_user(db, token)
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    is_seller = user.role == "admin"
+    conn = await manager.connect(
+        websocket, user.id, [SELLERS_ROOM if is_seller else buyer_room(user.id)]
+    )
     try:
         while True:
             data = await websocket.receive_text()
-            # Логика отправки сообщения продавцу [cite: 158]
-            await websocket.send_text(f"Message from {client_id}: {data}")
+            if conn.closed:
+                break  # Соединение уже вытеснено хабом
+            conn.touch()
+            try:
+                message = json.loads(data)
+            except ValueError:
+                manager.offer(conn, _event(type="error", detail="Invalid JSON"))
+                continue
+            if not isinstance(message, dict) or message.get("type") != "message":
+                continue  # pong и прочие служебные кадры только продлевают соединение
+
+            text = message.get("text")
+            if not isinstance(text, str) or not text.strip():
+                manager.offer(conn, _event(type="error", detail="Empty message"))
+                continue
+            if len(text) > settings.CHAT_MAX_MESSAGE_LENGTH:
+                manager.offer(conn, _event(type="error", detail="Message too long"))
+                continue
+
+            buyer_id = message.get("to") if is_seller else user.id
+            if not isinstance(buyer_id, int):
+                manager.offer(conn, _event(type="error", detail="Seller messages need 'to'"))
+                continue
+            event = _event(
+                type="message",
+                buyer_id=buyer_id,
+                sender_id=user.id,
+                role="seller" if is_seller else "buyer",
+                text=text,
+                sent_at=datetime.now(timezone.utc),
+            )
+            # Через брокер сообщение дойдёт и до соединений на других воркерах
+            manager.broadcast(buyer_room(buyer_id), event)
+            manager.broadcast(SELLERS_ROOM, event)
     except WebSocketDisconnect:
-        manager.disconnect(websocket)
\ No newline at end of file
+        pass
+    finally:
+        manager.disconnect(conn)
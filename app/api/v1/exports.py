@@ -0,0 +1,112 @@
+import csv
+import io
+import json
+from datetime import datetime
+from typing import AsyncIterator, Literal, Optional
+
+from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Select, select
+
+from app.api.deps import get_current_admin
+from app.core.config import settings
+from app.core.db import read_session
+from app.models.item import Item
+from app.models.order import Order, OrderItem
+
+router = APIRouter()
+
+ExportFormat = Literal["ndjson", "csv"]
+
+_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+
+
+# GET /exports/items — Полная выгрузка каталога
+@router.get("/items")
+async def export_items(format: ExportFormat = "ndjson", admin=Depends(get_current_admin)):
+    query = select(
+        Item.id, Item.sku, Item.title, Item.description, Item.price,
+        Item.stock_quantity, Item.category_id,
+    ).order_by(Item.id)
+    return _export(query, format, "items")
+
+
+# GET /exports/orders — Заказы, с since — только созданные начиная с этого момента
+@router.get("/orders")
+async def export_orders(
+    format: ExportFormat = "ndjson",
+    since: Optional[datetime] = None,
+    admin=Depends(get_current_admin),
+):
+    query = select(
+        Order.id, Order.user_id, Order.total_price, Order.status,
+        Order.delivery_address, Order.delivery_phone, Order.created_at,
+    ).order_by(Order.id)
+    if since is not None:
+        query = query.where(Order.created_at >= since)
+    return _export(query, format, "orders")
+
+
+# GET /exports/order-items — Строки заказов (since фильтрует по дате заказа)
+@router.get("/order-items")
+async def export_order_items(
+    format: ExportFormat = "ndjson",
+    since: Optional[datetime] = None,
+    admin=Depends(get_current_admin),
+):
+    query = select(
+        OrderItem.id, OrderItem.order_id, OrderItem.item_id, OrderItem.quantity, OrderItem.price,
+    ).order_by(OrderItem.id)
+    if since is not None:
+        query = query.join(Order, Order.id == OrderItem.order_id).where(Order.created_at >= since)
+    return _export(query, format, "order_items")
+
+
+def _export(query: Select, format: ExportFormat, name: str) -> StreamingResponse:
+    encode = _ndjson_chunks if format == "ndjson" else _csv_chunks
+    return StreamingResponse(
+        encode(query),
+        media_type=_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{name}.{format}"'},
+    )
+
+
+async def _partitions(query: Select) -> AsyncIterator[list]:
+    # Сессия открывается внутри генератора: зависимость get_db закрылась бы
+    # раньше, чем StreamingResponse дочитает курсор
+    async with read_session() as session:
+        result = await session.stream(
+            query.execution_options(yield_per=settings.EXPORT_BATCH_SIZE)
+        )
+        async for rows in result.partitions():
+            yield rows
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+async def _ndjson_chunks(query: Select) -> AsyncIterator[bytes]:
+    async for rows in _partitions(query):
+        yield "".join(
+            json.dumps(dict(row._mapping), default=_json_default, ensure_ascii=False) + "\n"
+            for row in rows
+        ).encode()
+
+
+async def _csv_chunks(query: Select) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([column["name"] for column in query.column_descriptions])
+    async for rows in _partitions(query):
+        writer.writerows(
+            [value.isoformat() if isinstance(value, datetime) else value for value in row]
+            for row in rows
+        )
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
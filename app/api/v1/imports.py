@@ -0,0 +1,199 @@
+import csv
+import json
+from typing import AsyncIterator, Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from pydantic import ValidationError
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.deps import get_current_admin, get_db
+from app.core.cache import invalidate_items
+from app.core.config import settings
+from app.core.live import track
+from app.models.item import Category, Item
+from app.schemas.item import ItemCreate
+
+router = APIRouter()
+
+ImportFormat = Literal["ndjson", "csv"]
+ImportKey = Literal["sku", "title"]
+
+
+class ImportReport:
+    def __init__(self):
+        self.inserted = 0
+        self.updated = 0
+        self.failed = 0
+        self.errors: list[dict] = []
+
+    def error(self, row: int, message) -> None:
+        self.failed += 1
+        if len(self.errors) < settings.IMPORT_MAX_ERRORS:
+            self.errors.append({"row": row, "errors": message if isinstance(message, list) else [message]})
+
+    def as_dict(self) -> dict:
+        return {
+            "inserted": self.inserted,
+            "updated": self.updated,
+            "failed": self.failed,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors),
+        }
+
+
+# POST /items/import — Массовая загрузка прайс-листа (NDJSON или CSV) потоком
+@router.post("/import")
+async def import_items(
+    request: Request,
+    format: Optional[ImportFormat] = None,
+    key: ImportKey = "sku",
+    db: AsyncSession = Depends(get_db),
+    admin=Depends(get_current_admin),
+):
+    """Импорт товаров: вставка новых и обновление существующих по sku или title"""
+    fmt = format or _detect_format(request.headers.get("content-type", ""))
+    records = _ndjson_records(request) if fmt == "ndjson" else _csv_records(request)
+
+    report = ImportReport()
+    batch: list[tuple[int, ItemCreate]] = []
+    async for row_number, data in records:
+        if isinstance(data, str):
+            report.error(row_number, data)
+            continue
+        try:
+            item = ItemCreate.model_validate(data)
+        except ValidationError as e:
+            report.error(row_number, [
+                f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors()
+            ])
+            continue
+        batch.append((row_number, item))
+        if len(batch) >= settings.IMPORT_BATCH_SIZE:
+            await _upsert_batch(db, batch, key, report)
+            batch = []
+    if batch:
+        await _upsert_batch(db, batch, key, report)
+
+    return report.as_dict()
+
+
+def _detect_format(content_type: str) -> ImportFormat:
+    if "csv" in content_type:
+        return "csv"
+    if "ndjson" in content_type or "jsonlines" in content_type or "json" in content_type:
+        return "ndjson"
+    raise HTTPException(status_code=415, detail="Use text/csv or application/x-ndjson, or pass ?format=")
+
+
+async def _lines(request: Request) -> AsyncIterator[str]:
+    # Тело читаем потоком по строкам, не держа файл целиком в памяти
+    tail = b""
+    async for chunk in request.stream():
+        *lines, tail = (tail + chunk).split(b"\n")
+        for line in lines:
+            yield line.decode("utf-8-sig").rstrip("\r")
+    if tail:
+        yield tail.decode("utf-8-sig").rstrip("\r")
+
+
+async def _ndjson_records(request: Request):
+    row_number = 0
+    async for line in _lines(request):
+        row_number += 1
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+        except ValueError as e:
+            yield row_number, f"invalid JSON: {e}"
+            continue
+        yield row_number, data if isinstance(data, dict) else "row must be a JSON object"
+
+
+async def _csv_records(request: Request):
+    header: Optional[list[str]] = None
+    pending: list[str] = []
+    row_number = 0
+    async for line in _lines(request):
+        # Поле в кавычках может содержать перевод строки: копим строки до чётного числа кавычек
+        pending.append(line)
+        record = "\n".join(pending)
+        if record.count('"') % 2:
+            continue
+        pending = []
+        if not record.strip():
+            continue
+        values = next(csv.reader([record]))
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        row_number += 1
+        if len(values) != len(header):
+            yield row_number, f"expected {len(header)} columns, got {len(values)}"
+            continue
+        yield row_number, {name: (value if value != "" else None) for name, value in zip(header, values)}
+    if pending:
+        yield row_number + 1, "unterminated quoted field"
+
+
+async def _upsert_batch(db: AsyncSession, batch, key: ImportKey, report: ImportReport) -> None:
+    """Одна транзакция на пачку: два запроса на чтение, один INSERT и один UPDATE (executemany)"""
+    key_column = Item.sku if key == "sku" else Item.title
+
+    rows: dict[str, tuple[int, dict]] = {}
+    for row_number, item in batch:
+        data = item.model_dump(exclude_none=True)
+        if data.get(key) is None:
+            report.error(row_number, f"{key} is required to match existing items")
+            continue
+        rows[data[key]] = (row_number, data)  # Повтор ключа в файле: побеждает последняя строка
+    if not rows:
+        return
+
+    category_ids = {data["category_id"] for _, data in rows.values()}
+    result = await db.execute(select(Category.id).where(Category.id.in_(category_ids)))
+    known_categories = set(result.scalars().all())
+
+    result = await db.execute(
+        select(key_column, func.min(Item.id), func.count(Item.id))
+        .where(key_column.in_(list(rows)))
+        .group_by(key_column)
+    )
+    existing = {value: (item_id, count) for value, item_id, count in result.all()}
+
+    inserts, updates, applied = [], [], []
+    for value, (row_number, data) in rows.items():
+        if data["category_id"] not in known_categories:
+            report.error(row_number, f"category_id: category {data['category_id']} does not exist")
+            continue
+        if value not in existing:
+            inserts.append(data)
+        elif existing[value][1] > 1:
+            report.error(row_number, f"{key}: matches {existing[value][1]} existing items")
+            continue
+        else:
+            updates.append({"id": existing[value][0], **data})
+        applied.append(row_number)
+
+    if not applied:
+        return
+    try:
+        if inserts:
+            await db.execute(insert(Item), inserts)
+        if updates:
+            await db.execute(update(Item), updates)
+            for row in updates:
+                track(db, row["id"], price=row.get("price"), stock=row.get("stock_quantity"))
+        await db.commit()
+    except Exception as e:
+        await db.rollback()
+        for row_number in applied:
+            report.error(row_number, f"batch failed: {e.__class__.__name__}")
+        return
+
+    report.inserted += len(inserts)
+    report.updated += len(updates)
+    # Обновлённые товары сбросил commit (track); новые меняют только списки
+    if inserts:
+        invalidate_items()
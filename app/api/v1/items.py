@@ -1,31 +1,161 @@
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from app.api.deps import get_db
+from sqlalchemy import select, tuple_
+from app.api.deps import catalog_fill_session, get_db, get_read_db
+from app.core.cache import catalog_cache, invalidate_items
+from app.core.etag import catalog_etag, not_modified, set_etag
+from app.core.live import track
+from app.core.pagination import decode_cursor, next_cursor
+from app.core.search import search_query
+from app.core.serialization import RawJSONResponse, dumps
 from app.models.item import Item
 from app.schemas.item import ItemCreate, ItemResponse
 
 router = APIRouter()
 
+ItemSort = Literal["id", "-id", "price", "-price"]
+
+# Быстрый путь чтения: выбираем ровно поля ItemResponse и сериализуем строки
+# сразу в байты, минуя ORM-объекты и повторную валидацию pydantic
+_ITEM_COLUMNS = [getattr(Item, name) for name in ItemResponse.model_fields]
+
 # POST /items — Добавление нового ноутбука [cite: 49]
 @router.post("/", response_model=ItemResponse)
 async def create_laptop(item_in: ItemCreate, db: AsyncSession = Depends(get_db)):
-    new_item = Item(**item_in.model_dump())
+    new_item = Item(**item_in.model_dump(exclude_none=True))
     db.add(new_item)
     await db.commit()
     await db.refresh(new_item)
+    invalidate_items()
     return new_item
 
 # GET /items — Получение списка ноутбуков с пагинацией и фильтрацией [cite: 49, 67, 72]
+# Без cursor работает старая skip/limit пагинация; следующий курсор отдаём в X-Next-Cursor
 @router.get("/", response_model=list[ItemResponse])
 async def read_laptops(
-    skip: int = 0, 
-    limit: int = 10, 
-    db: AsyncSession = Depends(get_db)
+    request: Request,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(10, ge=1, le=100),
+    cursor: Optional[str] = None,
+    category_id: Optional[int] = None,
+    min_price: Optional[float] = Query(None, ge=0),
+    max_price: Optional[float] = Query(None, ge=0),
+    sort: ItemSort = "id",
+    db: AsyncSession = Depends(get_read_db)
+):
+    cache_key = ("items", skip, limit, cursor, category_id, min_price, max_price, sort)
+    # ETag считаем до чтения: версия не может оказаться новее отданных данных
+    etag = catalog_etag(*cache_key)
+    if (cached_response := not_modified(request, etag)) is not None:
+        return cached_response
+
+    cached = catalog_cache.get(cache_key)
+    if cached is None:
+        version = catalog_cache.version("items")
+        async with catalog_fill_session(db, "items") as session:
+            cached = await _fetch_laptops(
+                session, skip, limit, cursor, category_id, min_price, max_price, sort
+            )
+        catalog_cache.set(cache_key, cached, version=version)
+
+    body, cursor_out = cached
+    response = RawJSONResponse(body)
+    set_etag(response, etag)
+    if cursor_out:
+        response.headers["X-Next-Cursor"] = cursor_out
+    return response
+
+
+async def _fetch_laptops(db, skip, limit, cursor, category_id, min_price, max_price, sort):
+    query = select(*_ITEM_COLUMNS)
+    if category_id is not None:
+        query = query.where(Item.category_id == category_id)
+    if min_price is not None:
+        query = query.where(Item.price >= min_price)
+    if max_price is not None:
+        query = query.where(Item.price <= max_price)
+
+    desc = sort.startswith("-")
+    by_price = sort.lstrip("-") == "price"
+    if cursor is not None:
+        key = decode_cursor(cursor, sort)
+        query = query.where(_after_key(key, by_price, desc))
+    elif skip:
+        query = query.offset(skip) # Limit/offset пагинация [cite: 68]
+
+    if by_price:
+        order = (Item.price.desc(), Item.id.desc()) if desc else (Item.price, Item.id)
+    else:
+        order = (Item.id.desc(),) if desc else (Item.id,)
+    result = await db.execute(query.order_by(*order).limit(limit))
+    rows = result.all()
+
+    cursor_out = next_cursor(
+        rows, limit, sort,
+        lambda row: [row.price, row.id] if by_price else [row.id],
+    )
+    # В кэш кладём уже сериализованное тело: попадание в кэш — просто отдача байтов
+    return _items_json(rows), cursor_out
+
+
+def _items_json(rows) -> bytes:
+    return dumps([row._asdict() for row in rows])
+
+
+def _after_key(key: list, by_price: bool, desc: bool):
+    # Условие "строго после ключа" в порядке сортировки (price, id) или (id)
+    try:
+        if by_price:
+            price, last_id = float(key[0]), int(key[1])
+        else:
+            price, last_id = None, int(key[0])
+    except (IndexError, TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    if not by_price:
+        return Item.id < last_id if desc else Item.id > last_id
+    # Сравнение строк (price, id) > (:price, :id) планировщик превращает в поиск
+    # по ix_items_price_id; раскрытие через OR/AND читало бы индекс целиком
+    key_columns, key_values = tuple_(Item.price, Item.id), tuple_(price, last_id)
+    return key_columns < key_values if desc else key_columns > key_values
+
+# GET /items/search — Полнотекстовый поиск с ранжированием (title важнее description)
+@router.get("/search", response_model=list[ItemResponse])
+async def search_laptops(
+    q: str = Query(..., min_length=1, max_length=200),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(10, ge=1, le=100),
+    db: AsyncSession = Depends(get_read_db)
 ):
-    query = select(Item).offset(skip).limit(limit) # Limit/offset пагинация [cite: 68]
-    result = await db.execute(query)
-    return result.scalars().all()
+    query = search_query(db.bind.dialect.name, q)
+    if query is None:
+        return []
+    query = query.with_only_columns(*_ITEM_COLUMNS)
+    result = await db.execute(query.offset(skip).limit(limit))
+    return RawJSONResponse(_items_json(result.all()))
+
+# GET /items/{item_id} — Карточка товара
+@router.get("/{item_id}", response_model=ItemResponse)
+async def read_laptop(item_id: int, request: Request, db: AsyncSession = Depends(get_read_db)):
+    cache_key = ("item", item_id)
+    etag = catalog_etag(*cache_key)
+    if (cached_response := not_modified(request, etag)) is not None:
+        return cached_response
+
+    cached = catalog_cache.get(cache_key)
+    if cached is None:
+        version = catalog_cache.version("item")
+        async with catalog_fill_session(db, "item") as session:
+            result = await session.execute(select(*_ITEM_COLUMNS).where(Item.id == item_id))
+            row = result.first()
+        if row is None:
+            raise HTTPException(status_code=404, detail="Item not found")
+        cached = dumps(row._asdict())
+        catalog_cache.set(cache_key, cached, version=version)
+    response = RawJSONResponse(cached)
+    set_etag(response, etag)
+    return response
 
 # Удаление товара (доступно только админу или владельцу)
 @router.delete("/{item_id}")
@@ -37,6 +167,7 @@ async def delete_item(item_id: int, db: AsyncSession = Depends(get_db)):
     
     await db.delete(item)
     await db.commit()
+    invalidate_items(item_id)
     return {"message": "Deleted successfully"}
 
 # Обновление цены или описания
@@ -47,8 +178,11 @@ async def update_item(item_id: int, item_in: ItemCreate, db: AsyncSession = Depe
     if not item:
         raise HTTPException(status_code=404, detail="Item not found")
     
-    for key, value in item_in.model_dump().items():
+    # Необязательные поля (sku, stock_quantity), которых нет в запросе, не трогаем
+    for key, value in item_in.model_dump(exclude_none=True).items():
         setattr(item, key, value)
+    # Кэш каталога сбросит commit (см. app.core.live)
+    track(db, item.id, price=item.price, stock=item.stock_quantity)
     
     await db.commit()
     await db.refresh(item)
@@ -0,0 +1,49 @@
+import asyncio
+from typing import Optional
+
+from fastapi import APIRouter, Header
+from fastapi.responses import StreamingResponse
+
+from app.core.config import settings
+from app.core.live import KEEPALIVE, item_feed
+
+router = APIRouter()
+
+
+# GET /live/items — Изменения цен и остатков потоком Server-Sent Events вместо опроса GET /items.
+# EventSource при переподключении сам присылает Last-Event-ID и получает пропущенное;
+# событие reset означает, что продолжить нельзя и страницу каталога нужно перечитать
+@router.get("/items")
+async def live_items(
+    last_event_id: Optional[str] = None,
+    last_event_id_header: Optional[str] = Header(None, alias="Last-Event-ID"),
+):
+    resume_from = last_event_id_header or last_event_id
+
+    async def stream():
+        # Подписка живёт ровно столько, сколько генератор: если клиент ушёл
+        # до начала тела, генератор не запускался и подписки не было
+        listener, missed = item_feed.subscribe(resume_from)
+        try:
+            yield b"retry: 3000\n\n"
+            for frame in missed:
+                yield frame
+            while True:
+                try:
+                    frame = await asyncio.wait_for(
+                        listener.queue.get(), settings.LIVE_FEED_KEEPALIVE_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    yield KEEPALIVE
+                    continue
+                if frame is None:
+                    return  # Клиент отстал: переподключится и дочитает из истории
+                yield frame
+        finally:
+            item_feed.unsubscribe(listener)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
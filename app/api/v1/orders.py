@@ -1,26 +1,31 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, delete
-from typing import List, Optional
-from pydantic import BaseModel
+from sqlalchemy import select, delete, func, insert
+from sqlalchemy.orm import joinedload, selectinload
+from typing import List, Literal, Optional
+from pydantic import BaseModel, Field
 
-from app.api.deps import get_db, get_current_user
+from app.api.deps import CurrentUser, get_db, get_read_db, get_current_user
+from app.core.inventory import OutOfStock, checkout_stock
+from app.core.pagination import decode_cursor, next_cursor
+from app.core.serialization import FastJSONResponse
 from app.models.order import Order, OrderItem, CartItem
 from app.models.item import Item
-from app.models.user import User
 
 router = APIRouter()
 
 # ===== PYDANTIC SCHEMAS =====
 
+# price, total_price и status от клиента принимаются для совместимости, но не используются:
+# цены и сумма считаются на сервере, новый заказ всегда "pending"
 class OrderItemCreate(BaseModel):
     item_id: int
-    quantity: int
-    price: float
+    quantity: int = Field(..., gt=0)
+    price: Optional[float] = None
 
 class OrderCreate(BaseModel):
-    items: List[OrderItemCreate]
-    total_price: float
+    items: List[OrderItemCreate] = Field(..., max_length=1000)
+    total_price: Optional[float] = None
     delivery_address: str
     delivery_phone: str
     status: Optional[str] = "pending"
@@ -42,7 +47,7 @@ class OrderResponse(BaseModel):
 async def create_order(
     order_data: OrderCreate,
     db: AsyncSession = Depends(get_db),
-    user: User = Depends(get_current_user)
+    user: CurrentUser = Depends(get_current_user)
 ):
     """Создать новый заказ"""
     
@@ -52,28 +57,51 @@ async def create_order(
     if not order_data.delivery_address or not order_data.delivery_phone:
         raise HTTPException(status_code=400, detail="Требуется адрес доставки и телефон")
     
+    # Одинаковые товары в запросе складываем в одну строку заказа
+    quantities: dict[int, int] = {}
+    for line in order_data.items:
+        quantities[line.item_id] = quantities.get(line.item_id, 0) + line.quantity
+
     try:
+        # Все цены одним запросом
+        result = await db.execute(
+            select(Item.id, Item.price).where(Item.id.in_(list(quantities)))
+        )
+        prices = dict(result.all())
+        missing = sorted(set(quantities) - set(prices))
+        if missing:
+            await db.rollback()
+            raise HTTPException(status_code=400, detail=f"Товары не найдены: {missing}")
+
+        total_price = round(sum(prices[item_id] * qty for item_id, qty in quantities.items()), 2)
+
+        # Списываем остатки (с учётом резервов корзины) одним условным UPDATE
+        try:
+            await checkout_stock(db, user.id, quantities)
+        except OutOfStock as e:
+            await db.rollback()
+            raise HTTPException(status_code=409, detail=str(e))
+
         # Создаем заказ
-        new_order = Order(
-            user_id=user.id,
-            total_price=order_data.total_price,
-            delivery_address=order_data.delivery_address,
-            delivery_phone=order_data.delivery_phone,
-            status=order_data.status or "pending"
+        result = await db.execute(
+            insert(Order).values(
+                user_id=user.id,
+                total_price=total_price,
+                delivery_address=order_data.delivery_address,
+                delivery_phone=order_data.delivery_phone,
+                status="pending",
+            ).returning(Order.id)
         )
-        db.add(new_order)
-        await db.flush()  # Получить ID заказа
-        
-        # Добавляем товары в заказ
-        for item_data in order_data.items:
-            order_item = OrderItem(
-                order_id=new_order.id,
-                item_id=item_data.item_id,
-                quantity=item_data.quantity,
-                price=item_data.price
-            )
-            db.add(order_item)
-        
+        order_id = result.scalar_one()
+
+        # Все строки заказа одним INSERT ... VALUES (...), (...)
+        await db.execute(
+            insert(OrderItem).values([
+                {"order_id": order_id, "item_id": item_id, "quantity": qty, "price": prices[item_id]}
+                for item_id, qty in quantities.items()
+            ])
+        )
+
         # Очищаем корзину пользователя
         await db.execute(delete(CartItem).where(CartItem.user_id == user.id))
         
@@ -81,47 +109,90 @@ async def create_order(
         
         return {
             "message": "Заказ успешно создан",
-            "order_id": new_order.id,
+            "order_id": order_id,
+            "total_price": total_price,
             "status": "success"
         }
-    
+
+    except HTTPException:
+        raise
     except Exception as e:
         await db.rollback()
         raise HTTPException(status_code=500, detail=f"Ошибка создания заказа: {str(e)}")
 
+ORDER_LIMIT = Query(20, ge=1, le=100)
+
+async def _orders_page(
+    db: AsyncSession, user_id: int, limit: int, cursor: Optional[str], include: Optional[str]
+):
+    """Страница заказов от новых к старым по индексу (user_id, id).
+
+    С include=items строки подгружаются selectinload — всего два запроса на страницу.
+    """
+    query = select(Order).where(Order.user_id == user_id)
+    if cursor is not None:
+        try:
+            (last_id,) = decode_cursor(cursor, "orders")
+            last_id = int(last_id)
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query = query.where(Order.id < last_id)
+    if include == "items":
+        query = query.options(selectinload(Order.items))
+    result = await db.execute(query.order_by(Order.id.desc()).limit(limit))
+    orders = result.scalars().all()
+    return orders, next_cursor(orders, limit, "orders", lambda order: [order.id])
+
+def _order_lines(order: Order) -> list[dict]:
+    return [
+        {
+            "item_id": item.item_id,
+            "quantity": item.quantity,
+            "price": item.price
+        }
+        for item in order.items
+    ]
+
 @router.get("/")
 async def get_user_orders(
-    db: AsyncSession = Depends(get_db),
-    user: User = Depends(get_current_user)
+    limit: int = ORDER_LIMIT,
+    cursor: Optional[str] = None,
+    include: Optional[Literal["items"]] = None,
+    db: AsyncSession = Depends(get_read_db),
+    user: CurrentUser = Depends(get_current_user)
 ):
-    """Получить все заказы пользователя"""
+    """Получить заказы пользователя (постранично, следующий курсор — в X-Next-Cursor)"""
     
-    result = await db.execute(
-        select(Order).where(Order.user_id == user.id)
-    )
-    orders = result.scalars().all()
+    orders, cursor_out = await _orders_page(db, user.id, limit, cursor, include)
+    headers = {"X-Next-Cursor": cursor_out} if cursor_out else None
     
-    return [
+    # Данные собраны из колонок БД — отдаём их сериализатору без jsonable_encoder
+    return FastJSONResponse([
         {
             "id": order.id,
             "user_id": order.user_id,
             "total_price": order.total_price,
             "delivery_address": order.delivery_address,
             "delivery_phone": order.delivery_phone,
-            "status": order.status
+            "status": order.status,
+            **({"items": _order_lines(order)} if include == "items" else {}),
         }
         for order in orders
-    ]
+    ], headers=headers)
 
 @router.get("/{order_id}")
 async def get_order_detail(
     order_id: int,
-    db: AsyncSession = Depends(get_db),
-    user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_read_db),
+    user: CurrentUser = Depends(get_current_user)
 ):
     """Получить детали конкретного заказа"""
     
-    order = await db.get(Order, order_id)
+    # Заказ и его строки одним запросом
+    result = await db.execute(
+        select(Order).options(joinedload(Order.items)).where(Order.id == order_id)
+    )
+    order = result.unique().scalar_one_or_none()
     
     if not order:
         raise HTTPException(status_code=404, detail="Заказ не найден")
@@ -129,12 +200,6 @@ async def get_order_detail(
     if order.user_id != user.id:
         raise HTTPException(status_code=403, detail="Доступ запрещен")
     
-    # Получаем товары из заказа
-    result = await db.execute(
-        select(OrderItem).where(OrderItem.order_id == order_id)
-    )
-    items = result.scalars().all()
-    
     return {
         "id": order.id,
         "user_id": order.user_id,
@@ -142,37 +207,38 @@ async def get_order_detail(
         "delivery_address": order.delivery_address,
         "delivery_phone": order.delivery_phone,
         "status": order.status,
-        "items": [
-            {
-                "item_id": item.item_id,
-                "quantity": item.quantity,
-                "price": item.price
-            }
-            for item in items
-        ]
+        "items": _order_lines(order)
     }
 
 @router.get("/history/all")
 async def get_order_history(
-    db: AsyncSession = Depends(get_db),
-    user: User = Depends(get_current_user)
+    limit: int = ORDER_LIMIT,
+    cursor: Optional[str] = None,
+    include: Optional[Literal["items"]] = None,
+    db: AsyncSession = Depends(get_read_db),
+    user: CurrentUser = Depends(get_current_user)
 ):
-    """Получить историю заказов пользователя"""
+    """Получить историю заказов пользователя (постранично, следующий курсор — в X-Next-Cursor).
+
+    total — число всех заказов пользователя, а не строк на странице.
+    """
     
-    result = await db.execute(
-        select(Order).where(Order.user_id == user.id).order_by(Order.id.desc())
-    )
-    orders = result.scalars().all()
+    orders, cursor_out = await _orders_page(db, user.id, limit, cursor, include)
+    # total — третий запрос на страницу (у GET /orders/ их два): цена за поле, которое
+    # клиенты истории получали всегда. COUNT идёт по индексу ix_orders_user_id_id
+    total = await db.scalar(select(func.count()).select_from(Order).where(Order.user_id == user.id))
+    headers = {"X-Next-Cursor": cursor_out} if cursor_out else None
     
-    return {
-        "total": len(orders),
+    return FastJSONResponse({
+        "total": total,
         "orders": [
             {
                 "id": order.id,
                 "total_price": order.total_price,
                 "status": order.status,
-                "address": order.delivery_address
+                "address": order.delivery_address,
+                **({"items": _order_lines(order)} if include == "items" else {}),
             }
             for order in orders
         ]
-    }
\ No newline at end of file
+    }, headers=headers)
@@ -0,0 +1,305 @@
+import asyncio
+import json
+from typing import Callable, Hashable, Optional
+
+from app.core.config import settings
+from app.core.logging import logger
+from app.core.serialization import dumps
+
+# Брокер публикаций по комнатам для чата и живых событий. Публикация только
+# кладёт сообщение в пакет комнаты; раз в BROKER_BATCH_SECONDS (или при
+# BROKER_MAX_BATCH сообщениях) пакет уходит локальным подписчикам и транспорту.
+# Сообщения с одинаковым key внутри пакета схлопываются: остаётся последнее,
+# а если публикующий передал merge — результат merge(прежнее, новое).
+#
+# MemoryBroker — один процесс. RelayBroker — несколько воркеров через процесс-
+# ретранслятор на Unix-сокете (python -m app.core.broker): воркер подписывается в
+# ретрансляторе только на комнаты, где у него есть локальные подписчики, и получает
+# пакеты других воркеров только по ним. Доставка «не более одного раза»: пока связи
+# с ретранслятором нет, пакеты для других воркеров теряются.
+
+Handler = Callable[[str, list[str]], None]
+
+# Пакет может быть большим, а кадры протокола — строки JSON
+FRAME_LIMIT = 16 * 1024 * 1024
+
+
+class Broker:
+    """Подписки и пакетирование по комнатам; транспорт между воркерами — в наследниках"""
+
+    def __init__(self, batch_seconds: Optional[float] = None, max_batch: Optional[int] = None):
+        self.batch_seconds = settings.BROKER_BATCH_SECONDS if batch_seconds is None else batch_seconds
+        self.max_batch = settings.BROKER_MAX_BATCH if max_batch is None else max_batch
+        self.handlers: dict[str, set[Handler]] = {}
+        # Вызываются после восстановления связи, если сообщения могли потеряться
+        self.resync_handlers: list[Callable[[], None]] = []
+        self._pending: dict[str, dict[Hashable, str]] = {}
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._flush_loop: Optional[asyncio.AbstractEventLoop] = None
+        self.published = 0
+        self.coalesced = 0
+        self.batches_out = 0
+        self.batches_in = 0
+
+    async def start(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        self.flush()
+
+    def subscribe(self, room: str, handler: Handler) -> None:
+        handlers = self.handlers.get(room)
+        if handlers is None:
+            handlers = self.handlers[room] = set()
+            self._room_opened(room)
+        handlers.add(handler)
+
+    def unsubscribe(self, room: str, handler: Handler) -> None:
+        handlers = self.handlers.get(room)
+        if handlers is None:
+            return
+        handlers.discard(handler)
+        if not handlers:
+            del self.handlers[room]
+            self._room_closed(room)
+
+    def publish(
+        self, room: str, message: str, key: Optional[Hashable] = None,
+        merge: Optional[Callable[[str, str], str]] = None,
+    ) -> None:
+        """Добавить сообщение в пакет комнаты; key — схлопывать с предыдущим с тем же key"""
+        pending = self._pending.setdefault(room, {})
+        if key is None:
+            key = object()
+        elif key in pending:
+            # Переставляем в конец: новое значение должно прийти после остальных
+            previous = pending.pop(key)
+            if merge is not None:
+                message = merge(previous, message)
+            self.coalesced += 1
+        pending[key] = message
+        self.published += 1
+        if len(pending) >= self.max_batch:
+            self._dispatch(room, list(self._pending.pop(room).values()))
+        else:
+            self._schedule_flush()
+
+    def _schedule_flush(self) -> None:
+        # Таймер из другого (уже остановленного) event loop не сработает: заводим заново
+        loop = asyncio.get_running_loop()
+        if self._flush_handle is None or self._flush_loop is not loop:
+            self._flush_handle = loop.call_later(self.batch_seconds, self.flush)
+            self._flush_loop = loop
+
+    def flush(self) -> None:
+        """Отправить все накопленные пакеты сейчас"""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        pending, self._pending = self._pending, {}
+        for room, messages in pending.items():
+            self._dispatch(room, list(messages.values()))
+
+    def _dispatch(self, room: str, messages: list[str]) -> None:
+        self.batches_out += 1
+        self.deliver(room, messages)
+        self._send(room, messages)
+
+    def deliver(self, room: str, messages: list[str]) -> None:
+        """Отдать пакет локальным подписчикам комнаты"""
+        for handler in list(self.handlers.get(room, ())):
+            try:
+                handler(room, messages)
+            except Exception as e:
+                logger.warning("broker_handler_failed", room=room, error=str(e))
+
+    # Транспорт между воркерами: у MemoryBroker его нет
+    def _room_opened(self, room: str) -> None:
+        pass
+
+    def _room_closed(self, room: str) -> None:
+        pass
+
+    def _send(self, room: str, messages: list[str]) -> None:
+        pass
+
+    def stats(self) -> dict:
+        return {
+            "rooms": len(self.handlers),
+            "published": self.published,
+            "coalesced": self.coalesced,
+            "batches_out": self.batches_out,
+            "batches_in": self.batches_in,
+        }
+
+
+class MemoryBroker(Broker):
+    """Брокер одного процесса: пакеты доставляются только локальным подписчикам"""
+
+
+class RelayBroker(Broker):
+    """Брокер нескольких воркеров через ретранслятор на Unix-сокете"""
+
+    def __init__(self, path: str, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self.dropped = 0
+        self.reconnects = 0
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        """Подключиться к ретранслятору; если он недоступен, переподключение идёт в фоне"""
+        connection = await self._connect()
+        self._task = asyncio.create_task(self._run(connection))
+
+    async def close(self) -> None:
+        await super().close()
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    @property
+    def connected(self) -> bool:
+        return self._writer is not None
+
+    async def _connect(self):
+        try:
+            reader, writer = await asyncio.open_unix_connection(self.path, limit=FRAME_LIMIT)
+        except OSError as e:
+            logger.warning("broker_relay_unavailable", path=self.path, error=str(e))
+            return None
+        self._writer = writer
+        # После (пере)подключения ретранслятор ничего о нас не знает
+        for room in self.handlers:
+            self._write({"op": "sub", "room": room})
+        if self.reconnects or self.dropped:
+            for handler in list(self.resync_handlers):
+                handler()
+        return reader, writer
+
+    async def _run(self, connection) -> None:
+        delay = 0.1
+        while True:
+            if connection is None:
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 5.0)
+                connection = await self._connect()
+                continue
+            delay = 0.1
+            reader, writer = connection
+            try:
+                async for line in reader:
+                    frame = json.loads(line)
+                    self.batches_in += 1
+                    self.deliver(frame["room"], frame["messages"])
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning("broker_relay_failed", error=str(e))
+            finally:
+                self._writer = None
+                writer.close()
+            self.reconnects += 1
+            connection = None
+
+    def _write(self, frame: dict) -> None:
+        if self._writer is None:
+            self.dropped += 1
+            return
+        self._writer.write(dumps(frame) + b"\n")
+
+    def _room_opened(self, room: str) -> None:
+        self._write({"op": "sub", "room": room})
+
+    def _room_closed(self, room: str) -> None:
+        self._write({"op": "unsub", "room": room})
+
+    def _send(self, room: str, messages: list[str]) -> None:
+        self._write({"op": "pub", "room": room, "messages": messages})
+
+    def stats(self) -> dict:
+        return {
+            **super().stats(),
+            "connected": int(self.connected),
+            "dropped": self.dropped,
+            "reconnects": self.reconnects,
+        }
+
+
+class Relay:
+    """Ретранслятор: пересылает пакет тем воркерам, что подписаны на его комнату"""
+
+    def __init__(self, max_buffer: int = FRAME_LIMIT):
+        self.max_buffer = max_buffer
+        self.rooms: dict[str, set[asyncio.StreamWriter]] = {}
+        self.forwarded = 0
+        self.dropped = 0
+
+    async def serve(self, path: str) -> asyncio.AbstractServer:
+        return await asyncio.start_unix_server(self.handle, path, limit=FRAME_LIMIT)
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        subscribed: set[str] = set()
+        try:
+            async for line in reader:
+                frame = json.loads(line)
+                op, room = frame["op"], frame["room"]
+                if op == "sub":
+                    self.rooms.setdefault(room, set()).add(writer)
+                    subscribed.add(room)
+                elif op == "unsub":
+                    self._leave(room, writer)
+                    subscribed.discard(room)
+                elif op == "pub":
+                    self._forward(room, line, writer)
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning("relay_peer_failed", error=str(e))
+        finally:
+            for room in subscribed:
+                self._leave(room, writer)
+            writer.close()
+
+    def _forward(self, room: str, line: bytes, sender: asyncio.StreamWriter) -> None:
+        # Строку пересылаем как есть, без повторной сериализации
+        for peer in self.rooms.get(room, ()):
+            if peer is sender:
+                continue
+            if peer.transport.get_write_buffer_size() > self.max_buffer:
+                self.dropped += 1  # Воркер не успевает читать: не копим память ретранслятора
+                continue
+            peer.write(line)
+            self.forwarded += 1
+
+    def _leave(self, room: str, writer: asyncio.StreamWriter) -> None:
+        peers = self.rooms.get(room)
+        if peers is not None:
+            peers.discard(writer)
+            if not peers:
+                del self.rooms[room]
+
+
+async def run_relay(path: str) -> None:
+    server = await Relay().serve(path)
+    logger.info("relay_started", path=path)
+    async with server:
+        await server.serve_forever()
+
+
+def create_broker_from_settings() -> Broker:
+    if settings.BROKER == "relay":
+        return RelayBroker(settings.BROKER_RELAY_PATH)
+    return MemoryBroker()
+
+
+# Брокер процесса: чат и живые события публикуют через него
+broker = create_broker_from_settings()
+
+
+if __name__ == "__main__":
+    from app.core.logging import setup_logging
+
+    setup_logging()
+    asyncio.run(run_relay(settings.BROKER_RELAY_PATH))
@@ -0,0 +1,170 @@
+import json
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+from app.core.broker import Broker, broker
+from app.core.config import settings
+from app.core.serialization import dumps
+
+_MISSING = object()
+
+
+def _namespace(key: Hashable):
+    return key[0] if isinstance(key, tuple) else None
+
+
+class TTLCache:
+    """Ограниченный LRU-кэш с TTL и счётчиками попаданий/промахов/вытеснений.
+
+    Ключи — кортежи, первый элемент которых задаёт пространство имён
+    (например ("items", ...)), чтобы можно было сбрасывать их группой.
+    У каждого пространства есть версия, которая растёт при инвалидации:
+    значение, прочитанное из БД до записи, не попадёт в кэш после неё.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._versions: dict[str, int] = {}
+        self._bumped_at: dict[str, float] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def version(self, namespace: str) -> int:
+        return self._versions.get(namespace, 0)
+
+    def recently_bumped(self, namespace: str, seconds: float) -> bool:
+        """Версия пространства менялась не больше seconds назад"""
+        bumped_at = self._bumped_at.get(namespace)
+        return bumped_at is not None and time.monotonic() - bumped_at <= seconds
+
+    def set(
+        self, key: Hashable, value: Any, ttl: Optional[float] = None, version: Optional[int] = None
+    ) -> None:
+        if self.maxsize <= 0:
+            return
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            if version is not None and version != self._versions.get(_namespace(key), 0):
+                return
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key: Hashable) -> None:
+        with self._lock:
+            self._bump(_namespace(key))
+            self._data.pop(key, None)
+
+    def invalidate_namespace(self, namespace: str) -> None:
+        with self._lock:
+            self._bump(namespace)
+            for key in [k for k in self._data if isinstance(k, tuple) and k[0] == namespace]:
+                del self._data[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            for namespace in list(self._versions):
+                self._bump(namespace)
+            self._data.clear()
+
+    def _bump(self, namespace) -> None:
+        self._versions[namespace] = self._versions.get(namespace, 0) + 1
+        self._bumped_at[namespace] = time.monotonic()
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+# Кэш каталога: списки товаров ("items", ...), товар ("item", id), категории ("categories",)
+catalog_cache = TTLCache(settings.CATALOG_CACHE_MAXSIZE, settings.CATALOG_CACHE_TTL)
+
+
+# Кэш и версии живут в памяти каждого воркера: инвалидация сначала применяется
+# локально, затем рассылается через брокер, и остальные воркеры сбрасывают свои копии
+# и поднимают версии (а с ними и ETag). Своё сообщение воркер узнаёт по метке процесса.
+# Пока связи с ретранслятором не было, сообщения могли потеряться в обе стороны,
+# поэтому после переподключения воркер сбрасывает весь каталог у себя и у остальных
+INVALIDATION_ROOM = "catalog:invalidate"
+CATALOG_NAMESPACES = ("items", "item", "categories")
+_ORIGIN = secrets.token_hex(4)
+
+
+def invalidate_items(*item_ids: int) -> None:
+    _invalidate("items", item_ids)
+    _broadcast("items", item_ids)
+
+
+def invalidate_categories() -> None:
+    _invalidate("categories", ())
+    _broadcast("categories", ())
+
+
+def _invalidate(namespace: str, item_ids) -> None:
+    if namespace == "*":
+        for name in CATALOG_NAMESPACES:
+            catalog_cache.invalidate_namespace(name)
+        return
+    catalog_cache.invalidate_namespace(namespace)
+    for item_id in item_ids:
+        catalog_cache.pop(("item", item_id))
+
+
+def _broadcast(namespace: str, item_ids) -> None:
+    message = {"origin": _ORIGIN, "namespace": namespace, "ids": list(item_ids)}
+    broker.publish(INVALIDATION_ROOM, dumps(message).decode())
+
+
+def _on_invalidation(room: str, messages: list[str]) -> None:
+    for message in messages:
+        data = json.loads(message)
+        if data["origin"] != _ORIGIN:
+            _invalidate(data["namespace"], data["ids"])
+
+
+def _resync() -> None:
+    _invalidate("*", ())
+    _broadcast("*", ())
+
+
+def start_invalidation(broker: Broker) -> None:
+    broker.subscribe(INVALIDATION_ROOM, _on_invalidation)
+    broker.resync_handlers.append(_resync)
+
+
+def stop_invalidation(broker: Broker) -> None:
+    broker.unsubscribe(INVALIDATION_ROOM, _on_invalidation)
+    if _resync in broker.resync_handlers:
+        broker.resync_handlers.remove(_resync)
@@ -0,0 +1,250 @@
+import time
+import zlib
+from typing import Callable, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from app.core.config import settings
+from app.core.etag import coding_etag, etag_matches, with_base_tags
+from app.core.metrics import Histogram, _format_value, _histogram_lines, _labels, _route_of
+from app.core.static import negotiate
+
+try:
+    import brotli
+except ImportError:  # brotli необязателен
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # zstandard необязателен
+    zstandard = None
+
+# Сжатие ответов API по Accept-Encoding. Ответ целиком сжимается, только если он
+# не меньше COMPRESSION_MIN_SIZE байт (меньшие дешевле отдать как есть), потоковые
+# ответы — по кускам с flush после каждого, чтобы клиент получал строки сразу.
+# Уже сжатые форматы, ответы с Content-Encoding, Cache-Control: no-transform
+# и SSE не трогаем. Из кодирований с одинаковым q выбираем zstd, затем br, затем gzip:
+# zstd и brotli на низких уровнях жмут лучше gzip при меньших затратах CPU.
+
+SKIP_TYPES = (
+    "image/", "video/", "audio/", "font/woff", "text/event-stream",
+    "application/zip", "application/gzip", "application/x-gzip", "application/zstd",
+    "application/octet-stream",
+)
+RATIO_BUCKETS = (0.05, 0.1, 0.2, 0.3, 0.5, 0.7, 0.9, 1.0)
+
+# Кодировщик: (сжать кусок, flush после куска, завершить поток)
+Encoder = tuple[Callable[[bytes], bytes], Callable[[], bytes], Callable[[], bytes]]
+
+
+def _zstd() -> Encoder:
+    compressor = zstandard.ZstdCompressor(level=settings.COMPRESSION_ZSTD_LEVEL).compressobj()
+    return (
+        compressor.compress,
+        lambda: compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK),
+        compressor.flush,
+    )
+
+
+def _brotli() -> Encoder:
+    compressor = brotli.Compressor(quality=settings.COMPRESSION_BROTLI_QUALITY)
+    return compressor.process, compressor.flush, compressor.finish
+
+
+def _gzip() -> Encoder:
+    compressor = zlib.compressobj(settings.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31)
+    return compressor.compress, lambda: compressor.flush(zlib.Z_SYNC_FLUSH), compressor.flush
+
+
+ENCODERS: dict[str, Callable[[], Encoder]] = {
+    name: factory
+    for name, factory, module in (("zstd", _zstd, zstandard), ("br", _brotli, brotli), ("gzip", _gzip, zlib))
+    if module is not None
+}
+
+
+class CompressionMetrics:
+    """Байты до и после сжатия, CPU на сжатие и степень сжатия по маршрутам"""
+
+    def __init__(self):
+        self.responses: dict[tuple[str, str, str], int] = {}
+        self.bytes_in: dict[tuple[str, str, str], int] = {}
+        self.bytes_out: dict[tuple[str, str, str], int] = {}
+        self.cpu: dict[tuple[str, str, str], float] = {}
+        self.ratio: dict[tuple[str, str], Histogram] = {}
+        self.skipped: dict[str, int] = {}
+
+    def observe(self, method: str, route: str, encoding: str, size: int, compressed: int, cpu: float) -> None:
+        key = (method, route, encoding)
+        self.responses[key] = self.responses.get(key, 0) + 1
+        self.bytes_in[key] = self.bytes_in.get(key, 0) + size
+        self.bytes_out[key] = self.bytes_out.get(key, 0) + compressed
+        self.cpu[key] = self.cpu.get(key, 0.0) + cpu
+        histogram = self.ratio.get((method, route))
+        if histogram is None:
+            histogram = self.ratio[(method, route)] = Histogram(RATIO_BUCKETS)
+        histogram.observe(compressed / size if size else 1.0)
+
+    def skip(self, reason: str) -> None:
+        self.skipped[reason] = self.skipped.get(reason, 0) + 1
+
+    def reset(self) -> None:
+        for series in (self.responses, self.bytes_in, self.bytes_out, self.cpu, self.ratio, self.skipped):
+            series.clear()
+
+    def render(self) -> list[str]:
+        lines = []
+        for name, help_text, series in (
+            ("http_compressed_responses_total", "Сжатые ответы", self.responses),
+            ("http_compression_bytes_in_total", "Байт тела до сжатия", self.bytes_in),
+            ("http_compression_bytes_out_total", "Байт тела после сжатия", self.bytes_out),
+            ("http_compression_cpu_seconds_total", "CPU на сжатие ответов", self.cpu),
+        ):
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+            for (method, route, encoding), value in sorted(series.items()):
+                labels = _labels(method=method, route=route, encoding=encoding)
+                lines.append(f"{name}{labels} {_format_value(value)}")
+        lines += _histogram_lines("http_compression_ratio", "Размер после сжатия к исходному", self.ratio)
+        lines += [
+            "# HELP http_compression_skipped_total Ответы, отданные без сжатия, по причине",
+            "# TYPE http_compression_skipped_total counter",
+        ]
+        for reason, count in sorted(self.skipped.items()):
+            lines.append(f"http_compression_skipped_total{_labels(reason=reason)} {count}")
+        return lines
+
+
+compression_metrics = CompressionMetrics()
+
+
+class CompressionMiddleware:
+    """Чистый ASGI-middleware: gzip/br/zstd для ответов от min_size байт и потоков"""
+
+    def __init__(
+        self, app, min_size: Optional[int] = None, metrics: CompressionMetrics = compression_metrics,
+    ):
+        self.app = app
+        self.min_size = settings.COMPRESSION_MIN_SIZE if min_size is None else min_size
+        self.metrics = metrics
+        self.preference = tuple(ENCODERS)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(
+            Headers(scope=scope).get("accept-encoding", ""), ENCODERS, self.preference
+        )
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        # Эндпоинт, который сжимаем мы, знает только свой тег: к "abc-gz" клиента добавляем
+        # "abc", а в 304 возвращаем тег, который прислал клиент. Исходные теги остаются:
+        # фронтенд сам отдаёт заранее сжатые файлы и сверяет их теги со своими ("abc-gz")
+        if_none_match = Headers(scope=scope).get("if-none-match")
+        if if_none_match:
+            scope = dict(scope)
+            scope["headers"] = [
+                (name, value) for name, value in scope["headers"] if name != b"if-none-match"
+            ] + [(b"if-none-match", with_base_tags(if_none_match, encoding).encode("latin-1"))]
+
+        start = None
+        encoder: Optional[Encoder] = None
+        passthrough = False
+        size = compressed = 0
+        cpu = 0.0
+
+        def finish() -> None:
+            self.metrics.observe(scope["method"], _route_of(scope), encoding, size, compressed, cpu)
+
+        async def send_wrapper(message):
+            nonlocal start, encoder, passthrough, size, compressed, cpu
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if passthrough or message["type"] != "http.response.body":
+                if start is not None:
+                    await send(start)
+                    start = None
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if start is not None:
+                # Первый кусок тела: решаем, сжимать ли ответ
+                headers = MutableHeaders(scope=start)
+                reason = self._skip_reason(start["status"], headers, body, more_body)
+                if reason is not None:
+                    self.metrics.skip(reason)
+                    if reason == "small":
+                        headers.add_vary_header("Accept-Encoding")
+                    elif start["status"] == 304 and "etag" in headers:
+                        headers.add_vary_header("Accept-Encoding")
+                        if etag_matches(if_none_match, coding_etag(headers["etag"], encoding)):
+                            headers["ETag"] = coding_etag(headers["etag"], encoding)
+                    passthrough = True
+                    await send(start)
+                    start = None
+                    await send(message)
+                    return
+                encoder = ENCODERS[encoding]()
+                if not more_body:
+                    started = time.thread_time()
+                    out = encoder[0](body) + encoder[2]()
+                    cpu = time.thread_time() - started
+                    if len(out) >= len(body):
+                        self.metrics.skip("incompressible")
+                        headers.add_vary_header("Accept-Encoding")
+                        passthrough = True
+                        await send(start)
+                        await send(message)
+                        return
+                    size, compressed = len(body), len(out)
+                    _mark_encoded(headers, encoding)
+                    headers["Content-Length"] = str(len(out))
+                    await send(start)
+                    await send({"type": "http.response.body", "body": out})
+                    finish()
+                    return
+                _mark_encoded(headers, encoding)
+                del headers["Content-Length"]
+                await send(start)
+                start = None
+
+            # Потоковый ответ: сжимаем кусок и сразу отдаём то, что получилось
+            compress, flush, end = encoder
+            started = time.thread_time()
+            out = compress(body) + (flush() if more_body else end())
+            cpu += time.thread_time() - started
+            size += len(body)
+            compressed += len(out)
+            await send({"type": "http.response.body", "body": out, "more_body": more_body})
+            if not more_body:
+                finish()
+
+        await self.app(scope, receive, send_wrapper)
+
+    def _skip_reason(self, status: int, headers: MutableHeaders, body: bytes, more_body: bool) -> Optional[str]:
+        if status < 200 or status in (204, 304):
+            return "status"
+        if "content-encoding" in headers:
+            return "encoded"
+        if "no-transform" in headers.get("cache-control", ""):
+            return "no_transform"
+        if headers.get("content-type", "").startswith(SKIP_TYPES):
+            return "type"
+        # У потока размер известен только по Content-Length; без него сжимаем
+        length = int(headers.get("content-length") or (-1 if more_body else len(body)))
+        if 0 <= length < self.min_size:
+            return "small"
+        return None
+
+
+def _mark_encoded(headers: MutableHeaders, encoding: str) -> None:
+    headers["Content-Encoding"] = encoding
+    # Сжатое тело — отдельное представление со своим тегом: "abc" -> "abc-gz"
+    if "etag" in headers:
+        headers["ETag"] = coding_etag(headers["etag"], encoding)
+    headers.add_vary_header("Accept-Encoding")
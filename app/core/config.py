@@ -1,3 +1,4 @@
+from typing import Literal
 from pydantic_settings import BaseSettings
 import os
 
@@ -8,10 +9,111 @@ class Settings(BaseSettings):
     SECRET_KEY: str = "super_secret_key_change_me_in_production"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+
+    # bcrypt: стоимость и пул потоков для хеширования (запросы сверх очереди получают 503)
+    BCRYPT_ROUNDS: int = 12
+    HASH_POOL_WORKERS: int = 4
+    HASH_POOL_QUEUE: int = 64
+
+    # Кэш проверенных JWT (попадание пропускает проверку подписи)
+    TOKEN_CACHE_ENABLED: bool = True
+    TOKEN_CACHE_MAXSIZE: int = 10000
     
     # Настройки базы данных (Занятие 3)
     DATABASE_URL: str = "sqlite+aiosqlite:///./test.db"
 
+    # Профиль движка БД. SQL в лог — только для отладки: синхронный вывод тормозит прод
+    DB_ECHO: bool = False
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_QUERY_CACHE_SIZE: int = 1000 # Кэш скомпилированных SQL в SQLAlchemy
+    DB_STATEMENT_CACHE_SIZE: int = 500 # Кэш prepared statements asyncpg
+
+    # Реплики только для чтения и закрепление пользователя за основной БД после записи
+    DATABASE_REPLICA_URLS: list[str] = []
+    REPLICA_SELECTION: Literal["round_robin", "least_connections"] = "round_robin"
+    READ_YOUR_WRITES_SECONDS: float = 5.0
+
+    # PRAGMA для SQLite, выставляются на каждое новое соединение
+    SQLITE_JOURNAL_MODE: str = "WAL"
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_MMAP_SIZE: int = 256 * 1024 * 1024
+    SQLITE_CACHE_SIZE: int = -64 * 1024 # Отрицательное значение — в КиБ (64 МиБ)
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+
+    # Логи и метрики: уровень structlog, сбор метрик в ASGI-слое и порог медленного запроса
+    LOG_LEVEL: str = "INFO"
+    METRICS_ENABLED: bool = True
+    SLOW_REQUEST_SECONDS: float = 1.0
+
+    # Учёт SQL: медленные запросы в лог, N+1 — одна форма выражения чаще порога за запрос.
+    # DEBUG добавляет в ответы X-DB-Query-Count и X-DB-Time-Ms
+    DEBUG: bool = False
+    SLOW_QUERY_SECONDS: float = 0.2
+    N_PLUS_ONE_THRESHOLD: int = 10
+
+    # Быстрая сериализация JSON (orjson) для ответов по умолчанию
+    FAST_JSON: bool = True
+
+    # Кэш каталога в памяти процесса (0 — выключен)
+    CATALOG_CACHE_MAXSIZE: int = 1024
+    CATALOG_CACHE_TTL: float = 60.0
+
+    # Резервы остатков под корзину
+    RESERVATION_TTL_SECONDS: int = 900
+    RESERVATION_SWEEP_INTERVAL: float = 30.0
+
+    # Массовый импорт каталога: строк в одной транзакции и максимум ошибок в отчёте
+    IMPORT_BATCH_SIZE: int = 1000
+    IMPORT_MAX_ERRORS: int = 1000
+
+    # Потоковые выгрузки: строк на одну порцию курсора
+    EXPORT_BATCH_SIZE: int = 1000
+
+    # Чат на WebSocket: очередь исходящих на соединение (переполнение — отключение),
+    # период ping и сколько секунд тишины от клиента до отключения
+    CHAT_SEND_QUEUE_SIZE: int = 256
+    CHAT_HEARTBEAT_SECONDS: float = 30.0
+    CHAT_IDLE_SECONDS: float = 90.0
+    CHAT_MAX_MESSAGE_LENGTH: int = 2000
+
+    # Брокер рассылки между воркерами: memory — один процесс, relay — через
+    # ретранслятор на Unix-сокете (python -m app.core.broker). Пакеты по комнатам
+    # уходят раз в BROKER_BATCH_SECONDS или при BROKER_MAX_BATCH сообщениях
+    BROKER: Literal["memory", "relay"] = "memory"
+    BROKER_RELAY_PATH: str = "/tmp/indicator-broker.sock"
+    BROKER_BATCH_SECONDS: float = 0.005
+    BROKER_MAX_BATCH: int = 256
+
+    # Живая лента цен и остатков (SSE): окно схлопывания дельт, сколько событий
+    # хранить для продолжения по Last-Event-ID, очередь клиента и период keepalive
+    LIVE_FEED_WINDOW_SECONDS: float = 0.25
+    LIVE_FEED_HISTORY: int = 1000
+    LIVE_FEED_QUEUE_SIZE: int = 64
+    LIVE_FEED_KEEPALIVE_SECONDS: float = 15.0
+
+    # Фронтенд: каталог, файлы до STATIC_MAX_FILE_BYTES держатся в памяти
+    # с заранее сжатыми вариантами (уровень gzip и качество brotli)
+    STATIC_DIR: str = "frontend/public"
+    STATIC_MAX_FILE_BYTES: int = 1024 * 1024
+    STATIC_GZIP_LEVEL: int = 9
+    STATIC_BROTLI_QUALITY: int = 11
+
+    # Сжатие ответов API: порог в байтах (меньшие ответы идут как есть) и уровни
+    # кодировщиков. br и zstd — при установленных пакетах brotli и zstandard
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MIN_SIZE: int = 1024
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4
+    COMPRESSION_ZSTD_LEVEL: int = 3
+
+    # Кэш пользователей для get_current_user
+    USER_CACHE_MAXSIZE: int = 10000
+    USER_CACHE_TTL: float = 300.0
+
     class Config:
         env_file = ".env"
 
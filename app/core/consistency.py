@@ -0,0 +1,84 @@
+import time
+from contextvars import ContextVar
+from http.cookies import SimpleCookie
+from typing import Optional
+
+from starlette.datastructures import MutableHeaders
+
+from app.core.config import settings
+
+# Read-your-writes при репликах. Запрос, записавший что-то в основную БД, получает
+# cookie PIN_COOKIE со временем, до которого реплики могут отставать. Пока оно не
+# прошло, чтения этого клиента идут в основную БД на любом воркере: метка едет
+# с клиентом, а не хранится в памяти процесса. Подделать её можно только во вред
+# себе (лишние чтения из основной БД), а срок дальше READ_YOUR_WRITES_SECONDS
+# не принимается.
+
+PIN_COOKIE = "rw_until"
+
+
+class RequestWrites:
+    """Сессии основной БД текущего запроса, чьи записи нужно закрепить за клиентом"""
+
+    __slots__ = ("sessions",)
+
+    def __init__(self):
+        self.sessions: list = []
+
+    @property
+    def wrote(self) -> bool:
+        return any(session.info.get("wrote") for session in self.sessions)
+
+
+request_writes: ContextVar[Optional[RequestWrites]] = ContextVar("request_writes", default=None)
+
+
+def track_writes(session) -> None:
+    """Закрепить клиента за основной БД, если через эту сессию будет запись"""
+    writes = request_writes.get()
+    if writes is not None:
+        writes.sessions.append(session)
+
+
+def pinned(cookie: Optional[str], now: Optional[float] = None) -> bool:
+    """Клиент недавно писал: его чтения должны идти в основную БД"""
+    if not cookie:
+        return False
+    try:
+        until = float(cookie)
+    except ValueError:
+        return False
+    now = time.time() if now is None else now
+    return now < until <= now + settings.READ_YOUR_WRITES_SECONDS
+
+
+class ReadYourWritesMiddleware:
+    """Чистый ASGI-middleware: ставит PIN_COOKIE ответам на запросы с записью"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        writes = RequestWrites()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and writes.wrote:
+                seconds = settings.READ_YOUR_WRITES_SECONDS
+                cookie = SimpleCookie()
+                cookie[PIN_COOKIE] = f"{time.time() + seconds:.3f}"
+                cookie[PIN_COOKIE].update({
+                    "max-age": int(seconds) + 1, "path": "/", "httponly": True, "samesite": "Lax",
+                })
+                headers = MutableHeaders(scope=message)
+                headers.append("Set-Cookie", cookie.output(header="").strip())
+            await send(message)
+
+        token = request_writes.set(writes)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            request_writes.reset(token)
@@ -1,9 +1,68 @@
+import itertools
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
-from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.orm import DeclarativeBase, Session
 from app.core.config import settings
+from app.core.sql_stats import instrument_engine
+
+
+def engine_options(url: str) -> dict:
+    """Параметры движка из Settings с учётом бэкенда (Postgres/asyncpg или SQLite)"""
+    parsed = make_url(url)
+    options = {
+        "echo": settings.DB_ECHO,
+        "query_cache_size": settings.DB_QUERY_CACHE_SIZE,
+    }
+    if parsed.get_backend_name() == "sqlite":
+        # :memory: работает через StaticPool, там настраивать нечего
+        if parsed.database in (None, "", ":memory:"):
+            return options
+        options.update(
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+        )
+        return options
+
+    options.update(
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+    )
+    if parsed.get_driver_name() == "asyncpg":
+        # Кэш подготовленных выражений asyncpg на каждое соединение
+        options["connect_args"] = {
+            "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+        }
+    return options
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}")
+    cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA mmap_size={int(settings.SQLITE_MMAP_SIZE)}")
+    cursor.execute(f"PRAGMA cache_size={int(settings.SQLITE_CACHE_SIZE)}")
+    cursor.execute(f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+    cursor.close()
+
+
+def create_engine_from_settings(url: str):
+    engine = create_async_engine(url, **engine_options(url))
+    if engine.dialect.name == "sqlite":
+        event.listen(engine.sync_engine, "connect", _set_sqlite_pragmas)
+    instrument_engine(engine)
+    return engine
+
 
 # Создаем движок (Занятие 3)
-engine = create_async_engine(settings.DATABASE_URL, echo=True)
+engine = create_engine_from_settings(settings.DATABASE_URL)
 
 # Настраиваем фабрику сессий (Занятие 3)
 AsyncSessionLocal = async_sessionmaker(
@@ -12,6 +71,71 @@ AsyncSessionLocal = async_sessionmaker(
     expire_on_commit=False,
 )
 
+
+# Сессия помечает себя, если через неё что-то записывали (flush или ORM DML) —
+# по этой метке включается read-your-writes
+@event.listens_for(Session, "after_flush")
+def _mark_flush(session, flush_context):
+    session.info["wrote"] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _mark_dml(orm_execute_state):
+    if not orm_execute_state.is_select:
+        orm_execute_state.session.info["wrote"] = True
+
+
+class ReplicaRouter:
+    """Выбор реплики для read-only сессий: round_robin или least_connections"""
+
+    def __init__(self, urls: list[str], strategy: str):
+        self.strategy = strategy
+        self.engines = [create_engine_from_settings(url) for url in urls]
+        self._sessionmakers = [
+            async_sessionmaker(bind=e, class_=AsyncSession, expire_on_commit=False)
+            for e in self.engines
+        ]
+        self.in_use = [0] * len(self.engines)
+        self._counter = itertools.count()
+
+    def __bool__(self) -> bool:
+        return bool(self.engines)
+
+    def pick(self) -> int:
+        if self.strategy == "least_connections":
+            return min(range(len(self.engines)), key=self.in_use.__getitem__)
+        return next(self._counter) % len(self.engines)
+
+    @asynccontextmanager
+    async def session(self) -> AsyncIterator[AsyncSession]:
+        index = self.pick()
+        self.in_use[index] += 1
+        try:
+            async with self._sessionmakers[index]() as session:
+                yield session
+        finally:
+            self.in_use[index] -= 1
+
+    async def dispose(self) -> None:
+        for replica in self.engines:
+            await replica.dispose()
+
+
+# Реплики для чтения (пустой список — все чтения идут в основную БД)
+replicas = ReplicaRouter(settings.DATABASE_REPLICA_URLS, settings.REPLICA_SELECTION)
+
+
+@asynccontextmanager
+async def read_session() -> AsyncIterator[AsyncSession]:
+    """Сессия для чтения вне запроса (фоновые задачи, выгрузки): реплика, если есть"""
+    if replicas:
+        async with replicas.session() as session:
+            yield session
+    else:
+        async with AsyncSessionLocal() as session:
+            yield session
+
+
 # Базовый класс для моделей (Занятие 4)
 class Base(DeclarativeBase):
-    pass
\ No newline at end of file
+    pass
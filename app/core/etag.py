@@ -0,0 +1,61 @@
+import hashlib
+import secrets
+from typing import Optional
+
+from fastapi import Request, Response
+
+from app.core.cache import catalog_cache
+
+# Версии каталога живут в памяти процесса, поэтому в ETag добавляем метку процесса:
+# иначе одинаковые номера версий на разных воркерах дали бы ложный 304. Запись на
+# другом воркере доходит сюда через брокер (app.core.cache) и тоже поднимает версию
+_EPOCH = secrets.token_hex(4)
+
+CACHE_CONTROL = "no-cache"
+
+
+def catalog_etag(namespace: str, *params) -> str:
+    """Сильный ETag по версии пространства имён каталога и параметрам запроса"""
+    digest = hashlib.blake2b(repr(params).encode(), digest_size=6).hexdigest()
+    return f'"{namespace}-{_EPOCH}-{catalog_cache.version(namespace)}-{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+# Сжатое тело — другое представление, и у него должен быть свой ETag: иначе кэши
+# и If-None-Match путают gzip-, br- и несжатую версии одного ответа
+_CODING_SUFFIXES = {"gzip": "gz", "br": "br", "zstd": "zst"}
+
+
+def coding_etag(etag: str, encoding: Optional[str]) -> str:
+    """ETag представления в кодировании encoding: "abc" -> "abc-gz" (W/ сохраняется)"""
+    if not encoding or not etag.endswith('"'):
+        return etag
+    return f'{etag[:-1]}-{_CODING_SUFFIXES.get(encoding, encoding)}"'
+
+
+def with_base_tags(if_none_match: str, encoding: str) -> str:
+    """If-None-Match, где к тегам кодирования encoding добавлены теги эндпоинта без суффикса"""
+    suffix = f'-{_CODING_SUFFIXES.get(encoding, encoding)}"'
+    tags = [candidate.strip() for candidate in if_none_match.split(",")]
+    return ", ".join(tags + [f'{tag[:-len(suffix)]}"' for tag in tags if tag.endswith(suffix)])
+
+
+def not_modified(request: Request, etag: str) -> Optional[Response]:
+    """304 без тела, если у клиента актуальная копия; иначе None"""
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+    return None
+
+
+def set_etag(response: Response, etag: str) -> None:
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
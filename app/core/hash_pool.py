@@ -0,0 +1,95 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+
+class PoolSaturated(Exception):
+    """Очередь пула заполнена — запрос нужно отклонить, а не ждать"""
+
+
+class BoundedExecutor:
+    """Пул потоков фиксированного размера с ограниченной очередью.
+
+    Нужен для CPU-тяжёлых синхронных вызовов (bcrypt), чтобы они не блокировали
+    event loop. Если задач больше, чем workers + max_queue, run() сразу
+    бросает PoolSaturated. Задача занимает место в очереди, пока не закончится
+    в потоке, даже если ожидавший её запрос уже отменён.
+    """
+
+    def __init__(self, workers: int, max_queue: int, name: str):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.name = name
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self._wait_total = 0.0
+        self._run_total = 0.0
+        self._run_max = 0.0
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        with self._lock:
+            if self._pending >= self.workers + self.max_queue:
+                self.rejected += 1
+                raise PoolSaturated()
+            self._pending += 1
+
+        submitted = time.perf_counter()
+        started = 0.0
+
+        def call():
+            nonlocal started
+            started = time.perf_counter()
+            return fn(*args)
+
+        def done(_: Future):
+            # Вызывается, когда задача действительно закончилась (или отменена до старта)
+            finished = time.perf_counter()
+            with self._lock:
+                self._pending -= 1
+                if started:
+                    self.completed += 1
+                    self._wait_total += started - submitted
+                    self._run_total += finished - started
+                    self._run_max = max(self._run_max, finished - started)
+
+        try:
+            future = self._get_executor().submit(call)
+        except BaseException:
+            with self._lock:
+                self._pending -= 1
+            raise
+        future.add_done_callback(done)
+        return await asyncio.wrap_future(future)
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        # Потоки создаются заново после shutdown(): приложение может перезапускаться в том же процессе
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=self.name)
+            return self._executor
+
+    def stats(self) -> dict:
+        with self._lock:
+            done = self.completed or 1
+            return {
+                "workers": self.workers,
+                "queue_limit": self.max_queue,
+                "in_flight": self._pending,
+                "queue_depth": max(0, self._pending - self.workers),
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "wait_avg_ms": round(self._wait_total / done * 1000, 3),
+                "run_avg_ms": round(self._run_total / done * 1000, 3),
+                "run_max_ms": round(self._run_max * 1000, 3),
+            }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,238 @@
+import asyncio
+import time
+from collections import deque
+from typing import Hashable, Iterable, Optional
+
+from starlette.websockets import WebSocket, WebSocketState
+
+from app.core.broker import Broker
+from app.core.config import settings
+from app.core.logging import logger
+
+# Хаб WebSocket-соединений. Рассылка не ждёт сокетов: сообщение кладётся в
+# ограниченную очередь каждого соединения, а пишет в сокет отдельная задача.
+# Если клиент не успевает читать и очередь переполнилась, соединение закрывается,
+# а остальные получатели этого не замечают. Вместо asyncio.Queue — deque и future
+# для пробуждения писателя: на 10 тысячах соединений это в несколько раз меньше памяти.
+# С брокером broadcast идёт через него и доходит до соединений всех воркеров;
+# хаб подписан в брокере ровно на те комнаты, где у него есть соединения.
+
+CLOSE_GOING_AWAY = 1001
+CLOSE_TRY_AGAIN_LATER = 1013
+
+PING = '{"type":"ping"}'
+
+
+class Connection:
+    """Одно WebSocket-соединение: комнаты, очередь исходящих и задача-писатель"""
+
+    __slots__ = ("websocket", "client_id", "rooms", "queue", "wakeup", "writer", "last_seen", "closed")
+
+    def __init__(self, websocket: WebSocket, client_id: Hashable):
+        self.websocket = websocket
+        self.client_id = client_id
+        self.rooms: set[str] = set()
+        self.queue: deque[str] = deque()
+        self.wakeup: Optional[asyncio.Future] = None
+        self.writer: Optional[asyncio.Task] = None
+        self.last_seen = time.monotonic()
+        self.closed = False
+
+    def touch(self) -> None:
+        self.last_seen = time.monotonic()
+
+
+class ConnectionManager:
+    """Соединения по id клиента и по комнатам; все операции над индексами — O(1)"""
+
+    def __init__(
+        self,
+        queue_size: Optional[int] = None,
+        heartbeat_seconds: Optional[float] = None,
+        idle_seconds: Optional[float] = None,
+        broker: Optional[Broker] = None,
+    ):
+        self.queue_size = settings.CHAT_SEND_QUEUE_SIZE if queue_size is None else queue_size
+        self.heartbeat_seconds = (
+            settings.CHAT_HEARTBEAT_SECONDS if heartbeat_seconds is None else heartbeat_seconds
+        )
+        self.idle_seconds = settings.CHAT_IDLE_SECONDS if idle_seconds is None else idle_seconds
+        self.broker = broker
+        self.connections: set[Connection] = set()
+        self.clients: dict[Hashable, set[Connection]] = {}
+        self.rooms: dict[str, set[Connection]] = {}
+        self.messages_out = 0
+        self.slow_evictions = 0
+        self.idle_evictions = 0
+
+    async def connect(
+        self, websocket: WebSocket, client_id: Hashable, rooms: Iterable[str] = ()
+    ) -> Connection:
+        await websocket.accept()
+        return self.register(websocket, client_id, rooms)
+
+    def register(self, websocket: WebSocket, client_id: Hashable, rooms: Iterable[str] = ()) -> Connection:
+        """Добавить уже принятое соединение и запустить его писателя"""
+        conn = Connection(websocket, client_id)
+        self.connections.add(conn)
+        self.clients.setdefault(client_id, set()).add(conn)
+        for room in rooms:
+            self.join(conn, room)
+        conn.writer = asyncio.create_task(self._write(conn))
+        return conn
+
+    def disconnect(self, conn: Connection) -> None:
+        """Убрать соединение из индексов и остановить писателя; повторный вызов безопасен"""
+        if conn.closed:
+            return
+        conn.closed = True
+        self.connections.discard(conn)
+        _discard(self.clients, conn.client_id, conn)
+        for room in conn.rooms:
+            self._remove_from_room(room, conn)
+        conn.rooms.clear()
+        if conn.writer is not None and conn.writer is not asyncio.current_task():
+            conn.writer.cancel()
+
+    def join(self, conn: Connection, room: str) -> None:
+        if conn.closed:
+            return
+        conn.rooms.add(room)
+        members = self.rooms.get(room)
+        if members is None:
+            members = self.rooms[room] = set()
+            if self.broker is not None:
+                self.broker.subscribe(room, self._on_batch)
+        members.add(conn)
+
+    def leave(self, conn: Connection, room: str) -> None:
+        conn.rooms.discard(room)
+        self._remove_from_room(room, conn)
+
+    def _remove_from_room(self, room: str, conn: Connection) -> None:
+        if _discard(self.rooms, room, conn) and self.broker is not None:
+            self.broker.unsubscribe(room, self._on_batch)
+
+    def broadcast(self, room: str, message: str, key: Optional[Hashable] = None) -> None:
+        """Разослать участникам комнаты на всех воркерах (через брокер, если он есть)"""
+        if self.broker is None:
+            self.publish([room], message)
+        else:
+            self.broker.publish(room, message, key)
+
+    def _on_batch(self, room: str, messages: list[str]) -> None:
+        for message in messages:
+            self.publish([room], message)
+
+    def publish(self, rooms: Iterable[str], message: str) -> int:
+        """Разослать готовый текст участникам комнат (каждому один раз); вернуть число получателей"""
+        targets: set[Connection] = set()
+        for room in rooms:
+            targets.update(self.rooms.get(room, ()))
+        return self._deliver(targets, message)
+
+    def send_to_client(self, client_id: Hashable, message: str) -> int:
+        return self._deliver(set(self.clients.get(client_id, ())), message)
+
+    def _deliver(self, targets: set[Connection], message: str) -> int:
+        delivered = 0
+        for conn in targets:
+            if self.offer(conn, message):
+                delivered += 1
+        return delivered
+
+    def offer(self, conn: Connection, message: str) -> bool:
+        """Поставить сообщение в очередь соединения; переполненную очередь не ждём, а закрываем"""
+        if conn.closed:
+            return False
+        if len(conn.queue) >= self.queue_size:
+            self.slow_evictions += 1
+            logger.warning("ws_slow_consumer", client_id=conn.client_id, queued=len(conn.queue))
+            self.evict(conn, CLOSE_TRY_AGAIN_LATER)
+            return False
+        conn.queue.append(message)
+        if conn.wakeup is not None and not conn.wakeup.done():
+            conn.wakeup.set_result(None)
+        return True
+
+    def evict(self, conn: Connection, code: int) -> None:
+        """Отключить соединение по инициативе сервера, не дожидаясь сокета"""
+        self.disconnect(conn)
+        asyncio.get_running_loop().create_task(_close(conn.websocket, code))
+
+    async def _write(self, conn: Connection) -> None:
+        websocket, queue = conn.websocket, conn.queue
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                while queue:
+                    await websocket.send_text(queue.popleft())
+                    self.messages_out += 1
+                conn.wakeup = loop.create_future()
+                await conn.wakeup
+                conn.wakeup = None
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # Сокет уже закрыт клиентом: цикл чтения в эндпоинте тоже это увидит
+            self.disconnect(conn)
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        """Один проход heartbeat: закрыть молчащие дольше idle_seconds, остальным отправить ping"""
+        now = time.monotonic() if now is None else now
+        evicted = 0
+        for conn in list(self.connections):
+            if now - conn.last_seen > self.idle_seconds:
+                self.idle_evictions += 1
+                evicted += 1
+                self.evict(conn, CLOSE_GOING_AWAY)
+            else:
+                self.offer(conn, PING)
+        return evicted
+
+    async def heartbeat(self) -> None:
+        """Фоновая задача: sweep раз в heartbeat_seconds"""
+        while True:
+            await asyncio.sleep(self.heartbeat_seconds)
+            try:
+                evicted = self.sweep()
+                if evicted:
+                    logger.info("ws_idle_evicted", connections=evicted)
+            except Exception as e:
+                logger.warning("ws_heartbeat_failed", error=str(e))
+
+    async def close_all(self, code: int = CLOSE_GOING_AWAY) -> None:
+        conns = list(self.connections)
+        for conn in conns:
+            self.disconnect(conn)
+        await asyncio.gather(*(_close(conn.websocket, code) for conn in conns))
+
+    def stats(self) -> dict:
+        return {
+            "connections": len(self.connections),
+            "clients": len(self.clients),
+            "rooms": len(self.rooms),
+            "messages_out": self.messages_out,
+            "slow_evictions": self.slow_evictions,
+            "idle_evictions": self.idle_evictions,
+        }
+
+
+def _discard(index: dict, key: Hashable, conn: Connection) -> bool:
+    """Убрать соединение из индекса; True — если ключ опустел и удалён"""
+    members = index.get(key)
+    if members is not None:
+        members.discard(conn)
+        if not members:
+            del index[key]
+            return True
+    return False
+
+
+async def _close(websocket: WebSocket, code: int) -> None:
+    if websocket.application_state == WebSocketState.DISCONNECTED:
+        return
+    try:
+        await websocket.close(code)
+    except Exception:
+        pass
@@ -0,0 +1,120 @@
+import asyncio
+from datetime import datetime, timedelta
+from typing import Iterable, Optional
+
+from sqlalchemy import case, delete, insert, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.live import track_stock
+from app.core.logging import logger
+from app.models.item import Item
+from app.models.order import StockReservation
+
+# Остатки меняются только условными атомарными UPDATE
+#   stock_quantity = stock_quantity - :qty WHERE stock_quantity >= :qty
+# без чтения в Python и без блокировок таблиц: уйти в минус нельзя даже
+# при сотнях одновременных заказов. Функции не делают commit — транзакцией
+# управляет вызывающий код, при OutOfStock её нужно откатить.
+
+
+class OutOfStock(Exception):
+    def __init__(self, item_ids: Iterable[int]):
+        self.item_ids = sorted(item_ids)
+        super().__init__(f"Недостаточно товара на складе: {self.item_ids}")
+
+
+async def apply_stock_deltas(db: AsyncSession, deltas: dict[int, int]) -> dict[int, int]:
+    """Списать (delta > 0) или вернуть (delta < 0) остатки одним UPDATE.
+
+    Возвращает новые остатки; если хотя бы одного товара не хватило — OutOfStock.
+    """
+    deltas = {item_id: delta for item_id, delta in deltas.items() if delta}
+    if not deltas:
+        return {}
+    delta = case(deltas, value=Item.id)
+    result = await db.execute(
+        update(Item)
+        .where(Item.id.in_(list(deltas)), Item.stock_quantity >= delta)
+        .values(stock_quantity=Item.stock_quantity - delta)
+        .returning(Item.id, Item.stock_quantity)
+        .execution_options(synchronize_session=False)
+    )
+    stock = dict(result.all())
+    track_stock(db, stock)  # Новые остатки из RETURNING уйдут в живую ленту после commit
+    # Возврат на склад удалённого товара не ошибка, нехватка при списании — ошибка
+    short = {item_id for item_id, qty in deltas.items() if qty > 0} - set(stock)
+    if short:
+        raise OutOfStock(short)
+    return stock
+
+
+async def reserve(db: AsyncSession, user_id: int, item_id: int, quantity: int) -> int:
+    """Зарезервировать товар под корзину на RESERVATION_TTL_SECONDS; возвращает остаток"""
+    stock = await apply_stock_deltas(db, {item_id: quantity})
+    await db.execute(insert(StockReservation).values(
+        user_id=user_id,
+        item_id=item_id,
+        quantity=quantity,
+        expires_at=datetime.utcnow() + timedelta(seconds=settings.RESERVATION_TTL_SECONDS),
+    ))
+    return stock[item_id]
+
+
+async def _take_reservations(db: AsyncSession, *conditions) -> dict[int, int]:
+    # DELETE ... RETURNING: возвращаем на склад ровно те резервы, которые удалили мы
+    result = await db.execute(
+        delete(StockReservation)
+        .where(*conditions)
+        .returning(StockReservation.item_id, StockReservation.quantity)
+    )
+    reserved: dict[int, int] = {}
+    for item_id, quantity in result.all():
+        reserved[item_id] = reserved.get(item_id, 0) + quantity
+    return reserved
+
+
+async def release(
+    db: AsyncSession, user_id: int, item_ids: Optional[Iterable[int]] = None
+) -> dict[int, int]:
+    """Снять резервы пользователя (все или по указанным товарам) и вернуть товар на склад"""
+    conditions = [StockReservation.user_id == user_id]
+    if item_ids is not None:
+        conditions.append(StockReservation.item_id.in_(list(item_ids)))
+    reserved = await _take_reservations(db, *conditions)
+    return await apply_stock_deltas(db, {item_id: -qty for item_id, qty in reserved.items()})
+
+
+async def checkout_stock(db: AsyncSession, user_id: int, quantities: dict[int, int]) -> dict[int, int]:
+    """Списать остатки под заказ с учётом резервов корзины.
+
+    Все резервы пользователя снимаются: зарезервированное засчитывается в заказ,
+    лишнее возвращается на склад, недостающее списывается. Итого два запроса.
+    """
+    reserved = await _take_reservations(db, StockReservation.user_id == user_id)
+    deltas = {item_id: -qty for item_id, qty in reserved.items()}
+    for item_id, qty in quantities.items():
+        deltas[item_id] = deltas.get(item_id, 0) + qty
+    return await apply_stock_deltas(db, deltas)
+
+
+async def release_expired(db: AsyncSession, now: Optional[datetime] = None) -> dict[int, int]:
+    """Массово вернуть на склад все просроченные резервы"""
+    reserved = await _take_reservations(
+        db, StockReservation.expires_at <= (now or datetime.utcnow())
+    )
+    return await apply_stock_deltas(db, {item_id: -qty for item_id, qty in reserved.items()})
+
+
+async def reservation_sweeper(session_factory) -> None:
+    """Фоновая задача: раз в RESERVATION_SWEEP_INTERVAL секунд освобождает просроченные резервы"""
+    while True:
+        await asyncio.sleep(settings.RESERVATION_SWEEP_INTERVAL)
+        try:
+            async with session_factory() as db:
+                released = await release_expired(db)
+                await db.commit()
+            if released:
+                logger.info("reservations_released", items=len(released))
+        except Exception as e:
+            logger.warning("reservation_sweep_failed", error=str(e))
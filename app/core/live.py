@@ -0,0 +1,194 @@
+import asyncio
+import json
+import uuid
+from collections import deque
+from typing import Iterable, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.core.broker import Broker, broker
+from app.core.cache import invalidate_items
+from app.core.config import settings
+from app.core.logging import logger
+from app.core.serialization import dumps
+
+# Живая лента изменений каталога: {"id", "price", "stock"} по товару.
+# Пути записи отмечают изменения в session.info (track), после commit они уходят
+# в брокер (комната LIVE_ROOM, схлопывание по id товара), откат их отбрасывает.
+# Дельты частичные (импорт меняет только цену, корзина — только остаток), поэтому
+# при схлопывании в брокере поля дельт объединяются, а не заменяются.
+# Тот же commit сбрасывает кэш и ETag каталога по этим товарам: остаток входит
+# в тело ответа, а меняют его и корзина, и заказы, и фоновое снятие резервов.
+# ItemFeed каждого воркера копит дельты LIVE_FEED_WINDOW_SECONDS и выпускает одно
+# SSE-событие с номером; последние LIVE_FEED_HISTORY событий хранятся для
+# продолжения с Last-Event-ID. id события — "<эпоха процесса>-<номер>": после
+# перезапуска или переподключения к другому воркеру клиент получает reset.
+
+LIVE_ROOM = "live:items"
+
+
+def track(session, item_id: int, price: Optional[float] = None, stock: Optional[int] = None) -> None:
+    """Отметить изменение товара; уйдёт в ленту после commit этой сессии"""
+    pending = session.info.setdefault("live_items", {})
+    delta = pending.setdefault(item_id, {"id": item_id})
+    if price is not None:
+        delta["price"] = price
+    if stock is not None:
+        delta["stock"] = stock
+
+
+def track_stock(session, stock: dict[int, int]) -> None:
+    for item_id, quantity in stock.items():
+        track(session, item_id, stock=quantity)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_committed(session):
+    pending = session.info.pop("live_items", None)
+    if pending:
+        invalidate_items(*pending)
+        publish(pending.values())
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_rolled_back(session):
+    session.info.pop("live_items", None)
+
+
+def publish(deltas: Iterable[dict]) -> None:
+    for delta in deltas:
+        broker.publish(LIVE_ROOM, dumps(delta).decode(), key=delta["id"], merge=_merge_deltas)
+
+
+def _merge_deltas(previous: str, message: str) -> str:
+    delta = json.loads(previous)
+    delta.update(json.loads(message))
+    return dumps(delta).decode()
+
+
+class Listener:
+    """SSE-клиент ленты: ограниченная очередь готовых событий"""
+
+    __slots__ = ("queue",)
+
+    def __init__(self, size: int):
+        self.queue: asyncio.Queue[Optional[bytes]] = asyncio.Queue(maxsize=size)
+
+
+class ItemFeed:
+    """Схлопывание дельт по окну, нумерация событий и история для продолжения"""
+
+    def __init__(
+        self,
+        window_seconds: Optional[float] = None,
+        history: Optional[int] = None,
+        queue_size: Optional[int] = None,
+    ):
+        self.window_seconds = (
+            settings.LIVE_FEED_WINDOW_SECONDS if window_seconds is None else window_seconds
+        )
+        self.queue_size = settings.LIVE_FEED_QUEUE_SIZE if queue_size is None else queue_size
+        self.epoch = uuid.uuid4().hex[:8]
+        self.seq = 0
+        self.history: deque[tuple[int, bytes]] = deque(
+            maxlen=settings.LIVE_FEED_HISTORY if history is None else history
+        )
+        self.listeners: set[Listener] = set()
+        self._pending: dict[int, dict] = {}
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._flush_loop: Optional[asyncio.AbstractEventLoop] = None
+        self.overflows = 0
+
+    def start(self, broker: Broker) -> None:
+        # Подписка на всё время работы: иначе в нумерации событий были бы пропуски
+        broker.subscribe(LIVE_ROOM, self.on_batch)
+
+    def stop(self, broker: Broker) -> None:
+        broker.unsubscribe(LIVE_ROOM, self.on_batch)
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+    def on_batch(self, room: str, messages: list[str]) -> None:
+        for message in messages:
+            delta = json.loads(message)
+            self._pending.setdefault(delta["id"], {}).update(delta)
+        if not self._pending:
+            return
+        # Как и в брокере: таймер из другого event loop не сработает
+        loop = asyncio.get_running_loop()
+        if self._flush_handle is None or self._flush_loop is not loop:
+            self._flush_handle = loop.call_later(self.window_seconds, self.flush)
+            self._flush_loop = loop
+
+    def flush(self) -> None:
+        self._flush_handle = None
+        if not self._pending:
+            return
+        deltas, self._pending = list(self._pending.values()), {}
+        self.seq += 1
+        frame = _frame("items", self.event_id(self.seq), {"items": deltas})
+        self.history.append((self.seq, frame))
+        for listener in list(self.listeners):
+            try:
+                listener.queue.put_nowait(frame)
+            except asyncio.QueueFull:
+                self._overflow(listener)
+
+    def _overflow(self, listener: Listener) -> None:
+        # Клиент не успевает читать: закрываем поток, он переподключится
+        # с Last-Event-ID и дочитает пропущенное из истории
+        self.overflows += 1
+        self.listeners.discard(listener)
+        while not listener.queue.empty():
+            listener.queue.get_nowait()
+        listener.queue.put_nowait(None)
+        logger.warning("live_feed_overflow", listeners=len(self.listeners))
+
+    def event_id(self, seq: int) -> str:
+        return f"{self.epoch}-{seq}"
+
+    def subscribe(self, last_event_id: Optional[str]) -> tuple[Listener, list[bytes]]:
+        """Новый клиент и что отправить ему сразу: пропущенные события или reset"""
+        listener = Listener(self.queue_size)
+        self.listeners.add(listener)
+        if not last_event_id:
+            return listener, []
+        missed = self.replay(last_event_id)
+        if missed is None:
+            reset = _frame("reset", self.event_id(self.seq), {"seq": self.seq})
+            return listener, [reset]
+        return listener, missed
+
+    def unsubscribe(self, listener: Listener) -> None:
+        self.listeners.discard(listener)
+
+    def replay(self, last_event_id: str) -> Optional[list[bytes]]:
+        """События после last_event_id; None — продолжить нельзя (другая эпоха или история ушла)"""
+        epoch, _, seq = last_event_id.partition("-")
+        if epoch != self.epoch or not seq.isdigit() or int(seq) > self.seq:
+            return None
+        seq = int(seq)
+        if seq == self.seq:
+            return []
+        if not self.history or self.history[0][0] > seq + 1:
+            return None
+        return [frame for number, frame in self.history if number > seq]
+
+    def stats(self) -> dict:
+        return {
+            "listeners": len(self.listeners),
+            "seq": self.seq,
+            "history": len(self.history),
+            "overflows": self.overflows,
+        }
+
+
+def _frame(name: str, event_id: str, data: dict) -> bytes:
+    return b"id: %s\nevent: %s\ndata: %s\n\n" % (event_id.encode(), name.encode(), dumps(data))
+
+
+KEEPALIVE = b": keepalive\n\n"
+
+item_feed = ItemFeed()
@@ -1,10 +1,19 @@
+import logging
+
 import structlog
 
+from app.core.config import settings
+
 def setup_logging():
     structlog.configure(
         processors=[
+            structlog.processors.add_log_level,
+            structlog.processors.TimeStamper(fmt="iso", utc=True),
             structlog.processors.JSONRenderer() # Логи в формате JSON для удобного поиска
-        ]
+        ],
+        wrapper_class=structlog.make_filtering_bound_logger(
+            logging.getLevelName(settings.LOG_LEVEL.upper())
+        ),
     )
 
-logger = structlog.get_logger()
\ No newline at end of file
+logger = structlog.get_logger()
@@ -0,0 +1,255 @@
+import time
+from bisect import bisect_left
+from typing import Iterable, Optional
+
+from app.core.config import settings
+from app.core.logging import logger
+from app.core.sql_stats import QueryStats, query_stats, report_repeated
+
+# Метрики HTTP в памяти процесса и их выдача в текстовом формате Prometheus.
+# Всё обновляется из потока event loop, поэтому без блокировок.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# Запросы, не попавшие ни в один маршрут, сводим в одну метку, чтобы не плодить серии;
+# смонтированные приложения (раздача фронтенда) — в другую
+UNMATCHED_ROUTE = "<unmatched>"
+MOUNT_ROUTE = "<mount>"
+
+
+class Histogram:
+    """Гистограмма с фиксированными границами; счётчики по корзинам не накопительные"""
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Последняя корзина — +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> list[tuple[str, int]]:
+        total, result = 0, []
+        for bound, count in zip((*map(_format_value, self.buckets), "+Inf"), self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+
+class HttpMetrics:
+    def __init__(self):
+        self.requests: dict[tuple[str, str, int], int] = {}
+        self.latency: dict[tuple[str, str], Histogram] = {}
+        self.db_queries: dict[tuple[str, str], Histogram] = {}
+        self.db_time: dict[tuple[str, str], Histogram] = {}
+        self.n_plus_one: dict[tuple[str, str], int] = {}
+        self.in_flight = 0
+        self.slow = 0
+
+    def observe(
+        self, method: str, route: str, status: int, duration: float,
+        stats: Optional[QueryStats] = None,
+    ) -> None:
+        key = (method, route, status)
+        self.requests[key] = self.requests.get(key, 0) + 1
+        _histogram(self.latency, (method, route), LATENCY_BUCKETS).observe(duration)
+        if stats is not None:
+            _histogram(self.db_queries, (method, route), QUERY_COUNT_BUCKETS).observe(stats.count)
+            _histogram(self.db_time, (method, route), LATENCY_BUCKETS).observe(stats.duration)
+
+    def flag_n_plus_one(self, method: str, route: str) -> None:
+        self.n_plus_one[(method, route)] = self.n_plus_one.get((method, route), 0) + 1
+
+    def reset(self) -> None:
+        for series in (self.requests, self.latency, self.db_queries, self.db_time, self.n_plus_one):
+            series.clear()
+        self.slow = 0
+
+    def render(self) -> list[str]:
+        lines = [
+            "# HELP http_requests_total Обработанные HTTP-запросы",
+            "# TYPE http_requests_total counter",
+        ]
+        for (method, route, status), count in sorted(self.requests.items()):
+            lines.append(
+                f"http_requests_total{_labels(method=method, route=route, status=status)} {count}"
+            )
+        lines += [
+            "# HELP http_requests_in_flight Запросы в обработке",
+            "# TYPE http_requests_in_flight gauge",
+            f"http_requests_in_flight {self.in_flight}",
+            "# HELP http_slow_requests_total Запросы дольше SLOW_REQUEST_SECONDS",
+            "# TYPE http_slow_requests_total counter",
+            f"http_slow_requests_total {self.slow}",
+        ]
+        lines += _histogram_lines(
+            "http_request_duration_seconds", "Время обработки запроса", self.latency
+        )
+        lines += _histogram_lines(
+            "http_request_db_queries", "SQL-запросов на HTTP-запрос", self.db_queries
+        )
+        lines += _histogram_lines(
+            "http_request_db_seconds", "Время в БД на HTTP-запрос", self.db_time
+        )
+        lines += [
+            "# HELP http_n_plus_one_total Запросы с повторяющимся SQL (больше N_PLUS_ONE_THRESHOLD)",
+            "# TYPE http_n_plus_one_total counter",
+        ]
+        for (method, route), count in sorted(self.n_plus_one.items()):
+            lines.append(f"http_n_plus_one_total{_labels(method=method, route=route)} {count}")
+        return lines
+
+
+def _histogram(series: dict, key: tuple, buckets: tuple) -> Histogram:
+    histogram = series.get(key)
+    if histogram is None:
+        histogram = series[key] = Histogram(buckets)
+    return histogram
+
+
+def _histogram_lines(name: str, help_text: str, series: dict) -> list[str]:
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+    for (method, route), histogram in sorted(series.items()):
+        for bound, count in histogram.cumulative():
+            lines.append(f"{name}_bucket{_labels(method=method, route=route, le=bound)} {count}")
+        labels = _labels(method=method, route=route)
+        lines.append(f"{name}_sum{labels} {_format_value(histogram.sum)}")
+        lines.append(f"{name}_count{labels} {histogram.count}")
+    return lines
+
+
+http_metrics = HttpMetrics()
+
+
+class MetricsMiddleware:
+    """Чистый ASGI-middleware: счётчики, in-flight и гистограммы задержек по шаблону маршрута.
+
+    Время меряется до конца отправки тела, так что потоковые ответы учитываются целиком.
+    Исключение — text/event-stream: поток живёт, пока открыт клиент, поэтому для него
+    берётся время до начала ответа.
+    Здесь же заводится QueryStats запроса: число SQL и время в БД идут в метрики,
+    а в режиме DEBUG — в заголовки ответа (запросы до начала ответа).
+    """
+
+    def __init__(self, app, metrics: HttpMetrics = http_metrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        stats = QueryStats()
+        debug = settings.DEBUG
+        response_started = None
+
+        async def send_wrapper(message):
+            nonlocal status, response_started
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if _is_event_stream(message.get("headers", ())):
+                    response_started = time.perf_counter()
+                if debug:
+                    message["headers"] = [
+                        *message.get("headers", ()),
+                        (b"x-db-query-count", str(stats.count).encode()),
+                        (b"x-db-time-ms", f"{stats.duration * 1000:.2f}".encode()),
+                    ]
+            await send(message)
+
+        metrics = self.metrics
+        metrics.in_flight += 1
+        token = query_stats.set(stats)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = (response_started or time.perf_counter()) - started
+            query_stats.reset(token)
+            metrics.in_flight -= 1
+            route = _route_of(scope)
+            metrics.observe(scope["method"], route, status, duration, stats)
+            if stats.count > settings.N_PLUS_ONE_THRESHOLD and report_repeated(
+                stats, scope["method"], route
+            ):
+                metrics.flag_n_plus_one(scope["method"], route)
+            if duration >= settings.SLOW_REQUEST_SECONDS:
+                metrics.slow += 1
+                logger.warning(
+                    "slow_request",
+                    method=scope["method"],
+                    path=scope["path"],
+                    route=route,
+                    status=status,
+                    duration_ms=round(duration * 1000, 1),
+                )
+
+
+def _is_event_stream(headers) -> bool:
+    return any(
+        name.lower() == b"content-type" and value.startswith(b"text/event-stream")
+        for name, value in headers
+    )
+
+
+_templates: dict[int, str] = {}
+
+
+def _route_of(scope) -> str:
+    # Маршрутизатор кладёт найденный маршрут в scope; для метки берём шаблон пути, а не сам путь
+    route = scope.get("route")
+    path = getattr(route, "path", None)
+    if path is None:
+        return MOUNT_ROUTE if "endpoint" in scope else UNMATCHED_ROUTE
+    template = _templates.get(id(route))
+    if template is None:
+        template = _templates[id(route)] = _with_prefix(route, scope["path"])
+    return template
+
+
+def _with_prefix(route, path: str) -> str:
+    # В scope лежит маршрут без префикса include_router: восстанавливаем префикс
+    # по той части пути, которую регулярное выражение маршрута не покрывает
+    regex = getattr(route, "path_regex", None)
+    if regex is not None:
+        for start in (i for i, char in enumerate(path) if char == "/"):
+            if regex.match(path[start:]):
+                return path[:start] + route.path
+    return route.path or "/"
+
+
+def stats_lines(name: str, help_text: str, samples: dict[str, dict], kind: str = "gauge") -> list[str]:
+    """Серия метрики из словарей stats(): {метка: {поле: число}} -> name{source, field}"""
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+    for source, values in samples.items():
+        for field, value in values.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                lines.append(f"{name}{_labels(source=source, field=field)} {_format_value(value)}")
+    return lines
+
+
+def render_prometheus(*sections: Iterable[str]) -> str:
+    return "\n".join(line for section in sections for line in section) + "\n"
+
+
+def _labels(**labels) -> str:
+    parts = ",".join(f'{key}="{_escape(str(value))}"' for key, value in labels.items())
+    return "{" + parts + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_value(value: float) -> str:
+    if isinstance(value, float):
+        return repr(round(value, 6))
+    return str(value)
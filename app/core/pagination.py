@@ -0,0 +1,29 @@
+import base64
+import json
+from typing import Any, Optional
+
+from fastapi import HTTPException
+
+
+# Keyset-пагинация: курсор — непрозрачная строка с ключом последней строки страницы
+def encode_cursor(kind: str, key: list[Any]) -> str:
+    raw = json.dumps({"k": kind, "v": key}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, kind: str) -> list[Any]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if data["k"] != kind or not isinstance(data["v"], list):
+            raise ValueError
+        return data["v"]
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def next_cursor(rows: list, limit: int, kind: str, key_of) -> Optional[str]:
+    # Курсор отдаём только если страница заполнена целиком
+    if len(rows) < limit:
+        return None
+    return encode_cursor(kind, key_of(rows[-1]))
@@ -0,0 +1,99 @@
+import re
+
+from sqlalchemy import DDL, column, event, func, literal_column, or_, select, table, text
+from sqlalchemy.sql import Select
+
+from app.models.item import Item
+
+# Полнотекстовый поиск по каталогу: FTS5 на SQLite, tsvector + GIN на Postgres.
+# Индекс синхронизируется самой БД (триггеры / индекс по выражению),
+# поэтому create_laptop, update_item и delete_item ничего о нём не знают.
+
+FTS_TABLE = "items_fts"
+
+# Вес заголовка выше, чем у описания
+_SQLITE_RANK = f"bm25({FTS_TABLE}, 10.0, 1.0)"
+
+_fts = table(FTS_TABLE, column("rowid"))
+
+_SQLITE_DDL = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    "title, description, content='items', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    f"CREATE TRIGGER IF NOT EXISTS items_fts_ai AFTER INSERT ON items BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, title, description) "
+    "VALUES (new.id, new.title, new.description); END",
+    f"CREATE TRIGGER IF NOT EXISTS items_fts_ad AFTER DELETE ON items BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); END",
+    f"CREATE TRIGGER IF NOT EXISTS items_fts_au AFTER UPDATE OF title, description ON items BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); "
+    f"INSERT INTO {FTS_TABLE}(rowid, title, description) "
+    "VALUES (new.id, new.title, new.description); END",
+]
+
+_PG_DOCUMENT = (
+    "setweight(to_tsvector('simple', coalesce(items.title, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(items.description, '')), 'B')"
+)
+
+_PG_DDL = [
+    f"CREATE INDEX IF NOT EXISTS ix_items_fts ON items USING GIN (({_PG_DOCUMENT}))",
+]
+
+for _stmt in _SQLITE_DDL:
+    event.listen(Item.__table__, "after_create", DDL(_stmt).execute_if(dialect="sqlite"))
+for _stmt in _PG_DDL:
+    event.listen(Item.__table__, "after_create", DDL(_stmt).execute_if(dialect="postgresql"))
+event.listen(
+    Item.__table__, "before_drop",
+    DDL(f"DROP TABLE IF EXISTS {FTS_TABLE}").execute_if(dialect="sqlite"),
+)
+
+
+def rebuild_search_index(conn) -> None:
+    """Создать индекс на уже существующей БД и перестроить его (sync connection)"""
+    if conn.dialect.name == "sqlite":
+        for stmt in _SQLITE_DDL:
+            conn.execute(text(stmt))
+        conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+    elif conn.dialect.name == "postgresql":
+        for stmt in _PG_DDL:
+            conn.execute(text(stmt))
+
+
+def _terms(query: str) -> list[str]:
+    return re.findall(r"\w+", query.lower())
+
+
+def search_query(dialect: str, query: str) -> Select | None:
+    """Запрос ранжированного поиска; None, если в строке нет ни одного слова"""
+    terms = _terms(query)
+    if not terms:
+        return None
+
+    if dialect == "sqlite":
+        # Каждое слово — префиксный токен, все слова обязательны
+        match = " ".join(f'"{t}"*' for t in terms)
+        return (
+            select(Item)
+            .join(_fts, _fts.c.rowid == Item.id)
+            .where(text(f"{FTS_TABLE} MATCH :match").bindparams(match=match))
+            .order_by(literal_column(_SQLITE_RANK), Item.id)
+        )
+
+    if dialect == "postgresql":
+        document = literal_column(_PG_DOCUMENT)
+        tsquery = func.to_tsquery("simple", " & ".join(f"{t}:*" for t in terms))
+        return (
+            select(Item)
+            .where(document.op("@@")(tsquery))
+            .order_by(func.ts_rank(document, tsquery).desc(), Item.id)
+        )
+
+    # Прочие диалекты: без индекса, только чтобы API не ломался
+    conditions = [
+        or_(Item.title.ilike(f"%{t}%"), Item.description.ilike(f"%{t}%")) for t in terms
+    ]
+    return select(Item).where(*conditions).order_by(Item.id)
@@ -1,11 +1,22 @@
+import hashlib
+import time
 from datetime import datetime, timedelta
 from typing import Any, Union
 from jose import jwt
 from passlib.context import CryptContext
+from app.core.cache import TTLCache
 from app.core.config import settings
+from app.core.hash_pool import BoundedExecutor
 
 # Настройка хеширования (Занятие 7)
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(
+    schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS
+)
+
+# bcrypt занимает десятки-сотни миллисекунд, поэтому из async-кода он идёт через пул
+hash_pool = BoundedExecutor(
+    workers=settings.HASH_POOL_WORKERS, max_queue=settings.HASH_POOL_QUEUE, name="bcrypt"
+)
 
 def hash_password(password: str) -> str:
     return pwd_context.hash(password)
@@ -13,6 +24,12 @@ def hash_password(password: str) -> str:
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
+async def hash_password_async(password: str) -> str:
+    return await hash_pool.run(hash_password, password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await hash_pool.run(verify_password, plain_password, hashed_password)
+
 # Генерация JWT (Занятие 8)
 def create_access_token(data: dict, expires_delta: Union[timedelta, None] = None) -> str:
     to_encode = data.copy()
@@ -22,4 +39,26 @@ def create_access_token(data: dict, expires_delta: Union[timedelta, None] = None
         expire = datetime.utcnow() + timedelta(minutes=15)
     to_encode.update({"exp": expire})
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
-    return encoded_jwt
\ No newline at end of file
+    return encoded_jwt
+
+# Кэш уже проверенных токенов: ключ — sha256 токена, запись живёт до его exp.
+# При смене SECRET_KEY кэш нужно сбросить (token_cache.clear())
+token_cache = TTLCache(settings.TOKEN_CACHE_MAXSIZE, ttl=0)
+
+def decode_access_token(token: str) -> dict:
+    """Проверить подпись и claims токена; бросает JWTError"""
+    if not settings.TOKEN_CACHE_ENABLED:
+        return jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+
+    cache_key = ("token", hashlib.sha256(token.encode()).digest())
+    payload = token_cache.get(cache_key)
+    if payload is not None:
+        return payload
+
+    payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    exp = payload.get("exp")
+    if isinstance(exp, (int, float)):
+        ttl = exp - time.time()
+        if ttl > 0:
+            token_cache.set(cache_key, payload, ttl=ttl)
+    return payload
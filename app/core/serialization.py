@@ -0,0 +1,38 @@
+import json
+from datetime import date, datetime
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # orjson необязателен: без него работает stdlib json
+    orjson = None
+
+
+def _default(value: Any):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def dumps(data: Any) -> bytes:
+    """JSON в байты: orjson, если установлен, иначе stdlib json"""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"), default=_default).encode()
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse на orjson. Отдаёт уже готовые dict/list без jsonable_encoder,
+    если вернуть его из эндпоинта напрямую"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+class RawJSONResponse(JSONResponse):
+    """Ответ с заранее сериализованным телом (bytes из dumps или из кэша)"""
+
+    def render(self, content: bytes) -> bytes:
+        return content
@@ -0,0 +1,86 @@
+import re
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+
+from app.core.config import settings
+from app.core.logging import logger
+
+# Учёт SQL на запрос: события движка пишут в QueryStats текущего запроса через contextvar.
+# AsyncSession выполняет синхронный код SQLAlchemy в greenlet, который получает
+# контекст вызывающей задачи, поэтому значение видно и внутри событий движка.
+
+
+class QueryStats:
+    """Число запросов, суммарное время в БД и повторы одинаковых выражений"""
+
+    __slots__ = ("count", "duration", "statements")
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements: dict[str, int] = {}
+
+    def record(self, statement: str, duration: float) -> None:
+        self.count += 1
+        self.duration += duration
+        self.statements[statement] = self.statements.get(statement, 0) + 1
+
+    def repeated(self, threshold: int) -> dict[str, int]:
+        """Формы выражений, выполненные больше threshold раз (признак N+1)"""
+        shapes: dict[str, int] = {}
+        for statement, count in self.statements.items():
+            shape = statement_shape(statement)
+            shapes[shape] = shapes.get(shape, 0) + count
+        return {shape: count for shape, count in shapes.items() if count > threshold}
+
+
+query_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+# Списки плейсхолдеров разной длины (IN (?, ?, ?)) сводим к одной форме
+_PLACEHOLDER_LIST = re.compile(r"\(\s*(?:\?|%s|\$\d+|:\w+)(?:\s*,\s*(?:\?|%s|\$\d+|:\w+))*\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def statement_shape(statement: str) -> str:
+    return _PLACEHOLDER_LIST.sub("(...)", _WHITESPACE.sub(" ", statement).strip())
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._query_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    duration = time.perf_counter() - context._query_started
+    stats = query_stats.get()
+    if stats is not None:
+        stats.record(statement, duration)
+    if duration >= settings.SLOW_QUERY_SECONDS:
+        logger.warning(
+            "slow_query",
+            statement=_WHITESPACE.sub(" ", statement).strip(),
+            parameters=_truncate(repr(parameters)),
+            executemany=executemany,
+            duration_ms=round(duration * 1000, 1),
+        )
+
+
+def instrument_engine(engine) -> None:
+    """Подключить учёт запросов к движку (для AsyncEngine — к его sync_engine)"""
+    sync_engine = getattr(engine, "sync_engine", engine)
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def report_repeated(stats: QueryStats, method: str, route: str) -> int:
+    """Залогировать повторяющиеся выражения запроса; возвращает число найденных форм"""
+    repeated = stats.repeated(settings.N_PLUS_ONE_THRESHOLD)
+    for shape, count in repeated.items():
+        logger.warning("n_plus_one", method=method, route=route, count=count, statement=_truncate(shape))
+    return len(repeated)
+
+
+def _truncate(text: str, limit: int = 1000) -> str:
+    return text if len(text) <= limit else text[:limit] + "..."
@@ -0,0 +1,193 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+from typing import Optional
+
+from starlette.responses import Response
+from starlette.staticfiles import StaticFiles
+
+from app.core.config import settings
+from app.core.etag import coding_etag, etag_matches
+
+try:
+    import brotli
+except ImportError:  # brotli необязателен: без него отдаём gzip
+    brotli = None
+
+# Раздача фронтенда из памяти. При старте каждый файл читается один раз, для него
+# заранее строятся gzip- и brotli-варианты (если они меньше исходного), а ассеты
+# получают имена с хешем содержимого (index.3f2a9c1d0b.css) и кэшируются браузером
+# навсегда. HTML отдаётся с no-cache и ETag: браузер перепроверяет его и сразу
+# видит новые имена ассетов. Запрос не трогает диск и не тратит CPU на сжатие;
+# файлы крупнее STATIC_MAX_FILE_BYTES и всё, чего не было при старте, отдаёт StaticFiles.
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+_ENCODINGS = ("br", "gzip")
+# Ссылки на ассеты в HTML: href="..." и src="..." с относительным путём
+_ASSET_REF = re.compile(r'''(\b(?:href|src)=["'])([^"':?#]+)(["'])''')
+
+
+class StaticAsset:
+    """Файл в памяти: тело, сжатые варианты, тип, ETag и политика кэша"""
+
+    __slots__ = ("body", "variants", "media_type", "etag", "cache_control")
+
+    def __init__(self, body: bytes, media_type: str, cache_control: str):
+        self.body = body
+        self.media_type = media_type
+        self.cache_control = cache_control
+        self.etag = content_hash(body)
+        self.variants: dict[str, bytes] = {}
+        for encoding in _ENCODINGS:
+            compressed = _compress(encoding, body)
+            if compressed is not None and len(compressed) < len(body):
+                self.variants[encoding] = compressed
+
+
+class PrecompressedStatic:
+    """ASGI-приложение для app.mount: предсжатые файлы из памяти, отпечатки для ассетов"""
+
+    def __init__(self, directory: str, max_file_bytes: Optional[int] = None):
+        self.directory = directory
+        self.max_file_bytes = settings.STATIC_MAX_FILE_BYTES if max_file_bytes is None else max_file_bytes
+        self.fallback = StaticFiles(directory=directory, html=True)
+        self.assets: dict[str, StaticAsset] = {}
+        # Исходное имя ассета -> имя с отпечатком (для подстановки в HTML)
+        self.fingerprints: dict[str, str] = {}
+        self._load()
+
+    def _load(self) -> None:
+        pages = []
+        for root, _, files in os.walk(self.directory):
+            for name in sorted(files):
+                full_path = os.path.join(root, name)
+                path = os.path.relpath(full_path, self.directory).replace(os.sep, "/")
+                if os.path.getsize(full_path) > self.max_file_bytes:
+                    continue
+                with open(full_path, "rb") as f:
+                    body = f.read()
+                if path.endswith(".html"):
+                    pages.append((path, body))
+                    continue
+                # Ассет доступен и под исходным именем (с перепроверкой), и с отпечатком
+                media_type = _media_type(path)
+                self.assets[path] = StaticAsset(body, media_type, REVALIDATE)
+                stem, ext = os.path.splitext(path)
+                fingerprinted = f"{stem}.{content_hash(body)[:10]}{ext}"
+                self.fingerprints[path] = fingerprinted
+                self.assets[fingerprinted] = StaticAsset(body, media_type, IMMUTABLE)
+        # HTML — после ассетов: ссылки в нём заменяются на имена с отпечатком
+        for path, body in pages:
+            html = self._rewrite(path, body.decode())
+            self.assets[path] = StaticAsset(html.encode(), "text/html; charset=utf-8", REVALIDATE)
+
+    def _rewrite(self, page: str, html: str) -> str:
+        base = os.path.dirname(page)
+
+        def replace(match):
+            ref = match.group(2)
+            target = os.path.normpath(os.path.join(base, ref)).replace(os.sep, "/")
+            fingerprinted = self.fingerprints.get(target)
+            if fingerprinted is None:
+                return match.group(0)
+            new_ref = os.path.relpath(fingerprinted, base or ".").replace(os.sep, "/")
+            return match.group(1) + new_ref + match.group(3)
+
+        return _ASSET_REF.sub(replace, html)
+
+    async def __call__(self, scope, receive, send):
+        asset = None
+        if scope["type"] == "http" and scope["method"] in ("GET", "HEAD"):
+            path = self.fallback.get_path(scope).replace(os.sep, "/")
+            asset = self.assets.get("index.html" if path == "." else path)
+            if asset is None and path != "." and not os.path.splitext(path)[1]:
+                # Как StaticFiles(html=True): /about -> about/index.html
+                asset = self.assets.get(f"{path}/index.html")
+        if asset is None:
+            await self.fallback(scope, receive, send)
+            return
+        await self.respond(asset, scope)(scope, receive, send)
+
+    def respond(self, asset: StaticAsset, scope) -> Response:
+        headers = dict(_header(scope, name) for name in (b"accept-encoding", b"if-none-match"))
+        encoding = negotiate(headers.get(b"accept-encoding", ""), asset.variants)
+        etag = coding_etag(f'"{asset.etag}"', encoding)
+        response_headers = {
+            "Cache-Control": asset.cache_control,
+            "ETag": etag,
+            "Vary": "Accept-Encoding",
+        }
+        # 304 — только на тег того же кодирования, которое выбрано сейчас
+        if etag_matches(headers.get(b"if-none-match"), etag):
+            return Response(status_code=304, headers=response_headers)
+        body = asset.variants[encoding] if encoding else asset.body
+        if encoding:
+            response_headers["Content-Encoding"] = encoding
+        if scope["method"] == "HEAD":
+            response_headers["Content-Length"] = str(len(body))
+            body = b""
+        return Response(body, media_type=asset.media_type, headers=response_headers)
+
+    def stats(self) -> dict:
+        return {
+            "files": len(self.assets),
+            "bytes": sum(len(asset.body) for asset in self.assets.values()),
+            "compressed_bytes": sum(
+                len(variant) for asset in self.assets.values() for variant in asset.variants.values()
+            ),
+        }
+
+
+def content_hash(body: bytes) -> str:
+    return hashlib.sha256(body).hexdigest()[:16]
+
+
+def negotiate(accept_encoding: str, available, preference: tuple[str, ...] = _ENCODINGS) -> Optional[str]:
+    """Лучшее из доступных кодирований по Accept-Encoding; при равном q — по порядку
+    preference (для статики br, затем gzip). None — отдавать без сжатия"""
+    weights: dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        weight = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        if name:
+            weights[name.lower()] = weight
+    best, best_weight = None, 0.0
+    for encoding in preference:
+        weight = weights.get(encoding, weights.get("*", 0.0))
+        if encoding in available and weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+
+def _compress(encoding: str, body: bytes) -> Optional[bytes]:
+    if encoding == "gzip":
+        # mtime=0: одинаковый файл даёт одинаковые байты на всех воркерах
+        return gzip.compress(body, compresslevel=settings.STATIC_GZIP_LEVEL, mtime=0)
+    if encoding == "br" and brotli is not None:
+        return brotli.compress(body, quality=settings.STATIC_BROTLI_QUALITY)
+    return None
+
+
+def _media_type(path: str) -> str:
+    media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+    if media_type.startswith("text/") or media_type in ("application/javascript", "application/json"):
+        media_type += "; charset=utf-8"
+    return media_type
+
+
+def _header(scope, name: bytes) -> tuple[bytes, str]:
+    for key, value in scope["headers"]:
+        if key == name:
+            return name, value.decode("latin-1")
+    return name, ""
+
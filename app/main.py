@@ -1,6 +1,6 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import JSONResponse, PlainTextResponse
 import asyncio
 
 # Импорты моделей (ОБЯЗАТЕЛЬНО для создания таблиц)
@@ -9,22 +9,67 @@ from app.models.user import User
 from app.models.order import Order
 
 # Импорты проекта
-from app.api.v1 import auth, items, categories, cart, orders
+from app.api.v1 import auth, items, imports, categories, cart, orders, exports, chat, live
+from app.core.broker import broker
+from app.core.cache import catalog_cache, start_invalidation, stop_invalidation
+from app.core.compression import CompressionMiddleware, compression_metrics
 from app.core.config import settings
-from app.core.db import Base, engine 
+from app.core.consistency import ReadYourWritesMiddleware
+from app.core.security import hash_pool, token_cache
+from app.core.serialization import FastJSONResponse
+from app.core.static import PrecompressedStatic
+from app.api.deps import start_user_invalidation, stop_user_invalidation, user_cache
+from app.core.db import AsyncSessionLocal, Base, engine, replicas
+from app.core.inventory import reservation_sweeper
+from app.core.live import item_feed
+from app.core.logging import setup_logging
+from app.core.metrics import MetricsMiddleware, http_metrics, render_prometheus, stats_lines
 
-app = FastAPI(title=settings.PROJECT_NAME)
+setup_logging()
+
+app = FastAPI(
+    title=settings.PROJECT_NAME,
+    default_response_class=FastJSONResponse if settings.FAST_JSON else JSONResponse,
+)
 
 # Автоматическое создание таблиц
 async def create_tables():
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
 
+background_tasks: list[asyncio.Task] = []
+
 @app.on_event("startup")
 async def startup_event():
     # Пропускаем создание таблиц - используем SQLite
-    pass
     # await create_tables()
+    await broker.start()
+    item_feed.start(broker)
+    start_invalidation(broker)
+    start_user_invalidation(broker)
+    background_tasks.append(asyncio.create_task(reservation_sweeper(AsyncSessionLocal)))
+    background_tasks.append(asyncio.create_task(chat.manager.heartbeat()))
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    background_tasks.clear()
+    await chat.manager.close_all()
+    item_feed.stop(broker)
+    stop_invalidation(broker)
+    stop_user_invalidation(broker)
+    await broker.close()
+    await replicas.dispose()
+    hash_pool.shutdown()
+
+# Read-your-writes при репликах: метка о недавней записи уходит клиенту в cookie
+app.add_middleware(ReadYourWritesMiddleware)
+
+# Сжатие ответов — внутри метрик, чтобы его время попадало в задержку маршрута
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(CompressionMiddleware)
 
 # Настройка CORS
 app.add_middleware(
@@ -33,18 +78,58 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
+# Метрики — самый внешний слой, чтобы время включало CORS и обработку ошибок
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
 # Подключаем роутеры (убрали лишние префиксы для совместимости с твоим фронтом)
 app.include_router(auth.router, prefix="/auth", tags=["Auth"])
 app.include_router(categories.router, prefix="/categories", tags=["Categories"])
 app.include_router(items.router, prefix="/items", tags=["Items"])
+app.include_router(imports.router, prefix="/items", tags=["Items"])
 app.include_router(cart.router, prefix="/cart", tags=["Cart"])
 app.include_router(orders.router, prefix="/orders", tags=["Orders"])
+app.include_router(exports.router, prefix="/exports", tags=["Exports"])
+app.include_router(chat.router, prefix="/chat", tags=["Chat"])
+app.include_router(live.router, prefix="/live", tags=["Live"])
 
 @app.get("/health")
 async def health_check():
     return {"status": "ok"}
 
-# Раздача фронтенда (важно: папка frontend/public)
-app.mount("/", StaticFiles(directory="frontend/public", html=True), name="frontend")
\ No newline at end of file
+@app.get("/health/cache")
+async def cache_stats():
+    return {
+        "catalog": catalog_cache.stats(),
+        "users": user_cache.stats(),
+        "tokens": token_cache.stats(),
+    }
+
+@app.get("/health/hashing")
+async def hashing_stats():
+    return hash_pool.stats()
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    body = render_prometheus(
+        http_metrics.render(),
+        compression_metrics.render(),
+        stats_lines("app_cache", "Статистика кэшей в памяти процесса", {
+            "catalog": catalog_cache.stats(),
+            "users": user_cache.stats(),
+            "tokens": token_cache.stats(),
+        }),
+        stats_lines("app_hash_pool", "Пул потоков bcrypt", {"bcrypt": hash_pool.stats()}),
+        stats_lines("app_ws", "WebSocket-соединения и рассылка", {"chat": chat.manager.stats()}),
+        stats_lines("app_broker", "Брокер рассылки между воркерами", {settings.BROKER: broker.stats()}),
+        stats_lines("app_live", "Живая лента цен и остатков (SSE)", {"items": item_feed.stats()}),
+        stats_lines("app_static", "Фронтенд в памяти", {"frontend": frontend.stats()}),
+    )
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4; charset=utf-8")
+
+# Раздача фронтенда (важно: папка frontend/public) — из памяти, заранее сжатая
+frontend = PrecompressedStatic(settings.STATIC_DIR)
+app.mount("/", frontend, name="frontend")
\ No newline at end of file
@@ -1,4 +1,4 @@
-from sqlalchemy import String, Float, ForeignKey, Integer, Text
+from sqlalchemy import String, Float, ForeignKey, Integer, Text, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.core.db import Base
 
@@ -20,6 +20,14 @@ class Item(Base):
     description: Mapped[str] = mapped_column(Text)
     price: Mapped[float] = mapped_column(Float) # Цена должна быть > 0 [cite: 53]
     stock_quantity: Mapped[int] = mapped_column(Integer, default=0) # Остаток на складе
+    sku: Mapped[str] = mapped_column(String(64), unique=True, nullable=True) # Артикул поставщика
     
     category_id: Mapped[int] = mapped_column(ForeignKey("categories.id"))
-    category: Mapped["Category"] = relationship("Category", back_populates="items")
\ No newline at end of file
+    category: Mapped["Category"] = relationship("Category", back_populates="items")
+
+    # Составные индексы под keyset-пагинацию GET /items: (price, id) и (id) с фильтром по категории
+    __table_args__ = (
+        Index("ix_items_price_id", "price", "id"),
+        Index("ix_items_category_id_id", "category_id", "id"),
+        Index("ix_items_category_id_price_id", "category_id", "price", "id"),
+    )
\ No newline at end of file
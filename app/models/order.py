@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, ForeignKey, Float, String, DateTime, Enum
+from sqlalchemy import Column, Integer, ForeignKey, Float, String, DateTime, Enum, Index, UniqueConstraint
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.sql import func
 import enum
@@ -18,6 +18,21 @@ class CartItem(Base): # Занятие 15 [cite: 75]
     item_id: Mapped[int] = mapped_column(ForeignKey("items.id"))
     quantity: Mapped[int] = mapped_column(default=1)
 
+    # Одна строка корзины на товар: повторное добавление увеличивает quantity
+    __table_args__ = (UniqueConstraint("user_id", "item_id", name="uq_cart_items_user_id_item_id"),)
+
+class StockReservation(Base): # Резерв остатка под корзину, живёт до expires_at
+    __tablename__ = "stock_reservations"
+    id: Mapped[int] = mapped_column(primary_key=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"))
+    item_id: Mapped[int] = mapped_column(ForeignKey("items.id"))
+    quantity: Mapped[int] = mapped_column(Integer)
+    expires_at: Mapped[DateTime] = mapped_column(DateTime, index=True)
+
+    __table_args__ = (
+        Index("ix_stock_reservations_user_id_item_id", "user_id", "item_id"),
+    )
+
 class Order(Base): # Занятие 16 [cite: 85]
     __tablename__ = "orders"
     id: Mapped[int] = mapped_column(primary_key=True)
@@ -30,10 +45,13 @@ class Order(Base): # Занятие 16 [cite: 85]
     
     items: Mapped[list["OrderItem"]] = relationship("OrderItem")
 
+    # История заказов: WHERE user_id = ? ORDER BY id DESC (индекс читается в обратном порядке)
+    __table_args__ = (Index("ix_orders_user_id_id", "user_id", "id"),)
+
 class OrderItem(Base): # Занятие 16 [cite: 86]
     __tablename__ = "order_items"
     id: Mapped[int] = mapped_column(primary_key=True)
-    order_id: Mapped[int] = mapped_column(ForeignKey("orders.id"))
+    order_id: Mapped[int] = mapped_column(ForeignKey("orders.id"), index=True)
     item_id: Mapped[int] = mapped_column(ForeignKey("items.id"))
     quantity: Mapped[int] = mapped_column(default=1)
     price: Mapped[float] = mapped_column(Float)  # Фиксируем цену на момент покупки
\ No newline at end of file
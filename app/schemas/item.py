@@ -6,6 +6,8 @@ class ItemBase(BaseModel):
     description: str
     price: float = Field(..., gt=0) # Валидация: цена больше 0 [cite: 53]
     category_id: int
+    sku: Optional[str] = Field(None, min_length=1, max_length=64) # Артикул поставщика
+    stock_quantity: Optional[int] = Field(None, ge=0) # Свободный остаток (резервы уже вычтены)
 
 class ItemCreate(ItemBase):
     pass # Используется при создании товара
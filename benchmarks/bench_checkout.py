@@ -0,0 +1,70 @@
+"""Задержка оформления заказа (POST /orders) для корзин из 1, 10 и 100 строк.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_checkout --iterations 200
+"""
+import argparse
+import asyncio
+import json
+
+from benchmarks.common import Timer, create_schema, prepare_app, summarize
+
+LINE_COUNTS = (1, 10, 100)
+
+
+async def seed(items: int) -> str:
+    from app.core.db import AsyncSessionLocal
+    from app.core.security import create_access_token
+    from app.models.item import Category, Item
+    from app.models.user import User
+
+    async with AsyncSessionLocal() as session:
+        category = Category(name="Bench")
+        user = User(email="bench@example.com", hashed_password="x")
+        session.add_all([category, user])
+        await session.flush()
+        session.add_all([
+            Item(title=f"Laptop {i}", description="bench", price=100 + i,
+                 stock_quantity=10**9, category_id=category.id)
+            for i in range(items)
+        ])
+        await session.commit()
+    return create_access_token(data={"sub": "bench@example.com"})
+
+
+async def run(iterations: int) -> dict:
+    import httpx
+
+    app, _ = prepare_app()
+    await create_schema()
+    token = await seed(max(LINE_COUNTS))
+    headers = {"Authorization": f"Bearer {token}"}
+
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for lines in LINE_COUNTS:
+            payload = {
+                "items": [{"item_id": i + 1, "quantity": 1} for i in range(lines)],
+                "delivery_address": "bench",
+                "delivery_phone": "0",
+            }
+            samples = []
+            for _ in range(iterations):
+                with Timer() as timer:
+                    response = await client.post("/orders/", json=payload, headers=headers)
+                response.raise_for_status()
+                samples.append(timer.elapsed)
+            results[f"{lines}_lines"] = summarize(samples)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.iterations)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Сериализация страниц каталога: прежний путь FastAPI против быстрого пути.
+
+Прежний путь: ORM-объекты Item -> валидация list[ItemResponse] (response_model)
+-> jsonable_encoder -> json.dumps в JSONResponse. Быстрый путь: строки с
+колонками ItemResponse -> dict -> dumps (orjson) сразу в байты. Замеряется
+выборка из БД вместе с сериализацией, для страниц в 10, 100 и 1000 товаров:
+
+    python -m benchmarks.bench_serialization --iterations 200
+"""
+import argparse
+import asyncio
+import json
+
+from benchmarks.common import Timer, create_schema, prepare_app, summarize
+
+
+async def seed(items: int) -> None:
+    from sqlalchemy import insert
+
+    from app.core.db import AsyncSessionLocal
+    from app.models.item import Category, Item
+
+    async with AsyncSessionLocal() as db:
+        await db.execute(insert(Category).values(id=1, name="Bench"))
+        await db.execute(insert(Item), [
+            {"title": f"Laptop {i}", "description": "Ноутбук для бенчмарка " * 4,
+             "price": 100 + i % 1000 + 0.99, "stock_quantity": i % 50,
+             "sku": f"SKU-{i:06d}", "category_id": 1}
+            for i in range(items)
+        ])
+        await db.commit()
+
+
+async def legacy_page(db, size: int) -> bytes:
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+    from pydantic import TypeAdapter
+    from sqlalchemy import select
+
+    from app.models.item import Item
+    from app.schemas.item import ItemResponse
+
+    result = await db.execute(select(Item).order_by(Item.id).limit(size))
+    items = result.scalars().all()
+    validated = TypeAdapter(list[ItemResponse]).validate_python(items, from_attributes=True)
+    return JSONResponse(jsonable_encoder(validated)).body
+
+
+async def fast_page(db, size: int) -> bytes:
+    from sqlalchemy import select
+
+    from app.api.v1.items import _ITEM_COLUMNS, _items_json
+    from app.models.item import Item
+
+    result = await db.execute(select(*_ITEM_COLUMNS).order_by(Item.id).limit(size))
+    return _items_json(result.all())
+
+
+async def run(sizes: list[int], iterations: int) -> dict:
+    from app.core import serialization
+    from app.core.db import AsyncSessionLocal
+
+    await create_schema()
+    await seed(max(sizes))
+
+    results = {"orjson": serialization.orjson is not None}
+    for size in sizes:
+        async with AsyncSessionLocal() as db:
+            # Оба пути должны отдавать одинаковые данные
+            assert json.loads(await legacy_page(db, size)) == json.loads(await fast_page(db, size))
+            for name, page in (("legacy", legacy_page), ("fast", fast_page)):
+                samples = []
+                for _ in range(iterations):
+                    with Timer() as timer:
+                        await page(db, size)
+                    samples.append(timer.elapsed)
+                    db.expunge_all()  # Иначе legacy брал бы объекты из identity map
+                results[f"{name}_{size}"] = summarize(samples)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    args = parser.parse_args()
+
+    prepare_app()
+    print(json.dumps(asyncio.run(run(args.sizes, args.iterations)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
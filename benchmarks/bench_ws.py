@@ -0,0 +1,168 @@
+"""Бенчмарк WebSocket-чата: N одновременных соединений на одном воркере uvicorn.
+
+Поднимает uvicorn в отдельном процессе, открывает --connections сокетов продавцов
+(все сидят в комнате sellers) и один сокет покупателя, который шлёт --broadcasts
+сообщений. Каждое сообщение хаб раскладывает по очередям всех продавцов, поэтому
+замеряется полный путь рассылки. В отчёте: скорость подключения, RSS сервера на
+соединение, задержка доставки каждому получателю и время до последнего получателя.
+
+    python -m benchmarks.bench_ws --connections 10000
+
+Клиенты и сервер делят одну машину: на малом числе ядер задержка включает и
+разбор кадров самими клиентами. Каждому процессу нужно около --connections
+файловых дескрипторов (ulimit -n).
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+
+from benchmarks.common import free_port, prepare_app, summarize, wait_ready
+
+
+def _rss_mb(pid: int) -> float:
+    with open(f"/proc/{pid}/status") as f:
+        kib = int(re.search(r"^VmRSS:\s+(\d+)", f.read(), re.M).group(1))
+    return kib / 1024
+
+
+async def _prepare_users(path: str, connections: int) -> list[str]:
+    """База с покупателем (id=1) и connections продавцами; токены в том же порядке"""
+    from sqlalchemy import update
+
+    from app.core.db import engine
+    from app.core.security import create_access_token
+    from app.models.user import User
+    from benchmarks import seed
+
+    await seed.prepare(path, items=100, users=connections + 1, orders=0, cart_lines=1)
+    async with engine.begin() as conn:
+        await conn.execute(update(User).where(User.id > 1).values(role="admin"))
+    await engine.dispose()
+    return [create_access_token(data={"sub": f"bench-{i}@example.com"}) for i in range(connections + 1)]
+
+
+class Listener:
+    """Сокет продавца: отмечает время прихода каждого сообщения рассылки"""
+
+    __slots__ = ("ws", "arrivals", "task")
+
+    def __init__(self, ws):
+        self.ws = ws
+        self.arrivals: dict[str, float] = {}
+        self.task = asyncio.create_task(self._read())
+
+    async def _read(self):
+        async for frame in self.ws:
+            # Полный разбор JSON у десяти тысяч клиентов съел бы процессор сервера
+            if '"type":"message"' in frame:
+                marker = frame[frame.index("bench-"):].split('"', 1)[0]
+                self.arrivals[marker] = time.perf_counter()
+
+
+async def _open(url: str, token: str, gate: asyncio.Semaphore):
+    from websockets.asyncio.client import connect
+
+    async with gate:
+        # Протокольные ping от клиента не нужны: живость проверяет сервер
+        return await connect(f"{url}?token={token}", ping_interval=None, max_queue=None)
+
+
+async def _server_stat(base_url: str, field: str) -> float:
+    import httpx
+
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        text = (await client.get("/metrics")).text
+    match = re.search(rf'^app_ws\{{source="chat",field="{field}"\}} (\S+)$', text, re.M)
+    return float(match.group(1)) if match else float("nan")
+
+
+async def measure(base_url: str, server_pid: int, tokens: list[str], broadcasts: int,
+                  pause: float, concurrency: int) -> dict:
+    url = base_url.replace("http", "ws", 1) + "/chat/ws"
+    gate = asyncio.Semaphore(concurrency)
+    rss_before = _rss_mb(server_pid)
+
+    started = time.perf_counter()
+    sockets = await asyncio.gather(*(_open(url, token, gate) for token in tokens[1:]))
+    connect_s = time.perf_counter() - started
+    listeners = [Listener(ws) for ws in sockets]
+    buyer = await _open(url, tokens[0], gate)
+    await asyncio.sleep(1.0)  # Дать серверу дообработать подключения перед замером памяти
+    rss_after = _rss_mb(server_pid)
+
+    latencies, completion, delivered = [], [], 0
+    for n in range(broadcasts):
+        marker = f"bench-{n}"
+        sent_at = time.perf_counter()
+        await buyer.send(json.dumps({"type": "message", "text": marker}))
+        deadline = sent_at + 30
+        while time.perf_counter() < deadline:
+            received = sum(marker in listener.arrivals for listener in listeners)
+            if received == len(listeners):
+                break
+            await asyncio.sleep(0.01)
+        arrivals = [listener.arrivals[marker] - sent_at for listener in listeners if marker in listener.arrivals]
+        delivered += len(arrivals)
+        latencies.extend(arrivals)
+        if arrivals:
+            completion.append(max(arrivals))
+        await asyncio.sleep(pause)
+
+    slow_evictions = await _server_stat(base_url, "slow_evictions")
+    server_connections = await _server_stat(base_url, "connections")
+    for listener in listeners:
+        listener.task.cancel()
+    await asyncio.gather(*(ws.close() for ws in [*sockets, buyer]), return_exceptions=True)
+
+    return {
+        "connections": len(sockets),
+        "server_connections": int(server_connections),
+        "connect_s": round(connect_s, 2),
+        "connects_per_sec": round(len(sockets) / connect_s, 1),
+        "server_rss_mb": {"before": round(rss_before, 1), "after": round(rss_after, 1)},
+        "server_kib_per_connection": round((rss_after - rss_before) * 1024 / len(sockets), 1),
+        "broadcasts": broadcasts,
+        "delivered_ratio": round(delivered / (broadcasts * len(listeners)), 4),
+        "slow_evictions": int(slow_evictions),
+        "delivery_latency": summarize(latencies) if latencies else None,
+        "fanout_completion": summarize(completion) if completion else None,
+    }
+
+
+async def run(args) -> dict:
+    _, path = prepare_app()
+    tokens = await _prepare_users(path, args.connections)
+
+    port = free_port()
+    # uvicorn наследует DATABASE_URL, выставленный prepare_app
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port),
+         "--log-level", "warning", "--ws", "websockets-sansio", "--backlog", "4096"],
+        env=os.environ.copy(),
+    )
+    try:
+        base_url = f"http://127.0.0.1:{port}"
+        await wait_ready(base_url)
+        return await measure(base_url, server.pid, tokens, args.broadcasts, args.pause, args.concurrency)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--connections", type=int, default=10_000)
+    parser.add_argument("--broadcasts", type=int, default=20)
+    parser.add_argument("--pause", type=float, default=0.2, help="пауза между рассылками, с")
+    parser.add_argument("--concurrency", type=int, default=200, help="одновременных подключений")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Общие помощники для бенчмарков: приложение на отдельной SQLite-базе и статистика"""
+import asyncio
+import os
+import socket
+import statistics
+import tempfile
+import time
+
+
+def prepare_app(db_path: str | None = None):
+    """Импортировать приложение, направив его на свежую SQLite-базу.
+
+    DATABASE_URL читается при импорте app.core.config, поэтому вызывать
+    до любого импорта из app.
+    """
+    if db_path is None:
+        db_path = os.path.join(tempfile.mkdtemp(prefix="indicator-bench-"), "bench.db")
+    os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{db_path}"
+    # Логи медленных запросов и SQL засыпали бы вывод бенчмарка
+    os.environ.setdefault("LOG_LEVEL", "ERROR")
+
+    from app.main import app
+    return app, db_path
+
+
+async def create_schema():
+    from app.core.db import Base, engine
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def wait_ready(base_url: str, timeout: float = 30.0) -> None:
+    """Дождаться, пока сервер начнёт отвечать на /health"""
+    import httpx
+
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get("/health")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"server at {base_url} did not become ready")
+
+
+def percentile(samples: list[float], q: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(q / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(samples: list[float]) -> dict:
+    """Сводка по задержкам в миллисекундах"""
+    return {
+        "count": len(samples),
+        "mean_ms": round(statistics.fmean(samples) * 1000, 3),
+        "p50_ms": round(percentile(samples, 50) * 1000, 3),
+        "p95_ms": round(percentile(samples, 95) * 1000, 3),
+        "p99_ms": round(percentile(samples, 99) * 1000, 3),
+    }
+
+
+class Timer:
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.started
@@ -0,0 +1,335 @@
+"""Нагрузочный тест по сценариям: каталог, корзина и оформление заказа.
+
+Виртуальные пользователи регистрируются, входят и дальше случайно (по весам)
+листают каталог, работают с корзиной и оформляют заказы. Приложение
+нагружается в процессе (ASGI-транспорт httpx), через uvicorn в отдельном
+процессе или по адресу уже запущенного сервера:
+
+    python -m benchmarks.loadtest --users 20 --duration 10
+    python -m benchmarks.loadtest --uvicorn --users 50 --duration 30
+    python -m benchmarks.loadtest --url http://localhost:8000 --duration 30
+
+С --baseline сравнивает RPS и p50/p95/p99 по каждому эндпоинту с сохранённым
+отчётом и завершается с кодом 1, если что-то вышло за --tolerance (или были
+ошибки 5xx). --save-baseline записывает текущий отчёт как новый baseline.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+from collections import Counter, defaultdict
+from typing import Optional
+
+from benchmarks.common import create_schema, free_port, prepare_app, summarize, wait_ready
+
+PASSWORD = "load-test-password"
+LATENCY_KEYS = ("p50_ms", "p95_ms", "p99_ms")
+TAIL_KEYS = ("p95_ms", "p99_ms")
+
+
+class Recorder:
+    """Задержки, ошибки (5xx и сбои соединения) и отказы (4xx) по имени эндпоинта"""
+
+    def __init__(self):
+        self.samples: dict[str, list[float]] = defaultdict(list)
+        self.errors: Counter = Counter()
+        self.rejected: Counter = Counter()
+
+    async def call(self, client, name: str, method: str, url: str, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except Exception:
+            self.errors[name] += 1
+            return None
+        self.samples[name].append(time.perf_counter() - started)
+        if response.status_code >= 500:
+            self.errors[name] += 1
+        elif response.status_code >= 400:
+            self.rejected[name] += 1
+        return response
+
+    def report(self, elapsed: float) -> dict:
+        endpoints = {}
+        for name in sorted(self.samples.keys() | self.errors.keys()):
+            samples = self.samples.get(name, [])
+            endpoints[name] = {
+                "requests": len(samples),
+                "rps": round(len(samples) / elapsed, 1),
+                "errors": self.errors[name],
+                "rejected": self.rejected[name],
+                **(summarize(samples) if samples else {}),
+            }
+        total = sum(len(samples) for samples in self.samples.values())
+        return {
+            "total": {
+                "requests": total,
+                "rps": round(total / elapsed, 1),
+                "errors": sum(self.errors.values()),
+            },
+            "endpoints": endpoints,
+        }
+
+
+# --- Сценарии ---------------------------------------------------------------
+
+async def browse(client, rec: Recorder, headers: dict, rng: random.Random, seen: list[int]) -> None:
+    """Каталог: первая страница, пара страниц по курсору, карточка товара, иногда поиск"""
+    params = {"limit": 20, "sort": rng.choice(["id", "price", "-price"])}
+    for _ in range(rng.randint(1, 3)):
+        response = await rec.call(client, "GET /items/", "GET", "/items/", params=params)
+        if response is None or response.status_code != 200:
+            return
+        seen.extend(item["id"] for item in response.json())
+        del seen[:-200]
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+        params = {**params, "cursor": cursor}
+    if seen:
+        await rec.call(client, "GET /items/{item_id}", "GET", f"/items/{rng.choice(seen)}")
+    if rng.random() < 0.3:
+        await rec.call(client, "GET /items/search", "GET", "/items/search", params={"q": "laptop"})
+
+
+async def cart(client, rec: Recorder, headers: dict, rng: random.Random, seen: list[int]) -> None:
+    """Корзина: положить товар, посмотреть, убрать"""
+    if not seen:
+        return await browse(client, rec, headers, rng, seen)
+    item_id = rng.choice(seen)
+    await rec.call(client, "POST /cart/", "POST", "/cart/", params={"item_id": item_id}, headers=headers)
+    await rec.call(client, "GET /cart/", "GET", "/cart/", headers=headers)
+    await rec.call(client, "DELETE /cart/{item_id}", "DELETE", f"/cart/{item_id}", headers=headers)
+
+
+async def checkout(client, rec: Recorder, headers: dict, rng: random.Random, seen: list[int]) -> None:
+    """Покупка: 1–3 товара в корзину, заказ, список заказов"""
+    if not seen:
+        return await browse(client, rec, headers, rng, seen)
+    lines = {item_id: rng.randint(1, 2) for item_id in rng.sample(seen, min(len(seen), rng.randint(1, 3)))}
+    for item_id, quantity in lines.items():
+        await rec.call(
+            client, "POST /cart/", "POST", "/cart/",
+            params={"item_id": item_id, "quantity": quantity}, headers=headers,
+        )
+    await rec.call(client, "POST /orders/", "POST", "/orders/", headers=headers, json={
+        "items": [{"item_id": item_id, "quantity": quantity} for item_id, quantity in lines.items()],
+        "delivery_address": "load test",
+        "delivery_phone": "0",
+    })
+    await rec.call(client, "GET /orders/", "GET", "/orders/", params={"limit": 10}, headers=headers)
+
+
+SCENARIOS = (browse, cart, checkout)
+WEIGHTS = (0.6, 0.25, 0.15)
+
+
+async def sign_up(client, rec: Recorder, email: str) -> Optional[dict]:
+    """Регистрация и вход; заголовки с токеном или None"""
+    await rec.call(client, "POST /auth/register", "POST", "/auth/register",
+                   json={"email": email, "password": PASSWORD})
+    response = await rec.call(client, "POST /auth/login", "POST", "/auth/login",
+                              data={"username": email, "password": PASSWORD})
+    if response is None or response.status_code != 200:
+        return None
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+async def virtual_user(client, rec: Recorder, headers: dict, rng: random.Random, deadline: float) -> None:
+    seen: list[int] = []
+    while time.perf_counter() < deadline:
+        scenario = rng.choices(SCENARIOS, WEIGHTS)[0]
+        await scenario(client, rec, headers, rng, seen)
+
+
+async def drive(client, users: int, duration: float, seed: int) -> dict:
+    """Сначала все входят (bcrypt), затем duration секунд смешанной нагрузки.
+
+    Вход меряется отдельно: его RPS считается по своей фазе и в total не входит.
+    """
+    tag = uuid.uuid4().hex[:8]
+    auth = Recorder()
+    started = time.perf_counter()
+    sessions = await asyncio.gather(*[
+        sign_up(client, auth, f"load-{tag}-{i}@example.com") for i in range(users)
+    ])
+    auth_elapsed = time.perf_counter() - started
+
+    rec = Recorder()
+    started = time.perf_counter()
+    deadline = started + duration
+    await asyncio.gather(*[
+        virtual_user(client, rec, headers, random.Random(seed * 1000 + i), deadline)
+        for i, headers in enumerate(sessions) if headers is not None
+    ])
+    report = rec.report(time.perf_counter() - started)
+    report["endpoints"].update(auth.report(auth_elapsed)["endpoints"])
+    report["total"]["errors"] += sum(auth.errors.values())
+    report["signed_in"] = sum(headers is not None for headers in sessions)
+    return report
+
+
+async def repeat(client, args) -> dict:
+    """Несколько прогонов подряд; в отчёт идут медианы — один неудачный прогон не решает"""
+    reports = [await drive(client, args.users, args.duration, args.seed + i) for i in range(args.runs)]
+    return reports[0] if len(reports) == 1 else merge(reports)
+
+
+def merge(reports: list[dict]) -> dict:
+    def combine(parts: list[dict]) -> dict:
+        merged = {}
+        for key in parts[0]:
+            values = [part[key] for part in parts if key in part]
+            summed = key in ("requests", "errors", "rejected", "count")
+            merged[key] = sum(values) if summed else round(statistics.median(values), 3)
+        return merged
+
+    names = sorted({name for report in reports for name in report["endpoints"]})
+    return {
+        "total": combine([report["total"] for report in reports]),
+        "endpoints": {
+            name: combine([r["endpoints"][name] for r in reports if name in r["endpoints"]])
+            for name in names
+        },
+        "signed_in": min(report["signed_in"] for report in reports),
+    }
+
+
+# --- Подготовка стенда --------------------------------------------------------
+
+async def seed_catalog(items: int) -> None:
+    from sqlalchemy import insert
+
+    from app.core.db import AsyncSessionLocal
+    from app.models.item import Category, Item
+
+    rng = random.Random(0)
+    async with AsyncSessionLocal() as db:
+        await db.execute(insert(Category), [{"id": i, "name": f"Load {i}"} for i in range(1, 6)])
+        await db.execute(insert(Item), [
+            {"title": f"Laptop {i}", "description": "Ноутбук для нагрузочного теста",
+             "price": round(rng.uniform(300, 3000), 2), "stock_quantity": 10**9,
+             "category_id": 1 + i % 5}
+            for i in range(items)
+        ])
+        await db.commit()
+
+
+async def run(args) -> dict:
+    import httpx
+
+    limits = httpx.Limits(max_connections=args.users, max_keepalive_connections=args.users)
+    meta = {"users": args.users, "duration_s": args.duration, "seed": args.seed, "runs": args.runs}
+
+    if args.url:
+        async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=30) as client:
+            return {"mode": "url", **meta, **await repeat(client, args)}
+
+    app, _ = prepare_app()
+    await create_schema()
+    await seed_catalog(args.items)
+
+    if not args.uvicorn:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://load", timeout=30) as client:
+            return {"mode": "asgi", **meta, **await repeat(client, args)}
+
+    # uvicorn наследует DATABASE_URL, выставленный prepare_app
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        env=os.environ.copy(),
+    )
+    try:
+        base_url = f"http://127.0.0.1:{port}"
+        await wait_ready(base_url)
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+            return {"mode": "uvicorn", **meta, **await repeat(client, args)}
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+
+# --- Сравнение с baseline -----------------------------------------------------
+
+def compare(
+    report: dict, baseline: dict, tolerance: float, min_delta_ms: float,
+    tail_tolerance: Optional[float] = None,
+) -> list[str]:
+    """Список регрессий: падение RPS или рост задержек больше tolerance, ошибки 5xx.
+
+    Хвосты (p95/p99) на коротких прогонах шумят сильнее, для них отдельный tail_tolerance.
+    """
+    if tail_tolerance is None:
+        tail_tolerance = tolerance
+    problems = []
+    for key in ("mode", "users", "duration_s", "runs"):
+        if report.get(key) != baseline.get(key):
+            problems.append(f"{key}: {report.get(key)} != baseline {baseline.get(key)}, numbers are not comparable")
+    if report["total"]["errors"]:
+        problems.append(f"total: {report['total']['errors']} errors")
+
+    pairs = [("total", report["total"], baseline["total"])]
+    for name, base in baseline["endpoints"].items():
+        current = report["endpoints"].get(name)
+        if current is None or not current["requests"]:
+            problems.append(f"{name}: no successful requests (baseline {base['requests']})")
+            continue
+        pairs.append((name, current, base))
+
+    for name, current, base in pairs:
+        if current["rps"] < base["rps"] * (1 - tolerance):
+            problems.append(f"{name}: rps {current['rps']} < baseline {base['rps']}")
+        for key in LATENCY_KEYS:
+            if key not in base or key not in current:
+                continue
+            limit = base[key] * (1 + (tail_tolerance if key in TAIL_KEYS else tolerance))
+            if current[key] > limit and current[key] - base[key] > min_delta_ms:
+                problems.append(f"{name}: {key} {current[key]} > baseline {base[key]}")
+    return problems
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--url", help="адрес запущенного сервера вместо приложения в процессе")
+    target.add_argument("--uvicorn", action="store_true", help="поднять uvicorn в отдельном процессе")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--items", type=int, default=2000, help="размер каталога для своей базы")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--runs", type=int, default=1, help="прогонов подряд, в отчёт — медианы")
+    parser.add_argument("--baseline", help="JSON-отчёт, с которым сравнивать")
+    parser.add_argument("--save-baseline", help="сохранить отчёт как baseline")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="допустимое ухудшение, доля")
+    parser.add_argument("--tail-tolerance", type=float, default=1.0, help="то же для p95 и p99")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0,
+                        help="рост задержки меньше этого не считается регрессией")
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(run(args))
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+            f.write("\n")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        problems = compare(report, baseline, args.tolerance, args.min_delta_ms, args.tail_tolerance)
+        for problem in problems:
+            print(f"REGRESSION {problem}", file=sys.stderr)
+        return 1 if problems else 0
+    return 1 if report["total"]["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
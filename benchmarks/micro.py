@@ -0,0 +1,350 @@
+"""Микробенчмарки горячих примитивов: JWT, bcrypt, сериализация, запросы каталога и заказов.
+
+Запросы идут к детерминированной базе из benchmarks.seed (по умолчанию 100 000
+товаров), результаты пишутся в JSON, который можно сравнивать между коммитами:
+
+    python -m benchmarks.micro --output before.json
+    git checkout <другой коммит>
+    python -m benchmarks.micro --output after.json
+    python -m benchmarks.micro --diff before.json after.json
+"""
+import argparse
+import asyncio
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from typing import Awaitable, Callable, Optional
+
+from benchmarks.common import percentile
+
+SUITE: list[tuple[str, Callable, int]] = []
+
+
+def bench(name: str, iterations: int = 500):
+    """Зарегистрировать бенчмарк: фабрика получает контекст и возвращает корутину-шаг"""
+    def register(factory):
+        SUITE.append((name, factory, iterations))
+        return factory
+    return register
+
+
+async def measure(step: Callable[[], Awaitable], iterations: int) -> dict:
+    for _ in range(max(1, iterations // 10)):
+        await step()
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        await step()
+        samples.append(time.perf_counter() - started)
+    return {
+        "iterations": iterations,
+        "ops_per_sec": round(iterations / sum(samples), 1),
+        "mean_us": round(statistics.fmean(samples) * 1e6, 1),
+        "p50_us": round(percentile(samples, 50) * 1e6, 1),
+        "p95_us": round(percentile(samples, 95) * 1e6, 1),
+    }
+
+
+# --- JWT и текущий пользователь ----------------------------------------------
+
+@bench("jwt.create_access_token", 5000)
+async def _create_token(ctx):
+    from app.core.security import create_access_token
+
+    async def step():
+        create_access_token(data={"sub": ctx["email"]})
+    return step
+
+
+@bench("jwt.decode.uncached", 5000)
+async def _decode_uncached(ctx):
+    from app.core.config import settings
+    from app.core.security import decode_access_token
+
+    async def step():
+        settings.TOKEN_CACHE_ENABLED = False
+        try:
+            decode_access_token(ctx["token"])
+        finally:
+            settings.TOKEN_CACHE_ENABLED = ctx["token_cache_enabled"]
+    return step
+
+
+@bench("jwt.decode.cached", 5000)
+async def _decode_cached(ctx):
+    from app.core.security import decode_access_token
+
+    async def step():
+        decode_access_token(ctx["token"])
+    return step
+
+
+@bench("deps.get_current_user.cold", 1000)
+async def _current_user_cold(ctx):
+    from app.api.deps import get_current_user, user_cache
+    from app.core.db import AsyncSessionLocal
+    from app.core.security import token_cache
+
+    async def step():
+        token_cache.clear()
+        user_cache.clear()
+        async with AsyncSessionLocal() as db:
+            await get_current_user(db=db, token=ctx["token"])
+    return step
+
+
+@bench("deps.get_current_user.warm", 5000)
+async def _current_user_warm(ctx):
+    from app.api.deps import get_current_user
+    from app.core.db import AsyncSessionLocal
+
+    async def step():
+        async with AsyncSessionLocal() as db:
+            await get_current_user(db=db, token=ctx["token"])
+    return step
+
+
+# --- bcrypt ------------------------------------------------------------------
+
+@bench("bcrypt.hash_password", 10)
+async def _hash(ctx):
+    from app.core.security import hash_password
+
+    async def step():
+        hash_password("bench-password")
+    return step
+
+
+@bench("bcrypt.verify_password", 10)
+async def _verify(ctx):
+    from app.core.security import hash_password, verify_password
+
+    hashed = hash_password("bench-password")
+
+    async def step():
+        verify_password("bench-password", hashed)
+    return step
+
+
+# --- Сериализация страницы из 1000 товаров ------------------------------------
+
+async def _page_rows(columns: bool):
+    from sqlalchemy import select
+
+    from app.api.v1.items import _ITEM_COLUMNS
+    from app.core.db import AsyncSessionLocal
+    from app.models.item import Item
+
+    async with AsyncSessionLocal() as db:
+        query = select(*_ITEM_COLUMNS) if columns else select(Item)
+        result = await db.execute(query.order_by(Item.id).limit(1000))
+        return result.all() if columns else result.scalars().all()
+
+
+@bench("serialize.item_response.1000", 200)
+async def _serialize_pydantic(ctx):
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+    from pydantic import TypeAdapter
+
+    from app.schemas.item import ItemResponse
+
+    items = await _page_rows(columns=False)
+    adapter = TypeAdapter(list[ItemResponse])
+
+    async def step():
+        JSONResponse(jsonable_encoder(adapter.validate_python(items, from_attributes=True)))
+    return step
+
+
+@bench("serialize.fast_rows.1000", 200)
+async def _serialize_fast(ctx):
+    from app.api.v1.items import _items_json
+
+    rows = await _page_rows(columns=True)
+
+    async def step():
+        _items_json(rows)
+    return step
+
+
+# --- Запросы за эндпоинтами ----------------------------------------------------
+
+def _catalog_page(**params):
+    async def factory(ctx):
+        from app.api.v1.items import _fetch_laptops
+        from app.core.db import AsyncSessionLocal
+
+        args = {"skip": 0, "limit": 20, "cursor": None, "category_id": None,
+                "min_price": None, "max_price": None, "sort": "id", **params}
+
+        async def step():
+            async with AsyncSessionLocal() as db:
+                await _fetch_laptops(db, **args)
+        return step
+    return factory
+
+
+def _deep_cursor(kind: str, key: list) -> str:
+    from app.core.pagination import encode_cursor
+
+    return encode_cursor(kind, key)
+
+
+bench("query.read_laptops.first_page", 1000)(_catalog_page())
+bench("query.read_laptops.offset_90000", 200)(_catalog_page(skip=90_000))
+bench("query.read_laptops.cursor_by_id_deep", 1000)(
+    _catalog_page(cursor=_deep_cursor("id", [90_000]))
+)
+bench("query.read_laptops.cursor_by_price_deep", 1000)(
+    _catalog_page(sort="price", cursor=_deep_cursor("price", [4000.0, 0]))
+)
+bench("query.read_laptops.category_price_range", 1000)(
+    _catalog_page(category_id=3, min_price=1000, max_price=1500, sort="price")
+)
+
+
+@bench("query.search", 500)
+async def _search(ctx):
+    from app.core.db import AsyncSessionLocal
+    from app.core.search import search_query
+
+    async def step():
+        async with AsyncSessionLocal() as db:
+            query = search_query(db.bind.dialect.name, "lenovo тихий")
+            (await db.execute(query.limit(20))).all()
+    return step
+
+
+@bench("query.view_cart", 1000)
+async def _view_cart(ctx):
+    from app.api.v1.cart import view_cart
+    from app.core.db import AsyncSessionLocal
+
+    async def step():
+        async with AsyncSessionLocal() as db:
+            await view_cart(db=db, user=ctx["user"])
+    return step
+
+
+@bench("query.get_order_detail", 1000)
+async def _order_detail(ctx):
+    from app.api.v1.orders import get_order_detail
+    from app.core.db import AsyncSessionLocal
+
+    async def step():
+        async with AsyncSessionLocal() as db:
+            await get_order_detail(order_id=ctx["order_id"], db=db, user=ctx["user"])
+    return step
+
+
+# --- Запуск и сравнение --------------------------------------------------------
+
+async def run(params: dict, only: Optional[str], scale: float) -> dict:
+    from benchmarks import seed
+
+    await seed.prepare(params.pop("path"), **params)
+
+    from app.api.deps import CurrentUser
+    from app.core.config import settings
+    from app.core.security import create_access_token
+
+    ctx = {
+        "email": seed.BENCH_USER_EMAIL,
+        "token": create_access_token(data={"sub": seed.BENCH_USER_EMAIL}),
+        "token_cache_enabled": settings.TOKEN_CACHE_ENABLED,
+        "user": CurrentUser(id=1, email=seed.BENCH_USER_EMAIL, role="user", is_active=True),
+        "order_id": 10,  # Каждый десятый заказ принадлежит пользователю 1
+    }
+    results = {}
+    for name, factory, iterations in SUITE:
+        if only and only not in name:
+            continue
+        step = await factory(ctx)
+        results[name] = await measure(step, max(1, int(iterations * scale)))
+        print(f"{name:45} p50 {results[name]['p50_us']:>12} us", file=sys.stderr)
+    return results
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def diff(old: dict, new: dict, threshold: float) -> int:
+    """Таблица изменений p50; возвращает число бенчмарков, ставших медленнее threshold"""
+    print(f"{'benchmark':45} {'old p50 us':>12} {'new p50 us':>12} {'change':>8}")
+    slower = 0
+    for name in sorted(old["results"].keys() | new["results"].keys()):
+        before, after = old["results"].get(name), new["results"].get(name)
+        if before is None or after is None:
+            print(f"{name:45} {'-' if before is None else before['p50_us']:>12} "
+                  f"{'-' if after is None else after['p50_us']:>12}")
+            continue
+        change = after["p50_us"] / before["p50_us"] - 1 if before["p50_us"] else 0.0
+        mark = ""
+        if change > threshold:
+            mark, slower = "  slower", slower + 1
+        elif change < -threshold:
+            mark = "  faster"
+        print(f"{name:45} {before['p50_us']:>12} {after['p50_us']:>12} {change:>+8.1%}{mark}")
+    return slower
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--db", help="файл SQLite с данными (создаётся, если его нет)")
+    parser.add_argument("--only", help="запускать бенчмарки, в имени которых есть подстрока")
+    parser.add_argument("--scale", type=float, default=1.0, help="множитель числа итераций")
+    parser.add_argument("--output", help="куда записать JSON с результатами")
+    parser.add_argument("--diff", nargs=2, metavar=("OLD", "NEW"), help="сравнить два JSON")
+    parser.add_argument("--threshold", type=float, default=0.1, help="порог изменения для --diff")
+    parser.add_argument("--strict", action="store_true", help="с --diff: код 1, если что-то замедлилось")
+    args = parser.parse_args()
+
+    if args.diff:
+        with open(args.diff[0]) as f_old, open(args.diff[1]) as f_new:
+            slower = diff(json.load(f_old), json.load(f_new), args.threshold)
+        sys.exit(1 if slower and args.strict else 0)
+
+    from benchmarks import seed
+    from benchmarks.common import prepare_app
+
+    path = args.db or seed.default_path(args.items, args.seed)
+    prepare_app(path)
+
+    from app.core.config import settings
+    from app.core.serialization import orjson
+
+    params = {"path": path, "items": args.items, "seed": args.seed}
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "items": args.items,
+            "seed": args.seed,
+            "bcrypt_rounds": settings.BCRYPT_ROUNDS,
+            "orjson": orjson is not None,
+            "scale": args.scale,
+        },
+        "results": asyncio.run(run(params, args.only, args.scale)),
+    }
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
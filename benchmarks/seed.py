@@ -0,0 +1,142 @@
+"""Детерминированное наполнение базы для бенчмарков.
+
+Одинаковые параметры дают байт-в-байт одинаковые данные (фиксированный seed,
+фиксированные даты), поэтому результаты разных коммитов сравнимы. Первый
+пользователь (id=1) — «покупатель бенчмарков» с полной корзиной и заказами.
+
+    python -m benchmarks.seed --items 100000 --path /tmp/bench.db
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+from datetime import datetime, timedelta
+
+CATEGORIES = ("Ультрабуки", "Игровые", "Рабочие станции", "Трансформеры", "Бюджетные", "Хромбуки")
+BRANDS = ("Acer", "Asus", "Dell", "HP", "Lenovo", "MSI", "Apple", "Huawei")
+WORDS = ("лёгкий", "тонкий", "мощный", "тихий", "автономный", "яркий", "надёжный", "быстрый")
+
+BENCH_USER_EMAIL = "bench-0@example.com"
+EPOCH = datetime(2024, 1, 1)
+BATCH = 10_000
+
+
+def default_path(items: int, seed: int) -> str:
+    return os.path.join(tempfile.gettempdir(), f"indicator-bench-{items}-{seed}.db")
+
+
+def _batches(rows, size: int = BATCH):
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+async def seed(items: int = 100_000, users: int = 1000, orders: int = 10_000,
+               cart_lines: int = 20, seed: int = 0) -> dict:
+    """Заполнить пустую базу приложения (DATABASE_URL уже выставлен); вернуть сводку"""
+    from sqlalchemy import insert
+
+    from app.core.db import engine
+    from app.models.item import Category, Item
+    from app.models.order import CartItem, Order, OrderItem
+    from app.models.user import User
+
+    rng = random.Random(seed)
+    prices = [round(rng.uniform(250, 4500), 2) for _ in range(items)]
+
+    async with engine.begin() as conn:
+        await conn.execute(insert(Category), [
+            {"id": i + 1, "name": name, "description": f"Категория {name}"}
+            for i, name in enumerate(CATEGORIES)
+        ])
+        item_rows = [
+            {
+                "id": i + 1,
+                "title": f"{rng.choice(BRANDS)} {rng.choice(WORDS).title()} {i:06d}",
+                "description": " ".join(rng.choices(WORDS, k=12)),
+                "price": prices[i],
+                "stock_quantity": rng.randint(0, 500),
+                "sku": f"SKU-{seed}-{i:06d}",
+                "category_id": rng.randint(1, len(CATEGORIES)),
+            }
+            for i in range(items)
+        ]
+        for batch in _batches(item_rows):
+            await conn.execute(insert(Item), batch)
+
+        await conn.execute(insert(User), [
+            {"id": i + 1, "email": f"bench-{i}@example.com", "hashed_password": "x",
+             "is_active": True, "role": "user"}
+            for i in range(users)
+        ])
+        await conn.execute(insert(CartItem), [
+            {"user_id": 1, "item_id": item_id, "quantity": rng.randint(1, 3)}
+            for item_id in rng.sample(range(1, items + 1), cart_lines)
+        ])
+
+        order_rows, line_rows = [], []
+        for order_id in range(1, orders + 1):
+            # Каждый десятый заказ — у покупателя бенчмарков, чтобы у него была история
+            user_id = 1 if order_id % 10 == 0 else rng.randint(2, users)
+            lines = [
+                (item_id, rng.randint(1, 3))
+                for item_id in rng.sample(range(1, items + 1), rng.randint(1, 5))
+            ]
+            order_rows.append({
+                "id": order_id, "user_id": user_id, "status": "pending",
+                "total_price": round(sum(prices[item_id - 1] * q for item_id, q in lines), 2),
+                "delivery_address": "Dushanbe", "delivery_phone": "+992000000000",
+                "created_at": EPOCH + timedelta(minutes=order_id),
+            })
+            line_rows.extend(
+                {"order_id": order_id, "item_id": item_id, "quantity": q, "price": prices[item_id - 1]}
+                for item_id, q in lines
+            )
+        for batch in _batches(order_rows):
+            await conn.execute(insert(Order), batch)
+        for batch in _batches(line_rows):
+            await conn.execute(insert(OrderItem), batch)
+
+    return {"items": items, "users": users, "orders": orders, "order_lines": len(line_rows),
+            "cart_lines": cart_lines, "seed": seed}
+
+
+async def prepare(path: str, **params) -> bool:
+    """Создать схему и заполнить базу, если файла ещё нет; True — если заполняли"""
+    from benchmarks.common import create_schema
+
+    if os.path.exists(path):
+        return False
+    try:
+        await create_schema()
+        await seed(**params)
+    except BaseException:
+        # Недозаполненную базу не оставляем: следующий запуск принял бы её за готовую
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+        raise
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=100_000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--orders", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--path", help="файл SQLite (по умолчанию во временном каталоге)")
+    args = parser.parse_args()
+
+    from benchmarks.common import prepare_app
+
+    path = args.path or default_path(args.items, args.seed)
+    prepare_app(path)
+    created = asyncio.run(prepare(
+        path, items=args.items, users=args.users, orders=args.orders, seed=args.seed,
+    ))
+    print(f"{'created' if created else 'reused'}: {path}")
+
+
+if __name__ == "__main__":
+    main()
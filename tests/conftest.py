@@ -16,9 +16,10 @@ def database():
     Base.metadata.create_all(bind=engine)
     yield
     Base.metadata.drop_all(bind=engine)
-    # Удаляем файл БД после тестов
-    if os.path.exists("test.db"):
-        os.remove("test.db")
+    # Удаляем файл БД после тестов (вместе с WAL-файлами SQLite)
+    for path in ("test.db", "test.db-wal", "test.db-shm"):
+        if os.path.exists(path):
+            os.remove(path)
 
 @pytest.fixture
 def db_session(database):
@@ -31,6 +32,18 @@ def db_session(database):
     yield session
     session.close()
 
+@pytest.fixture
+def admin_headers(database, db_session):
+    """Токен администратора"""
+    import uuid
+    from app.core.security import create_access_token
+    from app.models.user import User
+
+    email = f"admin-{uuid.uuid4().hex[:8]}@example.com"
+    db_session.add(User(email=email, hashed_password="x", role="admin"))
+    db_session.commit()
+    return {"Authorization": f"Bearer {create_access_token(data={'sub': email})}"}
+
 @pytest.fixture
 def client():
     """Предоставляет TestClient для FastAPI"""
@@ -38,3 +51,27 @@ def client():
     from app.main import app
     
     return TestClient(app)
+
+@pytest.fixture
+def live_client():
+    """Клиент с запущенным приложением (startup/shutdown) и одним event loop на все соединения"""
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    with TestClient(app) as test_client:
+        yield test_client
+
+@pytest.fixture
+def max_queries(monkeypatch):
+    """Проверка числа SQL-запросов на HTTP-запрос (по заголовку X-DB-Query-Count режима DEBUG)"""
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings, "DEBUG", True)
+
+    def check(response, limit: int) -> int:
+        count = int(response.headers["X-DB-Query-Count"])
+        request = response.request
+        assert count <= limit, f"{request.method} {request.url.path}: {count} SQL-запросов, максимум {limit}"
+        return count
+
+    return check
@@ -61,3 +61,174 @@ class TestAuthentication:
         response = client.get("/health")
         assert response.status_code == 200
         assert response.json()["status"] == "ok"
+
+
+class TestCurrentUser:
+    """Тесты get_current_user и кэша пользователей"""
+
+    def _token(self, email):
+        client.post("/auth/register", json={"email": email, "password": "testpass123"})
+        response = client.post("/auth/login", data={"username": email, "password": "testpass123"})
+        return response.json()["access_token"]
+
+    def test_resolves_user_and_caches(self, database):
+        from app.api.deps import user_cache
+
+        token = self._token("current_user@example.com")
+        headers = {"Authorization": f"Bearer {token}"}
+        assert client.get("/cart/", headers=headers).status_code == 200
+        hits = user_cache.hits
+        assert client.get("/cart/", headers=headers).status_code == 200
+        assert user_cache.hits == hits + 1
+
+    def test_deactivation_invalidates_cache(self, database, db_session):
+        from app.models.user import User
+
+        token = self._token("deactivated@example.com")
+        headers = {"Authorization": f"Bearer {token}"}
+        assert client.get("/cart/", headers=headers).status_code == 200
+
+        user = db_session.query(User).filter_by(email="deactivated@example.com").one()
+        user.is_active = False
+        db_session.commit()
+        assert client.get("/cart/", headers=headers).status_code == 403
+
+    def test_invalidated_after_commit_only(self, database, db_session):
+        from app.api.deps import user_cache
+        from app.models.user import User
+
+        token = self._token("role_change@example.com")
+        headers = {"Authorization": f"Bearer {token}"}
+        assert client.get("/cart/", headers=headers).status_code == 200
+
+        user = db_session.query(User).filter_by(email="role_change@example.com").one()
+        user.role = "admin"
+        db_session.flush()
+        # До commit в БД ещё старая строка: кэш не трогаем
+        assert user_cache.get(("user", "role_change@example.com")) is not None
+        db_session.rollback()
+        assert user_cache.get(("user", "role_change@example.com")) is not None
+
+        user.role = "admin"
+        db_session.commit()
+        assert user_cache.get(("user", "role_change@example.com")) is None
+
+    def test_invalidation_from_other_worker(self, database):
+        import json
+        from app.api.deps import USER_INVALIDATION_ROOM, _ORIGIN, _on_user_invalidation, user_cache
+
+        token = self._token("other_worker@example.com")
+        assert client.get("/cart/", headers={"Authorization": f"Bearer {token}"}).status_code == 200
+        key = ("user", "other_worker@example.com")
+
+        own = json.dumps({"origin": _ORIGIN, "emails": [key[1]]})
+        _on_user_invalidation(USER_INVALIDATION_ROOM, [own])
+        assert user_cache.get(key) is not None  # Своё сообщение уже применено локально
+        other = json.dumps({"origin": "other", "emails": [key[1]]})
+        _on_user_invalidation(USER_INVALIDATION_ROOM, [other])
+        assert user_cache.get(key) is None
+
+    def test_unknown_subject(self, database):
+        from app.core.security import create_access_token
+
+        token = create_access_token(data={"sub": "ghost@example.com"})
+        response = client.get("/cart/", headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 401
+
+
+class TestHashPool:
+    """Тесты пула потоков для bcrypt"""
+
+    async def test_rejects_when_saturated(self):
+        import asyncio
+        import threading
+        from app.core.hash_pool import BoundedExecutor, PoolSaturated
+
+        pool = BoundedExecutor(workers=1, max_queue=1, name="test-hash")
+        release = threading.Event()
+        running = [asyncio.ensure_future(pool.run(release.wait)) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        assert pool.stats()["queue_depth"] == 1
+
+        with pytest.raises(PoolSaturated):
+            await pool.run(release.wait)
+
+        release.set()
+        await asyncio.gather(*running)
+        stats = pool.stats()
+        assert stats["completed"] == 2
+        assert stats["rejected"] == 1
+        assert stats["in_flight"] == 0
+        pool.shutdown()
+
+    async def test_cancelled_caller_keeps_slot_until_job_ends(self):
+        import asyncio
+        import threading
+        from app.core.hash_pool import BoundedExecutor, PoolSaturated
+
+        pool = BoundedExecutor(workers=1, max_queue=0, name="test-hash")
+        release = threading.Event()
+        waiter = asyncio.ensure_future(pool.run(release.wait))
+        await asyncio.sleep(0.05)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+
+        # Поток всё ещё занят bcrypt: новое место не освободилось
+        assert pool.stats()["in_flight"] == 1
+        with pytest.raises(PoolSaturated):
+            await pool.run(release.wait)
+
+        release.set()
+        await asyncio.sleep(0.05)
+        assert pool.stats()["in_flight"] == 0
+        pool.shutdown()
+        assert await pool.run(sum, (1, 2)) == 3  # После shutdown потоки создаются заново
+        pool.shutdown()
+
+    def test_login_returns_503_when_pool_busy(self, database, monkeypatch):
+        from app.core.hash_pool import PoolSaturated
+        from app.core import security
+
+        async def saturated(*args):
+            raise PoolSaturated()
+
+        monkeypatch.setattr(security.hash_pool, "run", saturated)
+        response = client.post("/auth/register", json={"email": "busy@example.com", "password": "x"})
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "1"
+
+
+class TestTokenCache:
+    """Тесты кэша проверенных JWT"""
+
+    def test_second_decode_skips_verification(self, monkeypatch):
+        from app.core import security
+
+        token = security.create_access_token(data={"sub": "memo@example.com"})
+        assert security.decode_access_token(token)["sub"] == "memo@example.com"
+
+        def fail(*args, **kwargs):
+            raise AssertionError("signature verified twice")
+
+        monkeypatch.setattr(security.jwt, "decode", fail)
+        hits = security.token_cache.hits
+        assert security.decode_access_token(token)["sub"] == "memo@example.com"
+        assert security.token_cache.hits == hits + 1
+
+    def test_invalid_token_not_cached(self):
+        from jose import JWTError
+        from app.core import security
+
+        size = security.token_cache.stats()["size"]
+        with pytest.raises(JWTError):
+            security.decode_access_token("not.a.token")
+        assert security.token_cache.stats()["size"] == size
+
+    def test_disabled(self, monkeypatch):
+        from app.core import security
+
+        monkeypatch.setattr(security.settings, "TOKEN_CACHE_ENABLED", False)
+        token = security.create_access_token(data={"sub": "nocache@example.com"})
+        size = security.token_cache.stats()["size"]
+        security.decode_access_token(token)
+        assert security.token_cache.stats()["size"] == size
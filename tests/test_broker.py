@@ -0,0 +1,170 @@
+import asyncio
+import multiprocessing
+import os
+import pytest
+from app.core.broker import MemoryBroker, Relay, RelayBroker, run_relay
+from app.core.hub import ConnectionManager
+from tests.test_chat import FakeWebSocket
+
+
+class Inbox:
+    """Подписчик, запоминающий полученные пакеты"""
+
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, room, messages):
+        self.batches.append((room, messages))
+
+
+async def wait_for(condition, timeout=2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline, "условие не выполнилось"
+        await asyncio.sleep(0.01)
+
+
+class TestMemoryBroker:
+    """Тесты пакетирования и схлопывания"""
+
+    async def test_batches_and_coalesces_by_key(self):
+        broker = MemoryBroker(batch_seconds=0.01, max_batch=100)
+        inbox = Inbox()
+        broker.subscribe("items", inbox)
+        broker.publish("items", "a1", key=1)
+        broker.publish("items", "b", key=2)
+        broker.publish("items", "a2", key=1)
+        broker.publish("items", "free")
+        assert inbox.batches == []
+
+        await wait_for(lambda: inbox.batches)
+        assert inbox.batches == [("items", ["b", "a2", "free"])]
+        assert broker.stats()["coalesced"] == 1
+
+    async def test_full_batch_sent_immediately(self):
+        broker = MemoryBroker(batch_seconds=60, max_batch=3)
+        inbox = Inbox()
+        broker.subscribe("room", inbox)
+        for n in range(4):
+            broker.publish("room", str(n))
+        assert inbox.batches == [("room", ["0", "1", "2"])]
+        broker.flush()
+        assert inbox.batches[-1] == ("room", ["3"])
+
+    async def test_hub_subscribes_only_to_local_rooms(self):
+        broker = MemoryBroker(batch_seconds=0.001)
+        hub = ConnectionManager(broker=broker)
+        ws = FakeWebSocket()
+        conn = await hub.connect(ws, 1, ["buyer:1"])
+        assert set(broker.handlers) == {"buyer:1"}
+
+        hub.broadcast("buyer:1", "hello")
+        await wait_for(lambda: ws.sent)
+        assert ws.sent == ["hello"]
+
+        hub.disconnect(conn)
+        assert broker.handlers == {}
+
+
+@pytest.fixture
+async def relay(tmp_path):
+    """Ретранслятор в том же event loop и путь к его сокету"""
+    path = str(tmp_path / "relay.sock")
+    instance = Relay()
+    server = await instance.serve(path)
+    yield instance, path
+    server.close()
+    await server.wait_closed()
+
+
+class TestRelayBroker:
+    """Тесты рассылки между воркерами через ретранслятор"""
+
+    async def test_cross_worker_fanout(self, relay):
+        instance, path = relay
+        worker_a, worker_b = RelayBroker(path, batch_seconds=0.001), RelayBroker(path, batch_seconds=0.001)
+        await worker_a.start()
+        await worker_b.start()
+        hub_a, hub_b = ConnectionManager(broker=worker_a), ConnectionManager(broker=worker_b)
+        ws_a, ws_b = FakeWebSocket(), FakeWebSocket()
+        await hub_a.connect(ws_a, 1, ["sellers"])
+        conn_b = await hub_b.connect(ws_b, 2, ["sellers", "buyer:2"])
+        await wait_for(lambda: len(instance.rooms.get("sellers", ())) == 2)
+
+        # Сообщение, опубликованное на воркере B, получают соединения обоих воркеров
+        hub_b.broadcast("sellers", "to all sellers")
+        await wait_for(lambda: ws_a.sent and ws_b.sent)
+        assert ws_a.sent == ws_b.sent == ["to all sellers"]
+
+        # Комната без подписчиков на A не пересылается на A
+        hub_a.broadcast("buyer:2", "to buyer")
+        await wait_for(lambda: "to buyer" in ws_b.sent)
+        assert worker_a.stats()["batches_in"] == 1
+        assert len(instance.rooms["buyer:2"]) == 1 and len(instance.rooms["sellers"]) == 2
+
+        hub_b.disconnect(conn_b)
+        await wait_for(lambda: "buyer:2" not in instance.rooms)
+        await worker_a.close()
+        await worker_b.close()
+        await wait_for(lambda: not instance.rooms)
+
+    async def test_subscribes_once_relay_appears(self, tmp_path):
+        path = str(tmp_path / "relay.sock")
+        worker = RelayBroker(path, batch_seconds=0.001)
+        await worker.start()  # Ретранслятора ещё нет: подключение в фоне
+        assert not worker.connected
+        worker.subscribe("room", Inbox())
+
+        instance = Relay()
+        server = await instance.serve(path)
+        await wait_for(lambda: "room" in instance.rooms, timeout=5)
+        assert worker.connected
+        await worker.close()
+        server.close()
+        await server.wait_closed()
+
+    async def test_resync_after_lost_messages(self, tmp_path):
+        path = str(tmp_path / "relay.sock")
+        worker = RelayBroker(path, batch_seconds=0.001)
+        resyncs = []
+        worker.resync_handlers.append(lambda: resyncs.append(worker.connected))
+        await worker.start()
+        worker.publish("room", "lost")
+        worker.flush()
+        assert worker.stats()["dropped"] == 1 and resyncs == []
+
+        # Пакет потерян: после подключения подписчики сбрасывают то, что могли пропустить
+        instance = Relay()
+        server = await instance.serve(path)
+        await wait_for(lambda: resyncs, timeout=5)
+        assert resyncs == [True]
+        await worker.close()
+        server.close()
+        await server.wait_closed()
+
+    async def test_relay_in_separate_process(self, tmp_path):
+        path = str(tmp_path / "relay.sock")
+        process = multiprocessing.get_context("spawn").Process(
+            target=_relay_process, args=(path,), daemon=True
+        )
+        process.start()
+        try:
+            await wait_for(lambda: os.path.exists(path), timeout=10)
+            sender, receiver = RelayBroker(path, batch_seconds=0.001), RelayBroker(path, batch_seconds=0.001)
+            await sender.start()
+            await receiver.start()
+            inbox = Inbox()
+            receiver.subscribe("items", inbox)
+            await asyncio.sleep(0.1)  # Подписка должна дойти до ретранслятора
+            sender.publish("items", '{"id":1}')
+            await wait_for(lambda: inbox.batches)
+            assert inbox.batches == [("items", ['{"id":1}'])]
+            await sender.close()
+            await receiver.close()
+        finally:
+            process.terminate()
+            process.join(5)
+
+
+def _relay_process(path):
+    asyncio.run(run_relay(path))
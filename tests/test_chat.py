@@ -0,0 +1,140 @@
+import asyncio
+import json
+import pytest
+from starlette.websockets import WebSocketDisconnect, WebSocketState
+from app.api.v1.chat import manager
+from app.core.hub import CLOSE_GOING_AWAY, CLOSE_TRY_AGAIN_LATER, ConnectionManager, PING
+
+
+@pytest.fixture
+def chat_users(database, db_session):
+    """Два покупателя и продавец с токенами"""
+    import uuid
+    from app.core.security import create_access_token
+    from app.models.user import User
+
+    tag = uuid.uuid4().hex[:8]
+    users = [
+        User(email=f"chat-{name}-{tag}@example.com", hashed_password="x", role=role)
+        for name, role in (("alice", "user"), ("bob", "user"), ("seller", "admin"))
+    ]
+    db_session.add_all(users)
+    db_session.commit()
+    return {
+        user.email.split("-")[1]: (user.id, create_access_token(data={"sub": user.email}))
+        for user in users
+    }
+
+
+def receive_message(ws):
+    """Следующее сообщение чата, пропуская ping"""
+    while True:
+        event = ws.receive_json()
+        if event["type"] != "ping":
+            return event
+
+
+class TestChatEndpoint:
+    """Тесты WebSocket-чата покупателей и продавцов"""
+
+    def test_rejects_invalid_token(self, database, live_client):
+        with pytest.raises(WebSocketDisconnect) as exc:
+            with live_client.websocket_connect("/chat/ws?token=bad"):
+                pass
+        assert exc.value.code == 1008
+
+    def test_buyer_message_reaches_sellers_only(self, live_client, chat_users):
+        alice_id, alice = chat_users["alice"]
+        _, bob = chat_users["bob"]
+        _, seller = chat_users["seller"]
+        with live_client.websocket_connect(f"/chat/ws?token={alice}") as alice_ws, \
+                live_client.websocket_connect(f"/chat/ws?token={bob}") as bob_ws, \
+                live_client.websocket_connect(f"/chat/ws?token={seller}") as seller_ws:
+            alice_ws.send_json({"type": "message", "text": "Есть в наличии?"})
+            for ws in (alice_ws, seller_ws):
+                event = receive_message(ws)
+                assert event["buyer_id"] == alice_id and event["role"] == "buyer"
+                assert event["text"] == "Есть в наличии?"
+
+            # Ответ продавца покупателю; bob получает только его собственные сообщения
+            seller_ws.send_json({"type": "message", "to": alice_id, "text": "Да"})
+            assert receive_message(alice_ws)["text"] == "Да"
+            bob_ws.send_json({"type": "message", "text": "Привет"})
+            assert receive_message(bob_ws)["text"] == "Привет"
+            assert receive_message(seller_ws)["text"] == "Да"
+            assert receive_message(seller_ws)["text"] == "Привет"
+
+    def test_invalid_frames_return_errors(self, live_client, chat_users):
+        _, seller = chat_users["seller"]
+        with live_client.websocket_connect(f"/chat/ws?token={seller}") as ws:
+            ws.send_text("not json")
+            assert receive_message(ws)["detail"] == "Invalid JSON"
+            ws.send_json({"type": "message", "text": "кому?"})
+            assert receive_message(ws)["detail"] == "Seller messages need 'to'"
+
+    def test_disconnect_cleans_indexes(self, live_client, chat_users):
+        alice_id, alice = chat_users["alice"]
+        with live_client.websocket_connect(f"/chat/ws?token={alice}"):
+            assert alice_id in manager.clients
+        # Отключение обрабатывается в loop приложения — даём ему шаг
+        live_client.portal.call(asyncio.sleep, 0.05)
+        assert alice_id not in manager.clients
+        assert f"buyer:{alice_id}" not in manager.rooms
+
+
+class FakeWebSocket:
+    """WebSocket, который либо принимает сообщения сразу, либо зависает на отправке"""
+
+    def __init__(self, stalled=False):
+        self.sent = []
+        self.closed_with = None
+        self.stalled = stalled
+        self.application_state = WebSocketState.CONNECTED
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text):
+        if self.stalled:
+            await asyncio.Event().wait()
+        self.sent.append(text)
+
+    async def close(self, code=1000):
+        self.closed_with = code
+        self.application_state = WebSocketState.DISCONNECTED
+
+
+class TestConnectionManager:
+    """Тесты хаба: очереди, вытеснение и heartbeat"""
+
+    async def test_slow_consumer_does_not_stall_broadcast(self):
+        hub = ConnectionManager(queue_size=2, heartbeat_seconds=60, idle_seconds=60)
+        fast, slow = FakeWebSocket(), FakeWebSocket(stalled=True)
+        await hub.connect(fast, 1, ["room"])
+        slow_conn = await hub.connect(slow, 2, ["room"])
+
+        for i in range(5):
+            hub.publish(["room"], json.dumps({"n": i}))
+            await asyncio.sleep(0)
+        await asyncio.sleep(0.01)
+
+        assert [json.loads(text)["n"] for text in fast.sent] == [0, 1, 2, 3, 4]
+        assert slow.closed_with == CLOSE_TRY_AGAIN_LATER
+        assert slow_conn.closed and hub.rooms["room"] == {next(iter(hub.clients[1]))}
+        assert hub.stats()["slow_evictions"] == 1
+        await hub.close_all()
+
+    async def test_sweep_pings_and_evicts_idle(self):
+        hub = ConnectionManager(queue_size=8, heartbeat_seconds=60, idle_seconds=10)
+        active, idle = FakeWebSocket(), FakeWebSocket()
+        active_conn = await hub.connect(active, 1, ["a"])
+        idle_conn = await hub.connect(idle, 2, ["a"])
+        idle_conn.last_seen -= 11
+
+        assert hub.sweep() == 1
+        await asyncio.sleep(0.01)
+        assert active.sent == [PING]
+        assert idle.closed_with == CLOSE_GOING_AWAY
+        assert hub.connections == {active_conn}
+        await hub.close_all()
+        assert active.closed_with == CLOSE_GOING_AWAY and not hub.rooms
@@ -0,0 +1,140 @@
+import asyncio
+import random
+import zlib
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+from app.core.compression import CompressionMetrics, CompressionMiddleware
+from app.core.etag import etag_matches
+
+ROWS = [{"id": n, "title": "Laptop", "price": 999.0} for n in range(200)]
+
+
+async def rows(request):
+    return JSONResponse(ROWS)
+
+
+async def small(request):
+    return JSONResponse({"ok": True})
+
+
+async def image(request):
+    return Response(b"\x89PNG" * 1000, media_type="image/png")
+
+
+async def noise(request):
+    return Response(random.Random(0).randbytes(2048), media_type="application/json")
+
+
+async def tagged(request):
+    if etag_matches(request.headers.get("if-none-match"), '"v1"'):
+        return Response(status_code=304, headers={"ETag": '"v1"'})
+    return JSONResponse(ROWS, headers={"ETag": '"v1"'})
+
+
+async def export(request):
+    async def lines():
+        for row in ROWS[:3]:
+            yield JSONResponse(row).body + b"\n"
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@pytest.fixture
+def compressed():
+    """Приложение за CompressionMiddleware с порогом 512 байт и своими метриками"""
+    metrics = CompressionMetrics()
+    app = Starlette(routes=[
+        Route("/rows", rows), Route("/small", small), Route("/image", image),
+        Route("/noise", noise), Route("/export", export), Route("/tagged", tagged),
+    ])
+    app.add_middleware(CompressionMiddleware, min_size=512, metrics=metrics)
+    return metrics, TestClient(app)
+
+
+async def collect(app, path: str, accept_encoding: bytes = b"gzip") -> list[dict]:
+    """Все сообщения ASGI-ответа"""
+    messages = []
+
+    async def receive():
+        await asyncio.Event().wait()  # Тела запроса нет, клиент не отключается
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {
+        "type": "http", "asgi": {"spec_version": "2.4"}, "method": "GET",
+        "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "",
+        "headers": [(b"accept-encoding", accept_encoding)],
+    }
+    await app(scope, receive, send)
+    return messages
+
+
+class TestCompressionMiddleware:
+    """Тесты сжатия ответов по размеру, типу и Accept-Encoding"""
+
+    def test_large_json_compressed(self, compressed):
+        metrics, client = compressed
+        response = client.get("/rows", headers={"Accept-Encoding": "gzip"})
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.headers["vary"] == "Accept-Encoding"
+        assert response.json() == ROWS
+        assert int(response.headers["content-length"]) < len(JSONResponse(ROWS).body) / 5
+
+        key = ("GET", "/rows", "gzip")
+        assert metrics.responses[key] == 1
+        assert metrics.bytes_in[key] == len(JSONResponse(ROWS).body)
+        assert metrics.bytes_out[key] == int(response.headers["content-length"])
+        assert metrics.ratio[("GET", "/rows")].count == 1
+
+    def test_skips_small_typed_and_refused(self, compressed):
+        metrics, client = compressed
+        small_response = client.get("/small", headers={"Accept-Encoding": "gzip"})
+        assert "content-encoding" not in small_response.headers
+        assert small_response.headers["vary"] == "Accept-Encoding"
+        assert "content-encoding" not in client.get("/image", headers={"Accept-Encoding": "gzip"}).headers
+        assert "content-encoding" not in client.get("/rows", headers={"Accept-Encoding": "identity"}).headers
+        noise = client.get("/noise", headers={"Accept-Encoding": "gzip"})
+        assert "content-encoding" not in noise.headers and len(noise.content) == 2048
+        assert metrics.skipped == {"small": 1, "type": 1, "incompressible": 1}
+        assert not metrics.responses
+
+    def test_etag_per_coding(self, compressed):
+        _, client = compressed
+        gz = client.get("/tagged", headers={"Accept-Encoding": "gzip"})
+        plain = client.get("/tagged", headers={"Accept-Encoding": "identity"})
+        assert gz.headers["etag"] == '"v1-gz"' and plain.headers["etag"] == '"v1"'
+
+        # Тег сжатой версии даёт 304 с тем же тегом, но только для того же кодирования
+        again = client.get("/tagged", headers={"Accept-Encoding": "gzip", "If-None-Match": '"v1-gz"'})
+        assert again.status_code == 304 and again.headers["etag"] == '"v1-gz"'
+        assert again.headers["vary"] == "Accept-Encoding"
+        identity = client.get("/tagged", headers={"Accept-Encoding": "identity", "If-None-Match": '"v1-gz"'})
+        assert identity.status_code == 200
+        plain_again = client.get("/tagged", headers={"Accept-Encoding": "gzip", "If-None-Match": '"v1"'})
+        assert plain_again.status_code == 304 and plain_again.headers["etag"] == '"v1"'
+
+    async def test_stream_compressed_per_chunk(self, compressed):
+        metrics, client = compressed
+        messages = await collect(client.app, "/export")
+        headers = dict(messages[0]["headers"])
+        assert headers[b"content-encoding"] == b"gzip"
+        assert b"content-length" not in headers
+
+        # Каждый кусок распаковывается сразу, не дожидаясь конца потока
+        decoder = zlib.decompressobj(31)
+        chunks = [decoder.decompress(m["body"]) for m in messages[1:] if m["body"]]
+        assert chunks[0] == JSONResponse(ROWS[0]).body + b"\n"
+        assert b"".join(chunks) == b"".join(JSONResponse(row).body + b"\n" for row in ROWS[:3])
+        assert decoder.eof and messages[-1]["more_body"] is False
+        assert metrics.responses[("GET", "/export", "gzip")] == 1
+
+    def test_metrics_endpoint_exposes_compression(self):
+        from app.main import app
+
+        client = TestClient(app)
+        body = client.get("/metrics", headers={"Accept-Encoding": "gzip"}).text
+        assert "# TYPE http_compression_ratio histogram" in body
+        assert "# TYPE http_compression_cpu_seconds_total counter" in body
@@ -0,0 +1,68 @@
+import csv
+import io
+import json
+from datetime import datetime
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.core.security import create_access_token
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def orders(db_session):
+    """Старый и новый заказ с одной строкой каждый"""
+    from app.models.order import Order, OrderItem
+
+    old = Order(user_id=1, total_price=10, status="paid", created_at=datetime(2020, 1, 1))
+    new = Order(user_id=1, total_price=20, status="pending", created_at=datetime(2030, 1, 1))
+    db_session.add_all([old, new])
+    db_session.flush()
+    db_session.add_all([
+        OrderItem(order_id=old.id, item_id=1, quantity=1, price=10),
+        OrderItem(order_id=new.id, item_id=1, quantity=2, price=10),
+    ])
+    db_session.commit()
+    return old.id, new.id
+
+
+class TestExports:
+    """Тесты потоковых выгрузок"""
+
+    def test_orders_ndjson_since(self, admin_headers, orders):
+        old_id, new_id = orders
+        response = client.get("/exports/orders", headers=admin_headers)
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        ids = [json.loads(line)["id"] for line in response.text.splitlines()]
+        assert old_id in ids and new_id in ids
+
+        response = client.get("/exports/orders?since=2029-01-01T00:00:00", headers=admin_headers)
+        rows = [json.loads(line) for line in response.text.splitlines()]
+        assert [row["id"] for row in rows] == [new_id]
+        assert rows[0]["created_at"].startswith("2030-01-01")
+
+    def test_order_items_csv(self, admin_headers, orders):
+        old_id, new_id = orders
+        response = client.get(
+            "/exports/order-items?format=csv&since=2029-01-01T00:00:00", headers=admin_headers,
+        )
+        rows = {int(row["order_id"]): int(row["quantity"]) for row in csv.DictReader(io.StringIO(response.text))}
+        assert rows[new_id] == 2
+        assert old_id not in rows
+
+    def test_items_csv_in_small_batches(self, admin_headers, monkeypatch):
+        from app.core import config
+
+        monkeypatch.setattr(config.settings, "EXPORT_BATCH_SIZE", 1)
+        response = client.get("/exports/items?format=csv", headers=admin_headers)
+        assert response.status_code == 200
+        lines = response.text.splitlines()
+        assert lines[0] == "id,sku,title,description,price,stock_quantity,category_id"
+        assert lines.count(lines[0]) == 1
+
+    def test_requires_admin(self, database):
+        token = create_access_token(data={"sub": "nobody@example.com"})
+        response = client.get("/exports/items", headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code in [401, 403]
@@ -0,0 +1,71 @@
+import uuid
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.core.security import create_access_token
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def category_id(database):
+    return client.post("/categories/", json={"name": f"Import-{uuid.uuid4().hex[:8]}"}).json()["id"]
+
+
+class TestBulkImport:
+    """Тесты массового импорта каталога"""
+
+    def test_ndjson_insert_then_update(self, admin_headers, category_id):
+        tag = uuid.uuid4().hex[:8]
+        rows = [
+            f'{{"sku": "{tag}-1", "title": "A", "description": "d", "price": 100, "category_id": {category_id}}}',
+            f'{{"sku": "{tag}-2", "title": "B", "description": "d", "price": 200, "category_id": {category_id}}}',
+            '{"sku": "broken", "title": "", "price": -1}',
+            "not json",
+        ]
+        response = client.post(
+            "/items/import", content="\n".join(rows),
+            headers={**admin_headers, "Content-Type": "application/x-ndjson"},
+        )
+        assert response.status_code == 200
+        report = response.json()
+        assert (report["inserted"], report["updated"], report["failed"]) == (2, 0, 2)
+        assert [error["row"] for error in report["errors"]] == [3, 4]
+
+        update = f'{{"sku": "{tag}-1", "title": "A2", "description": "d", "price": 150, "category_id": {category_id}}}'
+        report = client.post(
+            "/items/import?format=ndjson", content=update, headers=admin_headers,
+        ).json()
+        assert (report["inserted"], report["updated"]) == (0, 1)
+
+        items = client.get("/items/", params={"category_id": category_id}).json()
+        assert {(it["sku"], it["title"], it["price"]) for it in items} == {
+            (f"{tag}-1", "A2", 150.0), (f"{tag}-2", "B", 200.0),
+        }
+
+    def test_csv_by_title(self, admin_headers, category_id):
+        tag = uuid.uuid4().hex[:8]
+        body = (
+            "title,description,price,category_id\n"
+            f'"Laptop {tag}","Line one\nline two",999.5,{category_id}\n'
+            f"Other {tag},desc,10,999999\n"
+        )
+        headers = {**admin_headers, "Content-Type": "text/csv"}
+        report = client.post("/items/import?key=title", content=body, headers=headers).json()
+        assert (report["inserted"], report["failed"]) == (1, 1)
+        assert "category_id" in report["errors"][0]["errors"][0]
+
+        items = client.get("/items/", params={"category_id": category_id}).json()
+        assert items[0]["description"] == "Line one\nline two"
+
+        body = f"title,description,price,category_id\nLaptop {tag},new,500,{category_id}\n"
+        report = client.post("/items/import?key=title", content=body, headers=headers).json()
+        assert report["updated"] == 1
+
+    def test_requires_admin(self, database):
+        token = create_access_token(data={"sub": "nobody@example.com"})
+        response = client.post(
+            "/items/import?format=ndjson", content="",
+            headers={"Authorization": f"Bearer {token}"},
+        )
+        assert response.status_code in [401, 403]
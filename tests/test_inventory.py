@@ -0,0 +1,138 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.core.security import create_access_token
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def stocked(database, db_session):
+    """Создать покупателей и товар с заданным остатком"""
+    from app.models.item import Category, Item
+    from app.models.user import User
+
+    def make(stock, buyers=1):
+        tag = uuid.uuid4().hex[:8]
+        category = Category(name=f"Stock-{tag}")
+        users = [User(email=f"stock-{tag}-{i}@example.com", hashed_password="x") for i in range(buyers)]
+        db_session.add_all([category, *users])
+        db_session.flush()
+        item = Item(title="Flash sale", description="d", price=100, stock_quantity=stock, category_id=category.id)
+        db_session.add(item)
+        db_session.commit()
+        headers = [{"Authorization": f"Bearer {create_access_token(data={'sub': u.email})}"} for u in users]
+        return item.id, headers
+
+    return make
+
+
+def stock_of(db_session, item_id):
+    from app.models.item import Item
+
+    db_session.expire_all()
+    return db_session.get(Item, item_id).stock_quantity
+
+
+def order(item_id, quantity=1):
+    return {
+        "items": [{"item_id": item_id, "quantity": quantity}],
+        "delivery_address": "Dushanbe",
+        "delivery_phone": "+992000000000",
+    }
+
+
+class TestStockReservation:
+    """Тесты резервирования остатков"""
+
+    async def test_parallel_checkouts_never_oversell(self, stocked, db_session):
+        initial, attempts = 25, 200
+        item_id, buyers = stocked(initial, buyers=20)
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            responses = await asyncio.gather(*[
+                http.post("/orders/", json=order(item_id), headers=buyers[i % len(buyers)])
+                for i in range(attempts)
+            ])
+
+        statuses = [r.status_code for r in responses]
+        assert set(statuses) <= {200, 409}
+        assert statuses.count(200) == initial
+        assert stock_of(db_session, item_id) == 0
+
+    def test_cart_reservation_and_release(self, stocked, db_session):
+        item_id, (headers,) = stocked(1)
+        assert client.post(f"/cart/?item_id={item_id}", headers=headers).status_code == 200
+        assert stock_of(db_session, item_id) == 0
+
+        # Второй покупатель не может положить в корзину уже зарезервированный товар
+        _, (other,) = stocked(0)
+        assert client.post(f"/cart/?item_id={item_id}", headers=other).status_code == 409
+
+        client.delete(f"/cart/{item_id}", headers=headers)
+        assert stock_of(db_session, item_id) == 1
+
+    def test_checkout_consumes_reservation(self, stocked, db_session):
+        item_id, (headers,) = stocked(2)
+        client.post(f"/cart/?item_id={item_id}", headers=headers)
+        assert client.post("/orders/", json=order(item_id, 2), headers=headers).status_code == 200
+        assert stock_of(db_session, item_id) == 0
+        assert client.post("/orders/", json=order(item_id), headers=headers).status_code == 409
+
+    async def test_expired_reservations_released(self, stocked, db_session):
+        from app.core.db import AsyncSessionLocal
+        from app.core.inventory import release_expired
+
+        item_id, (headers,) = stocked(3)
+        client.post(f"/cart/?item_id={item_id}", headers=headers)
+        client.post(f"/cart/?item_id={item_id}", headers=headers)
+        assert stock_of(db_session, item_id) == 1
+
+        async with AsyncSessionLocal() as db:
+            await release_expired(db, now=datetime.utcnow() + timedelta(days=1))
+            await db.commit()
+        assert stock_of(db_session, item_id) == 3
+
+
+    def test_stock_change_refreshes_catalog(self, stocked):
+        item_id, (headers,) = stocked(5)
+        card = client.get(f"/items/{item_id}")
+        assert card.json()["stock_quantity"] == 5
+
+        client.post(f"/cart/?item_id={item_id}&quantity=2", headers=headers)
+        response = client.get(f"/items/{item_id}", headers={"If-None-Match": card.headers["ETag"]})
+        assert response.status_code == 200
+        assert response.json()["stock_quantity"] == 3
+
+
+class TestCart:
+    """Тесты корзины с количеством"""
+
+    def test_upsert_increments_quantity(self, stocked, db_session):
+        item_id, (headers,) = stocked(10)
+        client.post(f"/cart/?item_id={item_id}", headers=headers)
+        response = client.post(f"/cart/?item_id={item_id}&quantity=3", headers=headers)
+        assert response.json()["quantity"] == 4
+        assert stock_of(db_session, item_id) == 6
+
+        cart = client.get("/cart/", headers=headers).json()
+        assert cart["total"] == 1
+        line = cart["items"][0]
+        assert (line["item_id"], line["quantity"], line["title"], line["subtotal"]) == (
+            item_id, 4, "Flash sale", 400.0,
+        )
+        assert cart["total_price"] == 400.0
+
+    def test_view_is_single_query(self, stocked, max_queries):
+        item_id, (headers,) = stocked(10)
+        client.post(f"/cart/?item_id={item_id}&quantity=2", headers=headers)
+        max_queries(client.get("/cart/", headers=headers), 1)
+
+    def test_unknown_item(self, stocked):
+        _, (headers,) = stocked(0)
+        assert client.post("/cart/?item_id=999999999", headers=headers).status_code == 404
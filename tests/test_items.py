@@ -1,6 +1,12 @@
+import json
+import uuid
+from datetime import datetime
 import pytest
 from fastapi.testclient import TestClient
 from app.main import app
+from app.core import serialization
+from app.core.cache import catalog_cache
+from app.schemas.item import ItemResponse
 
 client = TestClient(app)
 
@@ -39,3 +45,251 @@ class TestItems:
         assert response.status_code == 200
         data = response.json()
         assert isinstance(data, list)
+
+
+@pytest.fixture
+def catalog(database):
+    """Категория с набором ноутбуков для тестов пагинации"""
+    name = f"Pagination-{uuid.uuid4().hex[:8]}"
+    category = client.post("/categories/", json={"name": name}).json()
+    prices = [1500.0, 900.0, 1200.0, 900.0, 2000.0, 700.0]
+    ids = []
+    for i, price in enumerate(prices):
+        item = client.post("/items/", json={
+            "title": f"Laptop {i}",
+            "description": "Test laptop",
+            "price": price,
+            "category_id": category["id"],
+        }).json()
+        ids.append(item["id"])
+    return category["id"], ids, prices
+
+
+class TestKeysetPagination:
+    """Тесты курсорной пагинации и фильтров GET /items"""
+
+    def _walk(self, params):
+        seen, cursor = [], None
+        while True:
+            query = dict(params, **({"cursor": cursor} if cursor else {}))
+            response = client.get("/items/", params=query)
+            assert response.status_code == 200
+            seen.extend(response.json())
+            cursor = response.headers.get("X-Next-Cursor")
+            if not cursor:
+                return seen
+
+    def test_cursor_by_id(self, catalog):
+        category_id, ids, _ = catalog
+        items = self._walk({"category_id": category_id, "limit": 4})
+        assert [it["id"] for it in items] == sorted(ids)
+
+    def test_cursor_by_price_desc(self, catalog):
+        category_id, ids, prices = catalog
+        items = self._walk({"category_id": category_id, "limit": 2, "sort": "-price"})
+        expected = sorted(zip(prices, ids), reverse=True)
+        assert [(it["price"], it["id"]) for it in items] == expected
+
+    def test_cursor_by_price_across_equal_prices(self, catalog):
+        category_id, ids, prices = catalog
+        # limit=1: граница страницы проходит между двумя товарами по 900
+        items = self._walk({"category_id": category_id, "limit": 1, "sort": "price"})
+        assert [(it["price"], it["id"]) for it in items] == sorted(zip(prices, ids))
+
+    def test_price_cursor_seeks_index(self, db_session):
+        from sqlalchemy import select, text
+        from app.api.v1.items import _after_key
+        from app.models.item import Item
+
+        for desc in (False, True):
+            query = select(Item.id).where(_after_key([900.0, 5], True, desc))
+            query = query.order_by(*((Item.price.desc(), Item.id.desc()) if desc else (Item.price, Item.id)))
+            sql = str(query.limit(10).compile(db_session.bind, compile_kwargs={"literal_binds": True}))
+            plan = " ".join(row[-1] for row in db_session.execute(text(f"EXPLAIN QUERY PLAN {sql}")))
+            # SEARCH — поиск по индексу с границы курсора, а не полный проход (SCAN)
+            assert plan.startswith("SEARCH items USING COVERING INDEX ix_items_price_id")
+
+    def test_price_range(self, catalog):
+        category_id, _, _ = catalog
+        response = client.get("/items/", params={
+            "category_id": category_id, "min_price": 900, "max_price": 1500, "sort": "price",
+        })
+        assert [it["price"] for it in response.json()] == [900.0, 900.0, 1200.0, 1500.0]
+
+    def test_skip_limit_still_works(self, catalog):
+        category_id, ids, _ = catalog
+        response = client.get("/items/", params={"category_id": category_id, "skip": 2, "limit": 2})
+        assert [it["id"] for it in response.json()] == sorted(ids)[2:4]
+
+    def test_invalid_cursor(self):
+        response = client.get("/items/?cursor=not-a-cursor")
+        assert response.status_code == 400
+
+
+class TestSearch:
+    """Тесты полнотекстового поиска /items/search"""
+
+    def _create(self, category_id, title, description):
+        return client.post("/items/", json={
+            "title": title, "description": description,
+            "price": 1000.0, "category_id": category_id,
+        }).json()
+
+    def test_ranked_and_synced(self, catalog):
+        category_id, _, _ = catalog
+        tag = uuid.uuid4().hex[:8]
+        in_title = self._create(category_id, f"Zenbook {tag}", "Ultrabook")
+        in_description = self._create(category_id, "Ultrabook", f"Similar to zenbook {tag}")
+
+        response = client.get("/items/search", params={"q": f"zenbook {tag}"})
+        assert response.status_code == 200
+        assert [it["id"] for it in response.json()] == [in_title["id"], in_description["id"]]
+
+        # Обновление и удаление сразу отражаются в индексе
+        client.put(f"/items/{in_title['id']}", json={
+            "title": "Renamed", "description": "Ultrabook",
+            "price": 1000.0, "category_id": category_id,
+        })
+        client.delete(f"/items/{in_description['id']}")
+        response = client.get("/items/search", params={"q": tag})
+        assert response.json() == []
+
+    def test_prefix_match(self, catalog):
+        category_id, _, _ = catalog
+        tag = uuid.uuid4().hex[:8]
+        item = self._create(category_id, f"Thinkpad{tag}", "Business laptop")
+        response = client.get("/items/search", params={"q": f"thinkpad{tag[:4]}"})
+        assert [it["id"] for it in response.json()] == [item["id"]]
+
+    def test_no_terms(self, database):
+        response = client.get("/items/search", params={"q": "!!!"})
+        assert response.status_code == 200
+        assert response.json() == []
+
+
+class TestCatalogCache:
+    """Тесты кэша каталога и его инвалидации"""
+
+    def test_list_cached_and_invalidated(self, catalog):
+        from app.core.cache import catalog_cache
+
+        category_id, ids, _ = catalog
+        params = {"category_id": category_id, "limit": 100}
+        first = client.get("/items/", params=params).json()
+        hits = catalog_cache.hits
+        assert client.get("/items/", params=params).json() == first
+        assert catalog_cache.hits == hits + 1
+
+        client.put(f"/items/{ids[0]}", json={
+            "title": "Updated", "description": "Test laptop",
+            "price": 1.0, "category_id": category_id,
+        })
+        updated = client.get("/items/", params=params).json()
+        assert updated[0]["title"] == "Updated"
+        assert client.get(f"/items/{ids[0]}").json()["price"] == 1.0
+
+    def test_single_item_invalidated_on_delete(self, catalog):
+        _, ids, _ = catalog
+        assert client.get(f"/items/{ids[-1]}").status_code == 200
+        client.delete(f"/items/{ids[-1]}")
+        assert client.get(f"/items/{ids[-1]}").status_code == 404
+
+    def test_categories_invalidated_on_create(self, database):
+        before = client.get("/categories/").json()
+        name = f"Cache-{uuid.uuid4().hex[:8]}"
+        client.post("/categories/", json={"name": name})
+        after = client.get("/categories/").json()
+        assert len(after) == len(before) + 1
+        assert name in [cat["name"] for cat in after]
+
+    def test_lru_eviction(self):
+        from app.core.cache import TTLCache
+
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.set(("a",), 1)
+        cache.set(("b",), 2)
+        cache.get(("a",))
+        cache.set(("c",), 3)
+        assert cache.get(("b",)) is None
+        assert cache.get(("a",)) == 1
+        assert cache.stats()["evictions"] == 1
+
+    def test_stale_read_not_cached(self):
+        from app.core.cache import TTLCache
+
+        cache = TTLCache(maxsize=10, ttl=60)
+        version = cache.version("items")
+        cache.invalidate_namespace("items")
+        cache.set(("items", 1), "stale", version=version)
+        assert cache.get(("items", 1)) is None
+
+
+class TestConditionalRequests:
+    """Тесты ETag / If-None-Match для каталога"""
+
+    def test_items_not_modified_until_write(self, catalog):
+        category_id, ids, _ = catalog
+        params = {"category_id": category_id}
+        response = client.get("/items/", params=params)
+        etag = response.headers["ETag"]
+
+        cached = client.get("/items/", params=params, headers={"If-None-Match": etag})
+        assert cached.status_code == 304
+        assert cached.content == b""
+
+        # Другие параметры — другой ETag
+        other = client.get("/items/", params={"category_id": category_id, "sort": "price"})
+        assert other.headers["ETag"] != etag
+
+        client.delete(f"/items/{ids[0]}")
+        fresh = client.get("/items/", params=params, headers={"If-None-Match": etag})
+        assert fresh.status_code == 200
+        assert fresh.headers["ETag"] != etag
+
+    def test_write_on_other_worker_changes_etag(self, catalog):
+        from app.core.cache import _ORIGIN, INVALIDATION_ROOM, _on_invalidation
+
+        _, ids, _ = catalog
+        url = f"/items/{ids[2]}"
+        etag = client.get(url).headers["ETag"]
+        # Своё сообщение, вернувшееся из брокера, повторно версию не поднимает
+        _on_invalidation(INVALIDATION_ROOM, [json.dumps({"origin": _ORIGIN, "namespace": "items", "ids": [ids[2]]})])
+        assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+
+        # Запись на другом воркере пришла через брокер: ETag устарел
+        _on_invalidation(INVALIDATION_ROOM, [json.dumps({"origin": "other", "namespace": "items", "ids": [ids[2]]})])
+        response = client.get(url, headers={"If-None-Match": etag})
+        assert response.status_code == 200 and response.headers["ETag"] != etag
+
+    def test_single_item_and_categories(self, catalog):
+        _, ids, _ = catalog
+        for url in (f"/items/{ids[1]}", "/categories/"):
+            etag = client.get(url).headers["ETag"]
+            response = client.get(url, headers={"If-None-Match": f'"other", {etag}'})
+            assert response.status_code == 304
+            assert response.headers["ETag"] == etag
+
+
+class TestFastJSON:
+    """Тесты быстрого пути сериализации списков"""
+
+    def test_body_matches_schema(self, catalog):
+        category_id, ids, _ = catalog
+        response = client.get(f"/items/?category_id={category_id}&limit=100")
+        assert response.headers["content-type"] == "application/json"
+        data = response.json()
+        assert [item["id"] for item in data] == ids
+        for item in data:
+            assert ItemResponse.model_validate(item).model_dump() == item
+
+    def test_cache_stores_bytes(self, catalog):
+        _, ids, _ = catalog
+        first = client.get(f"/items/{ids[0]}")
+        assert catalog_cache.get(("item", ids[0])) == first.content
+        assert client.get(f"/items/{ids[0]}").content == first.content
+
+    def test_stdlib_fallback(self, monkeypatch):
+        data = {"title": "Ноутбук", "price": 999.5, "created_at": datetime(2024, 1, 2, 3, 4, 5)}
+        fast = serialization.dumps(data)
+        monkeypatch.setattr(serialization, "orjson", None)
+        assert json.loads(serialization.dumps(data)) == json.loads(fast)
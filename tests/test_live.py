@@ -0,0 +1,166 @@
+import asyncio
+import json
+import pytest
+from app.api.v1.live import live_items
+from app.core.broker import MemoryBroker
+from app.core.live import LIVE_ROOM, ItemFeed, item_feed, publish
+
+
+def parse(frame: bytes) -> dict:
+    """Поля SSE-события; data — уже разобранный JSON"""
+    fields = dict(line.split(": ", 1) for line in frame.decode().strip().split("\n"))
+    fields["data"] = json.loads(fields["data"])
+    return fields
+
+
+class TestItemFeed:
+    """Тесты схлопывания, нумерации и продолжения ленты"""
+
+    async def test_coalesces_within_window(self):
+        broker = MemoryBroker(batch_seconds=0.001)
+        feed = ItemFeed(window_seconds=0.02)
+        feed.start(broker)
+        listener, missed = feed.subscribe(None)
+        assert missed == []
+
+        broker.publish(LIVE_ROOM, '{"id":1,"price":10.0}', key=1)
+        await asyncio.sleep(0.005)
+        broker.publish(LIVE_ROOM, '{"id":2,"stock":5}', key=2)
+        broker.publish(LIVE_ROOM, '{"id":1,"stock":3}', key=1)
+        event = parse(await asyncio.wait_for(listener.queue.get(), 1))
+
+        assert event["event"] == "items"
+        assert event["id"] == f"{feed.epoch}-1"
+        assert event["data"] == {"items": [{"id": 1, "price": 10.0, "stock": 3}, {"id": 2, "stock": 5}]}
+        assert listener.queue.empty()
+        feed.stop(broker)
+
+    async def test_resume_from_last_event_id(self):
+        feed = ItemFeed(window_seconds=0, history=3)
+        for n in range(1, 6):
+            feed.on_batch(LIVE_ROOM, [json.dumps({"id": n, "stock": n})])
+            feed.flush()
+
+        _, missed = feed.subscribe(feed.event_id(3))
+        assert [parse(frame)["id"] for frame in missed] == [feed.event_id(4), feed.event_id(5)]
+        assert feed.subscribe(feed.event_id(5))[1] == []
+
+        # Событие 1 уже вытеснено из истории, эпоха чужая или номер из будущего — reset
+        for stale in (feed.event_id(1), "other-4", feed.event_id(9), "garbage"):
+            (reset,) = feed.subscribe(stale)[1]
+            assert parse(reset)["event"] == "reset"
+            assert parse(reset)["id"] == feed.event_id(5)
+
+    async def test_slow_listener_is_closed(self):
+        feed = ItemFeed(window_seconds=0, queue_size=2)
+        listener, _ = feed.subscribe(None)
+        for n in range(3):
+            feed.on_batch(LIVE_ROOM, [json.dumps({"id": n, "stock": 1})])
+            feed.flush()
+        assert listener not in feed.listeners
+        assert listener.queue.get_nowait() is None
+        assert feed.stats()["overflows"] == 1
+
+
+@pytest.fixture
+def live_item(database, db_session):
+    """Товар с остатком 4; возвращает (id товара, id категории)"""
+    import uuid
+    from app.models.item import Category, Item
+
+    category = Category(name=f"Live-{uuid.uuid4().hex[:8]}")
+    db_session.add(category)
+    db_session.flush()
+    item = Item(title="Live laptop", description="d", price=500.0, stock_quantity=4, category_id=category.id)
+    db_session.add(item)
+    db_session.commit()
+    return item.id, category.id
+
+
+class TestLiveEndpoint:
+    """Тесты SSE-эндпоинта и публикации из путей записи"""
+
+    async def test_stream_replays_then_follows(self):
+        feed_seq = item_feed.seq
+        item_feed.on_batch(LIVE_ROOM, ['{"id":101,"price":1.0}'])
+        item_feed.flush()
+        response = await live_items(last_event_id=item_feed.event_id(feed_seq), last_event_id_header=None)
+        assert response.media_type == "text/event-stream"
+
+        body = response.body_iterator
+        assert await body.__anext__() == b"retry: 3000\n\n"
+        assert parse(await body.__anext__())["data"] == {"items": [{"id": 101, "price": 1.0}]}
+        listeners = len(item_feed.listeners)
+
+        item_feed.on_batch(LIVE_ROOM, ['{"id":102,"stock":7}'])
+        item_feed.flush()
+        assert parse(await body.__anext__())["data"] == {"items": [{"id": 102, "stock": 7}]}
+        await body.aclose()
+        assert len(item_feed.listeners) == listeners - 1
+
+    async def test_no_subscription_until_body_starts(self):
+        listeners = len(item_feed.listeners)
+        response = await live_items(last_event_id=None, last_event_id_header=None)
+        # Клиент отключился до начала тела: генератор не запускался, подписки нет
+        assert response.media_type == "text/event-stream"
+        assert len(item_feed.listeners) == listeners
+
+    def test_update_item_publishes_after_commit(self, live_client, live_item):
+        item_id, category_id = live_item
+        seq = item_feed.seq
+        response = live_client.put(f"/items/{item_id}", json={
+            "title": "Live laptop", "description": "d", "price": 450.0, "category_id": category_id,
+        })
+        assert response.status_code == 200
+        live_client.portal.call(asyncio.sleep, 0.4)  # Окно брокера и ленты
+
+        assert item_feed.seq == seq + 1
+        event = parse(item_feed.history[-1][1])
+        assert {"id": item_id, "price": 450.0, "stock": 4} in event["data"]["items"]
+
+    async def test_stock_changes_published_only_on_commit(self, live_item):
+        from app.core.broker import broker
+        from app.core.db import AsyncSessionLocal
+        from app.core.inventory import OutOfStock, apply_stock_deltas
+
+        item_id, _ = live_item
+        published = broker.published
+        async with AsyncSessionLocal() as db:
+            with pytest.raises(OutOfStock):
+                await apply_stock_deltas(db, {item_id: 10**9})
+            await db.rollback()
+        assert broker.published == published
+
+        async with AsyncSessionLocal() as db:
+            await apply_stock_deltas(db, {item_id: 1})
+            assert broker.published == published
+            await db.commit()
+        assert broker.published == published + 2  # Дельта в ленту и сброс кэша каталога
+        assert json.loads(broker._pending[LIVE_ROOM][item_id]) == {"id": item_id, "stock": 3}
+        broker.flush()
+
+    async def test_publish_keys_by_item(self):
+        from app.core.broker import broker
+
+        coalesced = broker.coalesced
+        publish([{"id": 7, "stock": 1}, {"id": 7, "stock": 0}])
+        assert broker.coalesced == coalesced + 1
+        broker.flush()
+
+    async def test_partial_deltas_merged_in_broker(self):
+        feed = ItemFeed(window_seconds=0)
+        broker = MemoryBroker(batch_seconds=0.001)
+        feed.start(broker)
+        listener, _ = feed.subscribe(None)
+
+        # Цена из импорта и остаток из корзины в одном пакете брокера: цена не теряется
+        with pytest.MonkeyPatch.context() as patch:
+            patch.setattr("app.core.live.broker", broker)
+            publish([{"id": 1, "price": 900.0}])
+            publish([{"id": 1, "stock": 3}])
+        assert broker.coalesced == 1
+        broker.flush()
+        feed.flush()
+        event = parse(listener.queue.get_nowait())
+        assert event["data"] == {"items": [{"id": 1, "price": 900.0, "stock": 3}]}
+        feed.stop(broker)
@@ -0,0 +1,121 @@
+import re
+import pytest
+from fastapi.testclient import TestClient
+from structlog.testing import capture_logs
+from app.main import app
+from app.core.config import settings
+from app.core.metrics import Histogram, http_metrics
+from app.core.sql_stats import QueryStats, query_stats
+
+client = TestClient(app)
+
+
+def _sample(text, name, **labels):
+    """Значение серии из текста /metrics (None, если серии нет)"""
+    wanted = ",".join(f'{key}="{value}"' for key, value in labels.items())
+    match = re.search(rf"^{re.escape(name)}\{{{re.escape(wanted)}\}} (\S+)$", text, re.M)
+    return float(match.group(1)) if match else None
+
+
+class TestHistogram:
+    """Тесты гистограммы задержек"""
+
+    def test_cumulative_buckets(self):
+        histogram = Histogram(buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 3.0):
+            histogram.observe(value)
+        assert histogram.cumulative() == [("0.1", 2), ("1.0", 3), ("+Inf", 4)]
+        assert histogram.count == 4
+        assert histogram.sum == pytest.approx(3.65)
+
+
+class TestMetricsEndpoint:
+    """Тесты ASGI-метрик и /metrics"""
+
+    def test_counts_by_route_template(self, database):
+        http_metrics.reset()
+        client.get("/items/999991")
+        client.get("/items/999992")
+        client.get("/health")
+        text = client.get("/metrics").text
+
+        assert _sample(
+            text, "http_requests_total", method="GET", route="/items/{item_id}", status="404"
+        ) == 2
+        assert _sample(text, "http_requests_total", method="GET", route="/health", status="200") == 1
+        assert "999991" not in text
+        assert _sample(
+            text, "http_request_duration_seconds_bucket",
+            method="GET", route="/items/{item_id}", le="+Inf",
+        ) == 2
+        assert _sample(
+            text, "http_request_duration_seconds_count", method="GET", route="/items/{item_id}"
+        ) == 2
+        # Во время выдачи /metrics в обработке только он сам
+        assert _sample(text, "http_requests_in_flight") is None
+        assert "http_requests_in_flight 1" in text
+
+    def test_includes_cache_and_pool_stats(self):
+        text = client.get("/metrics").text
+        assert _sample(text, "app_cache", source="catalog", field="hits") is not None
+        assert _sample(text, "app_hash_pool", source="bcrypt", field="workers") == settings.HASH_POOL_WORKERS
+
+    def test_slow_request_logged(self, monkeypatch):
+        monkeypatch.setattr(settings, "SLOW_REQUEST_SECONDS", 0.0)
+        with capture_logs() as logs:
+            client.get("/health")
+        slow = [entry for entry in logs if entry["event"] == "slow_request"]
+        assert slow and slow[0]["route"] == "/health" and slow[0]["status"] == 200
+        assert slow[0]["log_level"] == "warning"
+
+
+class TestQueryStats:
+    """Тесты учёта SQL-запросов"""
+
+    async def test_contextvar_reaches_engine_events(self, database):
+        from sqlalchemy import select
+        from app.core.db import AsyncSessionLocal
+        from app.models.item import Item
+
+        stats = QueryStats()
+        token = query_stats.set(stats)
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.execute(select(Item.id).limit(1))
+                await db.execute(select(Item.id).limit(1))
+        finally:
+            query_stats.reset(token)
+        assert stats.count == 2
+        assert stats.duration > 0
+
+    def test_repeated_shapes(self):
+        stats = QueryStats()
+        for n in (1, 2, 3):
+            stats.record(f"SELECT * FROM items WHERE id IN ({', '.join('?' * n)})", 0.001)
+        stats.record("SELECT 1", 0.001)
+        assert stats.repeated(2) == {"SELECT * FROM items WHERE id IN (...)": 3}
+        assert stats.repeated(3) == {}
+
+    def test_debug_headers(self, database, monkeypatch):
+        assert "X-DB-Query-Count" not in client.get("/items/999993").headers
+        monkeypatch.setattr(settings, "DEBUG", True)
+        response = client.get("/items/999993")
+        assert int(response.headers["X-DB-Query-Count"]) == 1
+        assert float(response.headers["X-DB-Time-Ms"]) >= 0
+
+    def test_slow_query_and_n_plus_one_logged(self, database, monkeypatch):
+        monkeypatch.setattr(settings, "SLOW_QUERY_SECONDS", 0.0)
+        monkeypatch.setattr(settings, "N_PLUS_ONE_THRESHOLD", 0)
+        http_metrics.reset()
+        with capture_logs() as logs:
+            client.get("/items/999994")
+        slow = [entry for entry in logs if entry["event"] == "slow_query"]
+        assert slow and "999994" in slow[0]["parameters"]
+        flagged = [entry for entry in logs if entry["event"] == "n_plus_one"]
+        assert flagged and flagged[0]["route"] == "/items/{item_id}"
+
+        text = client.get("/metrics").text
+        assert _sample(text, "http_n_plus_one_total", method="GET", route="/items/{item_id}") == 1
+        assert _sample(
+            text, "http_request_db_queries_count", method="GET", route="/items/{item_id}"
+        ) == 1
@@ -0,0 +1,108 @@
+import pytest
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, text
+
+# Схема, созданная create_all до миграций каталога: с неё обновляются развёрнутые БД
+BASELINE_DDL = [
+    "CREATE TABLE categories (id INTEGER NOT NULL, name VARCHAR(50) NOT NULL, "
+    "description TEXT, PRIMARY KEY (id))",
+    "CREATE UNIQUE INDEX ix_categories_name ON categories (name)",
+    "CREATE TABLE users (id INTEGER NOT NULL, email VARCHAR(255) NOT NULL, "
+    "hashed_password VARCHAR(255) NOT NULL, is_active BOOLEAN NOT NULL, role VARCHAR NOT NULL, "
+    "PRIMARY KEY (id))",
+    "CREATE UNIQUE INDEX ix_users_email ON users (email)",
+    "CREATE TABLE items (id INTEGER NOT NULL, title VARCHAR(100) NOT NULL, description TEXT NOT NULL, "
+    "price FLOAT NOT NULL, stock_quantity INTEGER NOT NULL, category_id INTEGER NOT NULL, "
+    "PRIMARY KEY (id), FOREIGN KEY(category_id) REFERENCES categories (id))",
+    "CREATE INDEX ix_items_title ON items (title)",
+    "CREATE TABLE orders (id INTEGER NOT NULL, user_id INTEGER NOT NULL, total_price FLOAT NOT NULL, "
+    "delivery_address VARCHAR(255), delivery_phone VARCHAR(20), status VARCHAR(50) NOT NULL, "
+    "created_at DATETIME DEFAULT CURRENT_TIMESTAMP NOT NULL, PRIMARY KEY (id), "
+    "FOREIGN KEY(user_id) REFERENCES users (id))",
+    "CREATE TABLE cart_items (id INTEGER NOT NULL, user_id INTEGER NOT NULL, item_id INTEGER NOT NULL, "
+    "quantity INTEGER NOT NULL, PRIMARY KEY (id), FOREIGN KEY(user_id) REFERENCES users (id), "
+    "FOREIGN KEY(item_id) REFERENCES items (id))",
+    "CREATE TABLE order_items (id INTEGER NOT NULL, order_id INTEGER NOT NULL, item_id INTEGER NOT NULL, "
+    "quantity INTEGER NOT NULL, price FLOAT NOT NULL, PRIMARY KEY (id), "
+    "FOREIGN KEY(order_id) REFERENCES orders (id), FOREIGN KEY(item_id) REFERENCES items (id))",
+]
+
+
+@pytest.fixture
+def deployed(tmp_path, monkeypatch):
+    """БД со старой схемой и данными плюс конфиг alembic, нацеленный на неё"""
+    from app.core.config import settings
+
+    path = tmp_path / "deployed.db"
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.begin() as conn:
+        for stmt in BASELINE_DDL:
+            conn.execute(text(stmt))
+        conn.execute(text("INSERT INTO categories (id, name) VALUES (1, 'Ultrabooks')"))
+        conn.execute(text(
+            "INSERT INTO items (id, title, description, price, stock_quantity, category_id) "
+            "VALUES (1, 'Zenbook 14', 'OLED ультрабук', 999.0, 3, 1)"
+        ))
+    monkeypatch.setattr(settings, "DATABASE_URL", f"sqlite+aiosqlite:///{path}")
+    config = Config()
+    config.set_main_option("script_location", "alembic")
+    command.stamp(config, "1502cc252df6")
+    yield engine, config
+    engine.dispose()
+
+
+class TestMigrations:
+    """Тесты обновления развёрнутой БД миграциями alembic"""
+
+    def test_search_index_backfilled(self, deployed):
+        engine, config = deployed
+        command.upgrade(config, "76281c3fde5a")
+        with engine.begin() as conn:
+            found = conn.execute(text("SELECT rowid FROM items_fts WHERE items_fts MATCH 'zenbook'"))
+            assert found.scalars().all() == [1]
+            # Триггеры поддерживают индекс дальше
+            conn.execute(text("UPDATE items SET title = 'Vivobook 16' WHERE id = 1"))
+            assert conn.execute(text("SELECT rowid FROM items_fts WHERE items_fts MATCH 'vivobook'")).all()
+
+        command.downgrade(config, "1502cc252df6")
+        with engine.connect() as conn:
+            assert not conn.execute(text("SELECT name FROM sqlite_master WHERE name LIKE 'items_fts%'")).all()
+
+    def test_schema_matches_models(self, deployed):
+        from alembic.autogenerate import compare_metadata
+        from alembic.migration import MigrationContext
+        from app.core.db import Base
+
+        engine, config = deployed
+        with engine.begin() as conn:
+            conn.execute(text("INSERT INTO users (id, email, hashed_password, is_active, role) "
+                              "VALUES (1, 'old@example.com', 'x', 1, 'user')"))
+            conn.execute(text("INSERT INTO cart_items (user_id, item_id, quantity) VALUES (1, 1, 1), (1, 1, 2)"))
+        command.upgrade(config, "head")
+
+        with engine.connect() as conn:
+            diff = compare_metadata(MigrationContext.configure(conn), Base.metadata)
+            # Таблицы FTS5 не описаны в моделях, а уникальность на SQLite задана индексами
+            unique_indexes = {
+                tuple(column.name for column in change[1].columns)
+                for change in diff if change[0] == "remove_index" and change[1].unique
+            }
+            unexpected = [
+                change for change in diff
+                if not (change[0] == "remove_table" and change[1].name.startswith("items_fts")
+                        or change[0] == "remove_index" and change[1].unique
+                        or change[0] == "add_constraint"
+                        and tuple(column.name for column in change[1].columns) in unique_indexes)
+            ]
+            assert unexpected == []
+            # Дубли корзины слиты, и upsert по (user_id, item_id) работает
+            conn.execute(text(
+                "INSERT INTO cart_items (user_id, item_id, quantity) VALUES (1, 1, 1) "
+                "ON CONFLICT (user_id, item_id) DO UPDATE SET quantity = quantity + excluded.quantity"
+            ))
+            assert conn.execute(text("SELECT quantity FROM cart_items")).scalars().all() == [4]
+            assert conn.execute(text("SELECT sku FROM items")).scalars().all() == [None]
+
+        command.downgrade(config, "76281c3fde5a")
+        command.upgrade(config, "head")
@@ -31,3 +31,197 @@ class TestOrders:
         response = client.get("/orders/history")
         # Без токена должен быть 401
         assert response.status_code in [401, 403, 200]
+
+
+@pytest.fixture
+def buyer(database, db_session):
+    """Покупатель с токеном и два ноутбука на складе"""
+    import uuid
+    from app.core.security import create_access_token
+    from app.models.item import Category, Item
+    from app.models.user import User
+
+    tag = uuid.uuid4().hex[:8]
+    user = User(email=f"buyer-{tag}@example.com", hashed_password="x")
+    category = Category(name=f"Orders-{tag}")
+    db_session.add_all([user, category])
+    db_session.flush()
+    items = [
+        Item(title=f"Laptop {i}", description="d", price=price, stock_quantity=100, category_id=category.id)
+        for i, price in enumerate([999.99, 10.5])
+    ]
+    db_session.add_all(items)
+    db_session.commit()
+    token = create_access_token(data={"sub": user.email})
+    return {"Authorization": f"Bearer {token}"}, user.id, [item.id for item in items]
+
+
+def checkout(headers, lines):
+    return client.post("/orders/", headers=headers, json={
+        "items": lines,
+        "delivery_address": "Dushanbe",
+        "delivery_phone": "+992000000000",
+    })
+
+
+class TestCheckout:
+    """Тесты оформления заказа"""
+
+    def test_server_side_pricing(self, buyer):
+        headers, _, (laptop, mouse) = buyer
+        response = client.post("/orders/", headers=headers, json={
+            "items": [
+                {"item_id": laptop, "quantity": 1, "price": 0.01},
+                {"item_id": mouse, "quantity": 2, "price": 0.01},
+                {"item_id": mouse, "quantity": 1, "price": 0.01},
+            ],
+            "total_price": 0.03,
+            "delivery_address": "Dushanbe",
+            "delivery_phone": "+992000000000",
+            "status": "paid",
+        })
+        assert response.status_code == 200
+        assert response.json()["total_price"] == 1031.49
+
+        order = client.get(f"/orders/{response.json()['order_id']}", headers=headers).json()
+        assert order["status"] == "pending"
+        assert sorted((it["item_id"], it["quantity"], it["price"]) for it in order["items"]) == [
+            (laptop, 1, 999.99), (mouse, 3, 10.5),
+        ]
+
+    def test_unknown_item(self, buyer):
+        headers, _, (laptop, _) = buyer
+        response = checkout(headers, [{"item_id": laptop, "quantity": 1}, {"item_id": 10**9, "quantity": 1}])
+        assert response.status_code == 400
+
+    def test_clears_cart(self, buyer):
+        headers, _, (laptop, _) = buyer
+        client.post(f"/cart/?item_id={laptop}", headers=headers)
+        assert checkout(headers, [{"item_id": laptop, "quantity": 1}]).status_code == 200
+        assert client.get("/cart/", headers=headers).json()["total"] == 0
+
+    def test_query_count_independent_of_lines(self, buyer, max_queries):
+        headers, _, (laptop, mouse) = buyer
+        client.get("/orders/", headers=headers)  # Пользователь попадает в кэш
+        one = max_queries(checkout(headers, [{"item_id": laptop, "quantity": 1}]), 6)
+        two = max_queries(
+            checkout(headers, [{"item_id": laptop, "quantity": 1}, {"item_id": mouse, "quantity": 2}]), 6
+        )
+        assert one == two
+        max_queries(client.get("/orders/?include=items", headers=headers), 2)
+        # История: те же два запроса плюс COUNT для total
+        max_queries(client.get("/orders/history/all?include=items", headers=headers), 3)
+
+
+class TestOrderHistory:
+    """Тесты постраничной истории заказов"""
+
+    def test_keyset_pages_with_items(self, buyer):
+        headers, _, (laptop, mouse) = buyer
+        created = [
+            checkout(headers, [{"item_id": laptop, "quantity": 1}, {"item_id": mouse, "quantity": n}]).json()["order_id"]
+            for n in (1, 2, 3)
+        ]
+
+        seen, cursor = [], None
+        while True:
+            params = {"limit": 2, "include": "items", **({"cursor": cursor} if cursor else {})}
+            response = client.get("/orders/", params=params, headers=headers)
+            assert response.status_code == 200
+            seen.extend(response.json())
+            cursor = response.headers.get("X-Next-Cursor")
+            if not cursor:
+                break
+
+        assert [order["id"] for order in seen] == sorted(created, reverse=True)
+        assert {line["quantity"] for line in seen[0]["items"]} == {1, 3}
+
+    def test_history_next_cursor(self, buyer):
+        headers, _, (laptop, _) = buyer
+        for _ in range(2):
+            checkout(headers, [{"item_id": laptop, "quantity": 1}])
+        response = client.get("/orders/history/all?limit=1", headers=headers)
+        first = response.json()
+        # total — все заказы пользователя, курсор — в заголовке, как у GET /orders/
+        assert first["total"] == 2 and len(first["orders"]) == 1
+        assert "items" not in first["orders"][0] and "next_cursor" not in first
+        second = client.get(
+            "/orders/history/all",
+            params={"limit": 1, "cursor": response.headers["X-Next-Cursor"]}, headers=headers,
+        )
+        assert second.json()["total"] == 2
+        assert second.json()["orders"][0]["id"] < first["orders"][0]["id"]
+
+
+class TestReadReplicas:
+    """Тесты маршрутизации чтений на реплики"""
+
+    @pytest.fixture
+    def replica(self, tmp_path, monkeypatch):
+        from sqlalchemy import create_engine
+        from app.api import deps
+        from app.core.db import Base, ReplicaRouter
+
+        path = tmp_path / "replica.db"
+        Base.metadata.create_all(create_engine(f"sqlite:///{path}"))
+        router = ReplicaRouter([f"sqlite+aiosqlite:///{path}"], "round_robin")
+        monkeypatch.setattr(deps, "replicas", router)
+        client.cookies.clear()
+        yield router
+        client.cookies.clear()
+
+    def test_read_your_writes(self, buyer, replica):
+        from app.core.consistency import PIN_COOKIE
+
+        headers, _, (laptop, _) = buyer
+        # До записи чтение идёт в пустую реплику
+        assert client.get("/orders/", headers=headers).json() == []
+
+        response = checkout(headers, [{"item_id": laptop, "quantity": 1}])
+        order_id = response.json()["order_id"]
+        # Сразу после записи клиент закреплён за основной БД меткой в cookie —
+        # на любом воркере, а не только на том, что принял запись
+        assert PIN_COOKIE in response.cookies
+        assert [o["id"] for o in client.get("/orders/", headers=headers).json()] == [order_id]
+
+        client.cookies.clear()
+        assert client.get("/orders/", headers=headers).json() == []
+
+    def test_pin_cookie_bounds(self):
+        from app.core.config import settings
+        from app.core.consistency import pinned
+
+        now = 1000.0
+        assert pinned(str(now + 1), now)
+        assert not pinned(str(now - 1), now)
+        assert not pinned(str(now + settings.READ_YOUR_WRITES_SECONDS + 60), now)
+        assert not pinned("garbage", now) and not pinned(None, now)
+
+    def test_catalog_filled_from_primary_after_write(self, buyer, replica, db_session, monkeypatch):
+        from app.core.cache import catalog_cache
+        from app.core.config import settings
+        from app.models.item import Item
+
+        _, _, (laptop, _) = buyer
+        category_id = db_session.get(Item, laptop).category_id
+        client.put(f"/items/{laptop}", json={
+            "title": "Laptop", "description": "d", "price": 777.0, "category_id": category_id,
+        })
+        # Другой клиент без метки: реплика пуста, но кэш после записи заполняется из основной БД
+        client.cookies.clear()
+        assert client.get(f"/items/{laptop}").json()["price"] == 777.0
+
+        monkeypatch.setattr(settings, "READ_YOUR_WRITES_SECONDS", 0.0)
+        catalog_cache.pop(("item", laptop))
+        assert client.get(f"/items/{laptop}").status_code == 404  # Окно прошло: читаем реплику
+
+    def test_selection_strategies(self):
+        from app.core.db import ReplicaRouter
+
+        urls = ["sqlite+aiosqlite:///:memory:"] * 3
+        round_robin = ReplicaRouter(urls, "round_robin")
+        assert [round_robin.pick() for _ in range(4)] == [0, 1, 2, 0]
+
+        least = ReplicaRouter(urls, "least_connections")
+        least.in_use[:] = [2, 0, 1]
+        assert least.pick() == 1
@@ -0,0 +1,110 @@
+import gzip
+import pytest
+from starlette.applications import Starlette
+from starlette.routing import Mount
+from starlette.testclient import TestClient
+from app.core.static import IMMUTABLE, REVALIDATE, PrecompressedStatic, negotiate
+
+CSS = b"body { color: #111; }\n" * 100
+
+
+@pytest.fixture
+def static(tmp_path):
+    """Фронтенд из страницы, стиля и крупного файла вне памяти"""
+    (tmp_path / "index.html").write_text(
+        '<link rel="stylesheet" href="index.css">'
+        '<link href="https://cdn.example.com/all.css" rel="stylesheet">'
+    )
+    (tmp_path / "index.css").write_bytes(CSS)
+    (tmp_path / "big.bin").write_bytes(b"x" * 8192)
+    frontend = PrecompressedStatic(str(tmp_path), max_file_bytes=4096)
+    return frontend, TestClient(Starlette(routes=[Mount("/", frontend)]))
+
+
+class TestNegotiate:
+    """Тесты выбора кодирования по Accept-Encoding"""
+
+    def test_prefers_brotli_then_gzip(self):
+        assert negotiate("gzip, deflate, br", {"br", "gzip"}) == "br"
+        assert negotiate("gzip, deflate, br", {"gzip"}) == "gzip"
+        assert negotiate("br;q=0.5, gzip", {"br", "gzip"}) == "gzip"
+
+    def test_identity_when_refused_or_absent(self):
+        assert negotiate("", {"gzip"}) is None
+        assert negotiate("gzip;q=0", {"gzip"}) is None
+        assert negotiate("*", {"gzip"}) == "gzip"
+        assert negotiate("*;q=0", {"gzip"}) is None
+
+
+class TestPrecompressedStatic:
+    """Тесты раздачи фронтенда из памяти"""
+
+    def test_index_links_fingerprinted_asset(self, static):
+        frontend, client = static
+        response = client.get("/", headers={"Accept-Encoding": "identity"})
+        assert response.status_code == 200
+        assert response.headers["cache-control"] == REVALIDATE
+        fingerprinted = frontend.fingerprints["index.css"]
+        assert f'href="{fingerprinted}"' in response.text
+        assert 'href="https://cdn.example.com/all.css"' in response.text
+
+        asset = client.get(f"/{fingerprinted}", headers={"Accept-Encoding": "identity"})
+        assert asset.content == CSS
+        assert asset.headers["cache-control"] == IMMUTABLE
+        assert asset.headers["content-type"] == "text/css; charset=utf-8"
+        # Старое имя продолжает работать, но с перепроверкой
+        assert client.get("/index.css").headers["cache-control"] == REVALIDATE
+
+    def test_serves_precompressed_variant(self, static):
+        frontend, client = static
+        path = "/" + frontend.fingerprints["index.css"]
+        response = client.get(path, headers={"Accept-Encoding": "gzip"})
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.headers["vary"] == "Accept-Encoding"
+        assert response.content == CSS  # httpx распаковывает сам
+        assert int(response.headers["content-length"]) == len(frontend.assets["index.css"].variants["gzip"])
+        assert gzip.decompress(frontend.assets["index.css"].variants["gzip"]) == CSS
+
+        plain = client.get(path, headers={"Accept-Encoding": "identity"})
+        assert "content-encoding" not in plain.headers
+        assert plain.headers["etag"] != response.headers["etag"]
+
+    def test_not_modified_and_head(self, static):
+        _, client = static
+        first = client.get("/", headers={"Accept-Encoding": "gzip"})
+        again = client.get("/", headers={"Accept-Encoding": "gzip", "If-None-Match": first.headers["etag"]})
+        assert again.status_code == 304 and again.content == b""
+        # Тег gzip-версии не подходит к несжатой: у каждого кодирования свой ETag
+        assert first.headers["etag"].endswith('-gz"')
+        plain = client.get("/", headers={"Accept-Encoding": "identity", "If-None-Match": first.headers["etag"]})
+        assert plain.status_code == 200 and plain.headers["etag"] != first.headers["etag"]
+
+        head = client.head("/", headers={"Accept-Encoding": "identity"})
+        assert head.status_code == 200 and head.content == b""
+        assert int(head.headers["content-length"]) == len(first.content)
+
+    def test_large_and_unknown_files_fall_back_to_disk(self, static):
+        frontend, client = static
+        assert "big.bin" not in frontend.assets
+        response = client.get("/big.bin")
+        assert response.status_code == 200 and len(response.content) == 8192
+        assert client.get("/missing.js").status_code == 404
+        assert client.post("/").status_code == 405
+
+
+class TestStaticThroughApp:
+    """Перепроверка фронтенда через приложение целиком, вместе со сжатием ответов"""
+
+    @pytest.mark.parametrize("accept_encoding", ["gzip", "gzip, deflate, br, zstd", "identity"])
+    def test_revalidates_with_served_etag(self, accept_encoding):
+        from app.main import app, frontend
+
+        client = TestClient(app)
+        for path in ("/", "/index.css", "/" + frontend.fingerprints["index.css"]):
+            first = client.get(path, headers={"Accept-Encoding": accept_encoding})
+            assert first.status_code == 200
+            again = client.get(path, headers={
+                "Accept-Encoding": accept_encoding, "If-None-Match": first.headers["etag"],
+            })
+            assert again.status_code == 304, path
+            assert again.headers["etag"] == first.headers["etag"]